@@ -1,13 +1,22 @@
 import pandas as pd
 import numpy as np
-import json
 from scipy import stats as scipy_stats
 
-def perform_eda(df):
+from .config import CSV_CHUNK_ROWS, CORRELATION_THRESHOLD, CORRELATION_TOP_K, CORRELATION_MATRIX_MAX_COLUMNS
+from .dtypes import CATEGORICAL_DTYPES
+from .sketches import CoMomentSketch
+
+# Bump whenever perform_eda or the charts change shape, so cached results
+# computed by older code stop being served
+ANALYSIS_VERSION = "4"
+
+CORRELATION_METHODS = ("pearson", "spearman")
+
+def perform_eda(df, correlation_method="pearson"):
     """Enhanced exploratory data analysis with deeper insights"""
     try:
         numeric_cols = df.select_dtypes(include=[np.number]).columns
-        categorical_cols = df.select_dtypes(include=['object']).columns
+        categorical_cols = df.select_dtypes(include=CATEGORICAL_DTYPES).columns
         
         # Basic stats
         basic_stats = {
@@ -17,28 +26,17 @@ def perform_eda(df):
             "missing_values": {str(k): int(v) for k, v in df.isnull().sum().items()},
             "memory_usage_mb": float(round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2))
         }
+        if "memory_optimization" in df.attrs:
+            basic_stats["memory_optimization"] = df.attrs["memory_optimization"]
     
         # Enhanced numeric statistics
         numeric_insights = {}
         if len(numeric_cols) > 0:
-            for col in numeric_cols:
-                try:
-                    data = df[col].dropna()
-                    if len(data) > 0:
-                        numeric_insights[str(col)] = {
-                            "mean": float(round(data.mean(), 3)),
-                            "median": float(round(data.median(), 3)),
-                            "std": float(round(data.std(), 3)),
-                            "min": float(round(data.min(), 3)),
-                            "max": float(round(data.max(), 3)),
-                            "skewness": float(round(scipy_stats.skew(data), 3)),
-                            "kurtosis": float(round(scipy_stats.kurtosis(data), 3)),
-                            "outliers_count": int(len(detect_outliers(data))),
-                            "unique_values": int(data.nunique()),
-                            "zero_count": int((data == 0).sum())
-                        }
-                except Exception as e:
-                    numeric_insights[str(col)] = {"error": str(e)}
+            try:
+                numeric_insights = compute_numeric_insights(df, numeric_cols)
+            except Exception:
+                # Fall back to the per-column path so one odd column can't sink the rest
+                numeric_insights = numeric_insights_per_column(df, numeric_cols)
     
         # Categorical insights
         categorical_insights = {}
@@ -70,31 +68,7 @@ def perform_eda(df):
         # Correlations for numeric data
         correlations = {}
         if len(numeric_cols) > 1:
-            try:
-                corr_matrix = df[numeric_cols].corr()
-                # Find strongest correlations
-                corr_pairs = []
-                for i in range(len(corr_matrix.columns)):
-                    for j in range(i+1, len(corr_matrix.columns)):
-                        col1, col2 = corr_matrix.columns[i], corr_matrix.columns[j]
-                        corr_val = corr_matrix.iloc[i, j]
-                        if not np.isnan(corr_val) and abs(corr_val) > 0.5:
-                            corr_pairs.append({
-                                "column1": str(col1),
-                                "column2": str(col2),
-                                "correlation": float(round(corr_val, 3))
-                            })
-                # Convert correlation matrix to serializable format
-                matrix_dict = {}
-                for col in corr_matrix.columns:
-                    matrix_dict[str(col)] = {str(k): float(v) if not np.isnan(v) else 0.0 for k, v in corr_matrix[col].items()}
-                
-                correlations = {
-                    "matrix": matrix_dict,
-                    "strong_correlations": sorted(corr_pairs, key=lambda x: abs(x["correlation"]), reverse=True)
-                }
-            except Exception as e:
-                correlations = {"error": str(e)}
+            correlations = compute_correlations(df, numeric_cols, correlation_method)
     
         return {
             **basic_stats,
@@ -112,6 +86,231 @@ def perform_eda(df):
             "error": str(e)
         }
 
+def compute_correlations(df, numeric_cols, method="pearson"):
+    """Correlation matrix (when small enough) plus the strongest column pairs"""
+    try:
+        return format_correlations(correlation_matrix(df, numeric_cols, method), numeric_cols, method)
+    except Exception as e:
+        return {"error": str(e)}
+
+def correlation_matrix(df, numeric_cols, method="pearson"):
+    """
+    Pairwise correlations of the numeric columns as a NumPy array.
+
+    Without missing values this is a single matrix product of the centered
+    columns. With NaNs, each pair uses only the rows where both columns are
+    present (like DataFrame.corr), via masked matrix products in row blocks.
+    Spearman ranks each column first; ranks are taken per column, so with
+    missing values they can differ slightly from pandas' per-pair ranking.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'")
+    values = df[list(numeric_cols)].to_numpy(dtype=np.float64, na_value=np.nan)
+    if method == "spearman":
+        values = pd.DataFrame(values).rank().to_numpy()
+
+    missing = np.isnan(values)
+    if missing.any():
+        sketch = CoMomentSketch(values.shape[1])
+        for start in range(0, len(values), CSV_CHUNK_ROWS):
+            sketch.update(values[start:start + CSV_CHUNK_ROWS])
+        return sketch.correlation()
+
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt(np.einsum("ij,ij->j", centered, centered))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (centered.T @ centered) / np.outer(norms, norms)
+    corr = np.clip(corr, -1.0, 1.0)
+    # Constant columns have no correlation - pandas reports NaN, diagonal included
+    np.fill_diagonal(corr, np.where(norms > 0, 1.0, np.nan))
+    return corr
+
+def strongest_pairs(corr, columns, threshold=CORRELATION_THRESHOLD, top_k=CORRELATION_TOP_K):
+    """Top-k upper-triangle pairs with |r| > threshold, strongest first"""
+    rows, cols = np.triu_indices(len(columns), k=1)
+    values = corr[rows, cols]
+    rounded = np.round(values, 3)
+    with np.errstate(invalid='ignore'):
+        keep = np.abs(values) > threshold
+    rows, cols, rounded = rows[keep], cols[keep], rounded[keep]
+    # Stable sort keeps row-major order among equally strong pairs
+    order = np.argsort(-np.abs(rounded), kind="stable")[:top_k]
+    return [
+        {
+            "column1": str(columns[rows[i]]),
+            "column2": str(columns[cols[i]]),
+            "correlation": float(rounded[i])
+        }
+        for i in order
+    ]
+
+def format_correlations(corr, columns, method="pearson"):
+    """
+    Serializable correlations for the EDA stats.
+
+    The full matrix is only embedded up to CORRELATION_MATRIX_MAX_COLUMNS
+    columns; past that it's N x N JSON, and clients page it from the
+    correlations endpoint instead.
+    """
+    columns = [str(col) for col in columns]
+    result = {"method": method}
+    if len(columns) <= CORRELATION_MATRIX_MAX_COLUMNS:
+        filled = np.nan_to_num(corr, nan=0.0).tolist()
+        result["matrix"] = {col: dict(zip(columns, row)) for col, row in zip(columns, filled)}
+    else:
+        result["matrix_omitted"] = True
+    result["strong_correlations"] = strongest_pairs(corr, columns)
+    return result
+
+def numeric_insights_per_column(df, numeric_cols):
+    """Reference implementation - one column at a time, several scans per column"""
+    numeric_insights = {}
+    for col in numeric_cols:
+        try:
+            data = df[col].dropna()
+            if len(data) > 0:
+                numeric_insights[str(col)] = {
+                    "mean": float(round(data.mean(), 3)),
+                    "median": float(round(data.median(), 3)),
+                    "std": float(round(data.std(), 3)),
+                    "min": float(round(data.min(), 3)),
+                    "max": float(round(data.max(), 3)),
+                    "skewness": float(round(scipy_stats.skew(data), 3)),
+                    "kurtosis": float(round(scipy_stats.kurtosis(data), 3)),
+                    "outliers_count": int(len(detect_outliers(data))),
+                    "unique_values": int(data.nunique()),
+                    "zero_count": int((data == 0).sum())
+                }
+        except Exception as e:
+            numeric_insights[str(col)] = {"error": str(e)}
+    return numeric_insights
+
+# Columns processed per vectorized block - keeps the sorted copy and masks bounded
+NUMERIC_BLOCK_COLUMNS = 64
+
+def compute_numeric_insights(df, numeric_cols):
+    """
+    Vectorized numeric statistics for every column at once.
+
+    Works on 2-D NumPy blocks: one sort per block gives min/max, median,
+    the IQR quartiles and unique counts, and one masked pass gives the sums
+    and central moments. Mirrors the pandas/scipy formulas used by
+    numeric_insights_per_column so the rounded output is identical.
+    """
+    numeric_insights = {}
+    if len(df) == 0:
+        return numeric_insights
+
+    # Ints and floats widen to float64 losslessly, so columns narrowed at load
+    # time give the same stats as the original float64 data
+    vectorized_cols = [col for col in numeric_cols
+                       if pd.api.types.is_integer_dtype(df[col].dtype) or pd.api.types.is_float_dtype(df[col].dtype)]
+    vectorized_set = set(vectorized_cols)
+    other_cols = [col for col in numeric_cols if col not in vectorized_set]
+    other_insights = numeric_insights_per_column(df, other_cols)
+
+    for start in range(0, len(vectorized_cols), NUMERIC_BLOCK_COLUMNS):
+        block_cols = vectorized_cols[start:start + NUMERIC_BLOCK_COLUMNS]
+        values = np.asfortranarray(df[block_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+        block_stats = _numeric_block_stats(values)
+        for i, col in enumerate(block_cols):
+            if block_stats["count"][i] == 0:
+                continue
+            numeric_insights[str(col)] = {
+                "mean": float(round(block_stats["mean"][i], 3)),
+                "median": float(round(block_stats["median"][i], 3)),
+                "std": float(round(block_stats["std"][i], 3)),
+                "min": float(round(block_stats["min"][i], 3)),
+                "max": float(round(block_stats["max"][i], 3)),
+                "skewness": float(round(block_stats["skewness"][i], 3)),
+                "kurtosis": float(round(block_stats["kurtosis"][i], 3)),
+                "outliers_count": int(block_stats["outliers_count"][i]),
+                "unique_values": int(block_stats["unique_values"][i]),
+                "zero_count": int(block_stats["zero_count"][i])
+            }
+
+    if not other_insights:
+        return numeric_insights
+    merged = {**numeric_insights, **other_insights}
+    return {str(col): merged[str(col)] for col in numeric_cols if str(col) in merged}
+
+def _numeric_block_stats(values):
+    """Per-column stats for a (rows, columns) float block with NaN as missing"""
+    n_rows = values.shape[0]
+    mask = ~np.isnan(values)
+    count = mask.sum(axis=0)
+    has_data = count > 0
+    last = np.maximum(count - 1, 0)
+    cols = np.arange(values.shape[1])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Pass 1: sort - NaNs go to the end, so each column's data is sorted[:count]
+        sorted_values = np.sort(values, axis=0)
+        col_min = sorted_values[0]
+        col_max = sorted_values[last, cols]
+
+        # Median like np.median: middle value, or the mean of the two middle values
+        lower_mid = sorted_values[last // 2, cols]
+        upper_mid = sorted_values[np.minimum(count // 2, last), cols]
+        median = np.where(count % 2 == 1, lower_mid, (lower_mid + upper_mid) / 2)
+
+        # IQR fences from batched quartiles, same rules as detect_outliers
+        q1 = _sorted_quantile(sorted_values, count, 0.25)
+        q3 = _sorted_quantile(sorted_values, count, 0.75)
+        iqr = q3 - q1
+        lower_bound = q1 - 1.5 * iqr
+        upper_bound = q3 + 1.5 * iqr
+        outliers_count = ((values < lower_bound) | (values > upper_bound)).sum(axis=0)
+
+        # Distinct values = 1 + number of changes between neighbours in sorted order
+        changes = sorted_values[1:] != sorted_values[:-1]
+        changes &= (np.arange(1, n_rows)[:, None] < count)
+        unique_values = changes.sum(axis=0) + has_data
+
+        zero_count = (values == 0).sum(axis=0)
+
+        # Pass 2: mean and central moments over the non-missing values
+        mean = np.where(mask, values, 0.0).sum(axis=0) / count
+        deviations = np.where(mask, values - mean, 0.0)
+        squared = deviations ** 2
+        sum_sq = squared.sum(axis=0)
+        std = np.sqrt(np.where(count > 1, sum_sq / (count - 1), np.nan))
+        m2 = sum_sq / count
+        m3 = (squared * deviations).sum(axis=0) / count
+        m4 = (squared ** 2).sum(axis=0) / count
+
+        # scipy returns NaN when the variance is lost in floating point noise
+        degenerate = m2 <= (np.finfo(np.float64).eps * mean) ** 2
+        skewness = np.where(degenerate, np.nan, m3 / m2 ** 1.5)
+        kurtosis = np.where(degenerate, np.nan, m4 / m2 ** 2.0) - 3
+
+    return {
+        "count": count,
+        "mean": mean,
+        "median": median,
+        "std": std,
+        "min": col_min,
+        "max": col_max,
+        "skewness": skewness,
+        "kurtosis": kurtosis,
+        "outliers_count": outliers_count,
+        "unique_values": unique_values,
+        "zero_count": zero_count
+    }
+
+def _sorted_quantile(sorted_values, count, q):
+    """Linear-interpolated quantile per column, matching np.percentile/pandas"""
+    cols = np.arange(sorted_values.shape[1])
+    virtual_index = count * q + (1 - q) - 1
+    previous_index = np.floor(virtual_index)
+    gamma = virtual_index - previous_index
+    previous_index = np.clip(previous_index.astype(np.int64), 0, np.maximum(count - 1, 0))
+    next_index = np.minimum(previous_index + 1, np.maximum(count - 1, 0))
+    below = sorted_values[previous_index, cols]
+    above = sorted_values[next_index, cols]
+    diff = above - below
+    return np.where(gamma >= 0.5, above - diff * (1 - gamma), below + diff * gamma)
+
 def detect_outliers(data, method='iqr'):
     """Detect outliers using IQR method"""
     Q1 = data.quantile(0.25)
@@ -124,7 +323,7 @@ def detect_outliers(data, method='iqr'):
 def get_chart_data(df):
     """Extract data for chart generation"""
     numeric_cols = df.select_dtypes(include=[np.number]).columns
-    categorical_cols = df.select_dtypes(include=['object']).columns
+    categorical_cols = df.select_dtypes(include=CATEGORICAL_DTYPES).columns
     
     chart_data = {
         "numeric_columns": list(numeric_cols),
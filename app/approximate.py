@@ -0,0 +1,381 @@
+import math
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+
+from .config import (
+    DATA_DIR, CSV_CHUNK_ROWS, SKETCH_QUANTILE_K, SKETCH_HLL_PRECISION, SKETCH_TOP_K, SKETCH_EXACT_DISTINCT_ROWS,
+    CORRELATION_SAMPLE_ROWS
+)
+from .sketches import (
+    MomentSketch, CoMomentSketch, KLLSketch, HyperLogLog, DistinctHashes, MisraGries, ReservoirSample
+)
+from .analysis import compute_correlations, format_correlations
+from .storage import iter_dataset_chunks, dataset_signature, append_to_dataset
+from .ingestion import merge_dtypes
+from .dtypes import CATEGORICAL_DTYPES
+
+# Approximate mode sizes the frame in memory from every n-th row
+MEMORY_SAMPLE_STEP = 10
+
+def column_role(dtype):
+    """How the EDA treats a column of this dtype"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return "other"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+        return "categorical"
+    return "other"
+
+class EDAAccumulator:
+    """
+    Builds perform_eda-shaped stats from chunks, using mergeable summaries.
+
+    Moments, min/max, zero and missing counts are exact. Median/quartiles come
+    from KLL sketches, unique counts from HyperLogLog, top categories from
+    Misra-Gries and correlations from a uniform row sample. Duplicate rows are
+    counted exactly from row hashes up to SKETCH_EXACT_DISTINCT_ROWS distinct
+    rows, then estimated with HyperLogLog.
+    With exact=True, category counts and correlations are exact too, at a cost
+    of one counter per distinct category (Pearson only - Spearman needs global
+    ranks). finalize() reports the error bounds of every approximate number
+    under "error_bounds".
+    """
+
+    def __init__(self, exact=False, correlation_method="pearson", seed=42):
+        if exact and correlation_method != "pearson":
+            raise ValueError("Exact streaming correlations support only the pearson method")
+        self.exact = exact
+        self.correlation_method = correlation_method
+        self.seed = seed
+        self.rows = 0
+        self.columns = None
+        self.dtypes = {}
+        self.missing = None
+        self.memory_bytes = 0
+        self.numeric_cols = []
+        self.categorical_cols = []
+        self.moments = None
+        self.quantiles = {}
+        self.numeric_unique = {}
+        self.category_counts = {}
+        self.category_unique = {}
+        self.category_totals = {}
+        self.row_hashes = DistinctHashes(SKETCH_EXACT_DISTINCT_ROWS, SKETCH_HLL_PRECISION)
+        self.sample = None
+        self.comoments = None
+
+    def _setup(self, chunk):
+        self.columns = [str(c) for c in chunk.columns]
+        self.missing = pd.Series(0, index=chunk.columns, dtype=np.int64)
+        self.numeric_cols = list(chunk.select_dtypes(include=[np.number]).columns)
+        self.categorical_cols = list(chunk.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+        self.moments = MomentSketch(len(self.numeric_cols))
+        if self.exact:
+            self.comoments = CoMomentSketch(len(self.numeric_cols))
+        else:
+            self.sample = ReservoirSample(CORRELATION_SAMPLE_ROWS, seed=self.seed)
+        for i, col in enumerate(self.numeric_cols):
+            self.quantiles[col] = KLLSketch(SKETCH_QUANTILE_K, seed=self.seed + i)
+            self.numeric_unique[col] = HyperLogLog(SKETCH_HLL_PRECISION)
+        for col in self.categorical_cols:
+            self.category_counts[col] = pd.Series(dtype=np.int64) if self.exact else MisraGries(SKETCH_TOP_K)
+            self.category_unique[col] = HyperLogLog(SKETCH_HLL_PRECISION)
+            self.category_totals[col] = 0
+
+    def accepts(self, dtypes):
+        """True if chunks with these dtypes keep every column's numeric/categorical role"""
+        if self.columns is None:
+            return True
+        return list(map(str, dtypes)) == self.columns and all(
+            column_role(self.dtypes[col]) == column_role(dtype) for col, dtype in dtypes.items()
+        )
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._setup(chunk)
+        for k, v in chunk.dtypes.items():
+            self.dtypes[k] = merge_dtypes(self.dtypes[k], v) if k in self.dtypes else v
+
+        self.rows += len(chunk)
+        # Categorical columns count their missing values below, from the dropna they need anyway
+        other_cols = [col for col in chunk.columns if col not in self.category_totals]
+        self.missing[other_cols] += chunk[other_cols].isnull().sum()
+        if self.exact:
+            self.memory_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+        else:
+            # Sizing every string is as slow as hashing it - every 10th row is plenty for an estimate
+            sample = chunk.iloc[::MEMORY_SAMPLE_STEP]
+            self.memory_bytes += int(sample.memory_usage(deep=True, index=False).sum() * len(chunk) / max(len(sample), 1))
+
+        if self.numeric_cols:
+            values = np.asfortranarray(chunk[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+            self.moments.update(values)
+            for i, col in enumerate(self.numeric_cols):
+                column = values[:, i]
+                self.quantiles[col].update(column)
+                present = column[~np.isnan(column)]
+                # +0.0 folds -0.0 into 0.0 so both hash alike, as nunique treats them
+                self.numeric_unique[col].add_hashes(pd.util.hash_array(present + 0.0))
+            if self.exact:
+                self.comoments.update(values)
+            else:
+                self.sample.update(chunk[self.numeric_cols])
+
+        for col in self.categorical_cols:
+            # Plain values, so counters never carry a frame's unused categories
+            data = chunk[col].dropna().astype(object)
+            self.missing[col] += len(chunk) - len(data)
+            self.category_totals[col] += len(data)
+            self.category_unique[col].add_values(data)
+            if self.exact:
+                self.category_counts[col] = self.category_counts[col].add(data.value_counts(), fill_value=0).astype(np.int64)
+            else:
+                self.category_counts[col].update(data)
+
+        self.row_hashes.add_hashes(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+    def finalize(self):
+        if self.columns is None:
+            return {"shape": [0, 0], "columns": [], "dtypes": {}, "missing_values": {}}
+
+        n_columns = len(self.columns)
+        rank_error = KLLSketch(SKETCH_QUANTILE_K).rank_error()
+        hll_error = HyperLogLog(SKETCH_HLL_PRECISION).relative_error()
+        error_bounds = {"numeric_insights": {}, "categorical_insights": {}, "quality_metrics": {}}
+
+        # Numeric insights
+        numeric_insights = {}
+        if self.numeric_cols:
+            shape_stats = self.moments.finalize()
+            for i, col in enumerate(self.numeric_cols):
+                count = int(self.moments.count[i])
+                if count == 0:
+                    continue
+                sketch = self.quantiles[col]
+                q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+                iqr = q3 - q1
+                lower_bound, upper_bound = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+                outlier_share = sketch.rank(lower_bound) + (1 - sketch.rank(upper_bound, inclusive=True))
+                unique_estimate = min(count, max(1, round(self.numeric_unique[col].estimate())))
+                median_low, median_high = sketch.quantile([max(0.0, 0.5 - rank_error), min(1.0, 0.5 + rank_error)])
+
+                numeric_insights[str(col)] = {
+                    "mean": float(round(self.moments.mean[i], 3)),
+                    "median": float(round(median, 3)),
+                    "std": float(round(shape_stats["std"][i], 3)),
+                    "min": float(round(self.moments.min[i], 3)),
+                    "max": float(round(self.moments.max[i], 3)),
+                    "skewness": float(round(shape_stats["skewness"][i], 3)),
+                    "kurtosis": float(round(shape_stats["kurtosis"][i], 3)),
+                    "outliers_count": int(round(outlier_share * count)),
+                    "unique_values": int(unique_estimate),
+                    "zero_count": int(self.moments.zeros[i])
+                }
+                error_bounds["numeric_insights"][str(col)] = {
+                    "median": {"rank_error": round(rank_error, 4),
+                               "range": [float(round(median_low, 3)), float(round(median_high, 3))]},
+                    "outliers_count": {"plus_minus": int(math.ceil(2 * rank_error * count))},
+                    "unique_values": {"relative_error": round(hll_error, 4),
+                                      "range": [int(max(1, unique_estimate * (1 - 3 * hll_error))),
+                                                int(min(count, math.ceil(unique_estimate * (1 + 3 * hll_error))))]}
+                }
+
+        # Categorical insights
+        categorical_insights = {}
+        for col in self.categorical_cols:
+            total = self.category_totals[col]
+            if total == 0:
+                continue
+            counts = self.category_counts[col]
+            if self.exact:
+                top = counts.sort_values(ascending=False, kind="stable")
+                unique_count = len(counts)
+                count_error = 0
+            else:
+                top = counts.top(5)
+                unique_count = min(total, max(1, round(self.category_unique[col].estimate())))
+                count_error = int(math.ceil(counts.max_error()))
+            categorical_insights[str(col)] = {
+                "unique_count": int(unique_count),
+                "most_frequent": str(top.index[0]) if len(top) > 0 else None,
+                "most_frequent_count": int(top.iloc[0]) if len(top) > 0 else 0,
+                "diversity_ratio": float(round(unique_count / total, 3)),
+                "top_categories": {str(k): int(v) for k, v in top.head(5).items()}
+            }
+            if not self.exact:
+                error_bounds["categorical_insights"][str(col)] = {
+                    "unique_count": {"relative_error": round(hll_error, 4)},
+                    "top_categories": {"max_undercount": count_error}
+                }
+
+        # Data quality metrics
+        total_cells = self.rows * n_columns
+        total_missing = int(self.missing.sum())
+        distinct_rows = min(self.rows, round(self.row_hashes.estimate()))
+        duplicate_rows = self.rows - distinct_rows
+        quality_metrics = {
+            "completeness_ratio": float(round((total_cells - total_missing) / total_cells, 3)) if total_cells else 0.0,
+            "duplicate_rows": int(duplicate_rows),
+            "columns_with_missing": int((self.missing > 0).sum()),
+            "numeric_columns": int(len(self.numeric_cols)),
+            "categorical_columns": int(len(self.categorical_cols))
+        }
+        # The count is rows minus an estimate of distinct rows, so its error is
+        # the estimate's - small relative to the rows, large relative to few duplicates
+        duplicate_error = int(math.ceil(3 * self.row_hashes.relative_error() * distinct_rows))
+        error_bounds["quality_metrics"]["duplicate_rows"] = {
+            "estimated": duplicate_error > 0,
+            "plus_minus": duplicate_error,
+            "range": [int(max(0, duplicate_rows - duplicate_error)), int(min(self.rows - 1, duplicate_rows + duplicate_error))]
+        }
+
+        # Correlations - exact co-moments, or on the row sample
+        correlations = {}
+        if len(self.numeric_cols) > 1 and self.exact:
+            correlations = format_correlations(self.comoments.correlation(), self.numeric_cols)
+        elif len(self.numeric_cols) > 1:
+            sample = self.sample.sample()
+            correlations = compute_correlations(sample, self.numeric_cols, self.correlation_method)
+            if len(sample) < self.rows:
+                error_bounds["correlations"] = {
+                    "sample_rows": int(len(sample)),
+                    "standard_error": round(1 / math.sqrt(max(len(sample) - 3, 1)), 4)
+                }
+
+        return {
+            "shape": [int(self.rows), int(n_columns)],
+            "columns": self.columns,
+            "dtypes": {str(k): str(v) for k, v in self.dtypes.items()},
+            "missing_values": {str(k): int(v) for k, v in self.missing.items()},
+            "memory_usage_mb": float(round(self.memory_bytes / 1024 / 1024, 2)),
+            "numeric_insights": numeric_insights,
+            "categorical_insights": categorical_insights,
+            "quality_metrics": quality_metrics,
+            "correlations": correlations,
+            "error_bounds": error_bounds
+        }
+
+def perform_eda_approximate(dataset_id, correlation_method="pearson", chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Sketch-based EDA for very large datasets - same shape as perform_eda.
+
+    Reads the stored dataset chunk by chunk, like streaming mode, so memory
+    is set by chunk_rows and the sketches rather than the size of the data;
+    exact-where-cheap, sketched where exactness costs memory. Unlike
+    streaming mode nothing is saved, and spearman correlations work (on the
+    row sample).
+    """
+    try:
+        accumulator = EDAAccumulator(correlation_method=correlation_method)
+        for chunk in iter_dataset_chunks(dataset_id, chunk_rows):
+            accumulator.update(chunk)
+        stats = accumulator.finalize()
+        stats["analysis_mode"] = "approximate"
+        return stats
+    except Exception as e:
+        return {
+            "shape": [0, 0],
+            "columns": [],
+            "dtypes": {},
+            "missing_values": {},
+            "error": str(e)
+        }
+
+def eda_state_path(dataset_id):
+    """Pickled streaming accumulator for a dataset, kept next to its columnar store"""
+    return os.path.join(DATA_DIR, f"dataset_{dataset_id}_eda.pkl")
+
+def load_eda_state(dataset_id):
+    """The saved accumulator, or None if there isn't one for the current files"""
+    path = eda_state_path(dataset_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            signature, accumulator = pickle.load(f)
+    except Exception as e:
+        print(f"Discarding unreadable EDA state for dataset {dataset_id}: {e}")
+        return None
+    return accumulator if signature == dataset_signature(dataset_id) else None
+
+def save_eda_state(dataset_id, accumulator, signature):
+    """Save an accumulator along with the signature of the files it summarizes"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = eda_state_path(dataset_id)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump((signature, accumulator), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+def build_eda_state(dataset_id, chunk_rows=CSV_CHUNK_ROWS):
+    """Stream the whole dataset into a fresh accumulator and save it"""
+    # Taken first, so data appended mid-read leaves the saved state stale rather than wrong
+    signature = dataset_signature(dataset_id)
+    accumulator = EDAAccumulator(exact=True)
+    for chunk in iter_dataset_chunks(dataset_id, chunk_rows):
+        accumulator.update(chunk)
+    save_eda_state(dataset_id, accumulator, signature)
+    return accumulator
+
+def perform_eda_streaming(dataset_id, correlation_method="pearson", chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Out-of-core EDA over the stored dataset, one chunk at a time.
+
+    Counts, moments, min/max, zero/missing counts, category counts and
+    correlations are exact; median/quartiles, numeric unique counts and
+    duplicate rows can't be exact in bounded memory, so they come from
+    sketches and are listed in "error_bounds". Peak memory is set by
+    chunk_rows, not by the size of the file. The accumulator is saved, so
+    repeat runs (and appends) don't re-read the data.
+    """
+    try:
+        if correlation_method != "pearson":
+            raise ValueError("Streaming EDA supports only pearson correlations")
+        accumulator = load_eda_state(dataset_id) or build_eda_state(dataset_id, chunk_rows)
+        stats = accumulator.finalize()
+        stats["analysis_mode"] = "streaming"
+        return stats
+    except Exception as e:
+        return {
+            "shape": [0, 0],
+            "columns": [],
+            "dtypes": {},
+            "missing_values": {},
+            "error": str(e)
+        }
+
+# One append at a time - each rewrites the dataset files and its saved state
+_append_lock = threading.Lock()
+
+def append_rows(dataset_id, csv_path, dtypes, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Append a CSV's rows to a dataset and update its stats incrementally.
+
+    Only the new rows are read: they're folded into the saved accumulator
+    from the previous run. Without a usable saved state (or when the new rows
+    change a column's type) the stats are rebuilt from the full data instead.
+    Returns the streaming EDA stats for the grown dataset.
+    """
+    with _append_lock:
+        accumulator = load_eda_state(dataset_id)
+        parse_dtypes = append_to_dataset(dataset_id, csv_path, dtypes, chunk_rows)
+
+        if accumulator is not None and not accumulator.accepts(parse_dtypes):
+            accumulator = None  # a column changed between numeric and text - start over
+        if accumulator is not None:
+            try:
+                for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=parse_dtypes, encoding="utf-8"):
+                    accumulator.update(chunk)
+                save_eda_state(dataset_id, accumulator, dataset_signature(dataset_id))
+            except Exception as e:
+                print(f"Incremental EDA update failed, rebuilding: {e}")
+                accumulator = None
+        if accumulator is None:
+            accumulator = build_eda_state(dataset_id, chunk_rows)
+
+    stats = accumulator.finalize()
+    stats["analysis_mode"] = "streaming"
+    return stats
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .config import DATASET_CACHE_MAX_MB, CORRELATION_CACHE_MAX_MB, MODEL_CACHE_MAX_MB
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values in bytes.
+
+    Each entry can carry a `signature` (e.g. file mtimes) - a lookup with a
+    different signature counts as a miss and drops the stale entry, which is
+    how cached datasets get invalidated when the file on disk changes.
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, signature, size)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, signature=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != signature:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, signature=None):
+        size = int(self.sizeof(value))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # Something bigger than the whole budget would just flush everything else
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, signature, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, match=lambda key: True):
+        """Drop every entry whose key satisfies `match`"""
+        with self._lock:
+            for key in [k for k in self._entries if match(k)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self.current_bytes / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class TTLCache:
+    """
+    Small LRU cache whose entries also expire after `ttl_seconds`.
+
+    Bounded by entry count - meant for small values like LLM completions.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# The app's shared caches live here rather than next to their users so that
+# /metrics can report them without importing pandas or scikit-learn.
+
+# Loaded DataFrames shared across requests - callers must treat them as read-only
+dataset_cache = LRUCache(
+    max_bytes=DATASET_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda df: df.memory_usage(deep=True).sum()
+)
+
+# Full correlation matrices (float32) behind the paged/binary correlations endpoint
+correlation_cache = LRUCache(
+    max_bytes=CORRELATION_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda entry: entry[1].nbytes
+)
+
+# Deserialized models (plus their preprocessing) for the predict endpoint,
+# bounded by the size of the model files
+model_cache = LRUCache(
+    max_bytes=MODEL_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda predictor: predictor["nbytes"]
+)
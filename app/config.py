@@ -0,0 +1,93 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where uploaded datasets and generated charts live (served under /static)
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+
+# SQLite database - how long a writer waits for the lock, and the connection pool
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dashboard.db")
+# Same database through the aiosqlite driver, for the async request sessions
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+
+# Columnar (Parquet) copies of uploaded datasets, one directory per dataset
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+# Upload ingestion - bytes pulled off the request per read, rows parsed per chunk
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100_000))
+
+# In-process cache of loaded DataFrames, bounded by memory rather than entry count
+DATASET_CACHE_MAX_MB = int(os.getenv("DATASET_CACHE_MAX_MB", 512))
+
+# Stored analysis results (analysis_cache table) kept for reuse - the newest win
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1000))
+
+# Background training jobs - number of worker processes (jobs beyond this queue up)
+TRAINING_MAX_CONCURRENCY = int(os.getenv("TRAINING_MAX_CONCURRENCY", 2))
+
+# Cores each training job may use - by default the machine split evenly between
+# the concurrent jobs; trees added per round when growing a forest incrementally
+TRAINING_N_JOBS = int(os.getenv("TRAINING_N_JOBS", max(1, (os.cpu_count() or 1) // TRAINING_MAX_CONCURRENCY)))
+TRAINING_WARM_START_STEP = int(os.getenv("TRAINING_WARM_START_STEP", 25))
+
+# Cross-validated model selection - folds, wall-clock budget per run, and the
+# per-worker cache of preprocessed matrices and fold splits
+MODEL_SELECTION_FOLDS = int(os.getenv("MODEL_SELECTION_FOLDS", 5))
+MODEL_SELECTION_BUDGET_SECONDS = int(os.getenv("MODEL_SELECTION_BUDGET_SECONDS", 300))
+MODEL_SELECTION_CACHE_MAX_MB = int(os.getenv("MODEL_SELECTION_CACHE_MAX_MB", 256))
+
+# Analysis offloading - EDA threads, chart rendering processes, and how many
+# extra requests may wait for them before the API starts answering 429
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", 4))
+# An image-mode analysis renders up to this many charts (visualization.plan_charts).
+# With a process each they all render at once, so the request waits for the slowest.
+CHARTS_PER_ANALYSIS = 3
+CHART_MAX_WORKERS = int(os.getenv("CHART_MAX_WORKERS", CHARTS_PER_ANALYSIS))
+ANALYSIS_MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", 8))
+
+# OpenRouter client - pooled connections, retries and completion caching
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", 10))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", 0.5))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+
+# Approximate/streaming EDA - sketch sizes and the correlation sample
+SKETCH_QUANTILE_K = int(os.getenv("SKETCH_QUANTILE_K", 200))
+SKETCH_HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", 14))
+SKETCH_TOP_K = int(os.getenv("SKETCH_TOP_K", 64))
+# Duplicate rows are counted exactly from row hashes (8 bytes a row) up to this
+# many distinct rows, and estimated with HyperLogLog beyond
+SKETCH_EXACT_DISTINCT_ROWS = int(os.getenv("SKETCH_EXACT_DISTINCT_ROWS", 5_000_000))
+CORRELATION_SAMPLE_ROWS = int(os.getenv("CORRELATION_SAMPLE_ROWS", 100_000))
+
+# Load-time dtype optimization - downcast numbers, turn object columns with at
+# most this share of distinct values into categories, optionally Arrow strings
+DTYPE_OPTIMIZATION = os.getenv("DTYPE_OPTIMIZATION", "true").lower() == "true"
+CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", 0.5))
+ARROW_STRINGS = os.getenv("ARROW_STRINGS", "false").lower() == "true"
+
+# Correlations - strong-pair threshold, how many pairs to return, and the widest
+# matrix embedded in the EDA stats (wider ones are served by /correlations)
+CORRELATION_THRESHOLD = float(os.getenv("CORRELATION_THRESHOLD", 0.5))
+CORRELATION_TOP_K = int(os.getenv("CORRELATION_TOP_K", 50))
+CORRELATION_MATRIX_MAX_COLUMNS = int(os.getenv("CORRELATION_MATRIX_MAX_COLUMNS", 50))
+CORRELATION_CACHE_MAX_MB = int(os.getenv("CORRELATION_CACHE_MAX_MB", 128))
+
+# Serving predictions - memory budget for loaded models, rows scored per batch
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", 256))
+PREDICT_BATCH_ROWS = int(os.getenv("PREDICT_BATCH_ROWS", 50_000))
+
+# Startup - import the analytics modules in the background right after startup
+# (instead of on the first request that needs them), and the import-time budget
+# benchmarks/bench_startup.py enforces for `import app.main`
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", 1500))
@@ -1,14 +1,52 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Text
+from sqlalchemy import create_engine, event, inspect, select, delete, Column, Integer, String, DateTime, Float, Text, Boolean, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy import func
 from datetime import datetime
 
-DATABASE_URL = "sqlite:///./dashboard.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from .config import DATABASE_URL, ASYNC_DATABASE_URL, DB_BUSY_TIMEOUT_MS, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+# Sync engine for startup migrations and the job manager's background threads
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine (aiosqlite) for request handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
+# expire_on_commit=False - attributes stay readable after commit without another await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def configure_sqlite(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings. WAL lets readers run while a job writes;
+    the busy timeout makes a writer wait for the lock instead of failing.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    # Safe with WAL - only the last commits can be lost on power failure, never corrupted
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    cursor.close()
+
 class Dataset(Base):
     __tablename__ = "datasets"
     
@@ -18,23 +56,31 @@ class Dataset(Base):
     upload_time = Column(DateTime, default=datetime.utcnow)
     rows = Column(Integer)
     columns = Column(Integer)
+    content_hash = Column(String, index=True)  # sha256 of the uploaded CSV
 
 class Analysis(Base):
     __tablename__ = "analyses"
     
     id = Column(Integer, primary_key=True, index=True)
-    dataset_id = Column(Integer)
-    analysis_time = Column(DateTime, default=datetime.utcnow)
+    dataset_id = Column(Integer, index=True)
+    analysis_time = Column(DateTime, default=datetime.utcnow, index=True)
     processing_time = Column(Float)
     summary = Column(Text)
     stats = Column(Text)
     type = Column(String, default="EDA")  # "EDA" or "ML Training"
+    stages = Column(Text)  # JSON {stage: seconds} - where processing_time went
+    
+    # Newest-first listings filtered by type or dataset (see /history)
+    __table_args__ = (
+        Index("ix_analyses_type_time", "type", "analysis_time"),
+        Index("ix_analyses_dataset_time", "dataset_id", "analysis_time"),
+    )
 
 class MLModel(Base):
     __tablename__ = "ml_models"
     
     id = Column(Integer, primary_key=True, index=True)
-    dataset_id = Column(Integer)
+    dataset_id = Column(Integer, index=True)
     model_name = Column(String, index=True)
     target_column = Column(String)
     model_type = Column(String)  # "regression" or "classification"
@@ -42,16 +88,149 @@ class MLModel(Base):
     score = Column(Float)
     feature_importance = Column(Text)  # JSON string
     model_path = Column(String)
+    pipeline_path = Column(String)  # fitted FeaturePipeline saved next to the model
     chart_path = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        Index("ix_ml_models_dataset_created", "dataset_id", "created_at"),
+    )
+
+class AnalysisCache(Base):
+    __tablename__ = "analysis_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True)  # "{content_hash}:{analysis_version}:{mode}:..." - see routes.analysis_cache_key
+    dataset_id = Column(Integer)  # dataset the result was first computed for
+    stats = Column(Text)
+    charts = Column(Text)  # JSON list of chart URLs
+    summary = Column(Text)
+    summary_failed = Column(Boolean, default=False)  # summary is an error message - regenerated on the next hit
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)  # "train", "train_batch" or "train_select"
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed, interrupted
+    progress = Column(Float, default=0.0)  # 0-100
+    message = Column(String)
+    params = Column(Text)  # JSON string
+    result = Column(Text)  # JSON string, set once completed
+    error = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    owner = Column(String)  # server process running it - see jobs.process_owner
+
+def add_column(conn, table_name, column_name):
+    """Add a model column to an existing table that predates it - no-op if it's there"""
+    table = Base.metadata.tables[table_name]
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    if column_name not in existing:
+        column_type = table.columns[column_name].type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {column_type}')
+
+def create_index(conn, table_name, index_name):
+    """Create one of a model's declared indexes unless it exists"""
+    index = next(index for index in Base.metadata.tables[table_name].indexes if index.name == index_name)
+    index.create(conn, checkfirst=True)
+
+class Rollup(Base):
+    """Running totals kept up to date on write, so /metrics never scans a table"""
+    __tablename__ = "rollups"
+    
+    key = Column(String, primary_key=True)  # "datasets" or "analyses:{type}"
+    count = Column(Integer, default=0)
+    total = Column(Float, default=0.0)  # summed processing_time for analyses
+
+class LatencyBucket(Base):
+    """Processing-time histogram per analysis type (bucket edges in rollups.py)"""
+    __tablename__ = "latency_buckets"
+    
+    type = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0)
+
+def backfill_rollups(conn):
+    """Rebuild the rollups from the existing rows - a one-off scan at migration time"""
+    from .rollups import latency_bucket
+    
+    conn.execute(delete(Rollup))
+    conn.execute(delete(LatencyBucket))
+    totals = {"datasets": [conn.execute(select(func.count()).select_from(Dataset)).scalar(), 0.0]}
+    buckets = {}
+    for analysis_type, processing_time in conn.execute(select(Analysis.type, Analysis.processing_time)):
+        analysis_type = analysis_type or "EDA"
+        entry = totals.setdefault(f"analyses:{analysis_type}", [0, 0.0])
+        entry[0] += 1
+        if processing_time is not None:
+            entry[1] += processing_time
+            key = (analysis_type, latency_bucket(processing_time))
+            buckets[key] = buckets.get(key, 0) + 1
+    
+    conn.execute(Rollup.__table__.insert(), [
+        {"key": key, "count": count, "total": total} for key, (count, total) in totals.items()
+    ])
+    if buckets:
+        conn.execute(LatencyBucket.__table__.insert(), [
+            {"type": analysis_type, "bucket": bucket, "count": count}
+            for (analysis_type, bucket), count in buckets.items()
+        ])
+
+# Schema changes in order - the database's PRAGMA user_version is how many have
+# been applied. Each step names what it adds and is safe to re-run: tables
+# created fresh by create_all already have everything, so the steps only do
+# work on databases from before them. Only ever append.
+
+def add_content_hash_and_pipeline_path(conn):
+    add_column(conn, "datasets", "content_hash")
+    add_column(conn, "ml_models", "pipeline_path")
+
+def index_listing_columns(conn):
+    """The columns /history and /models sort and join on"""
+    create_index(conn, "datasets", "ix_datasets_content_hash")
+    create_index(conn, "analyses", "ix_analyses_dataset_id")
+    create_index(conn, "analyses", "ix_analyses_analysis_time")
+    create_index(conn, "ml_models", "ix_ml_models_dataset_id")
+    create_index(conn, "ml_models", "ix_ml_models_created_at")
+
+def index_listing_filters(conn):
+    """Composite indexes for the type/dataset filters of /history and /models"""
+    create_index(conn, "analyses", "ix_analyses_type_time")
+    create_index(conn, "analyses", "ix_analyses_dataset_time")
+    create_index(conn, "ml_models", "ix_ml_models_dataset_created")
+
+def add_analysis_stages(conn):
+    add_column(conn, "analyses", "stages")
+
+def add_job_owner(conn):
+    add_column(conn, "jobs", "owner")
+
+def add_cache_summary_failed(conn):
+    add_column(conn, "analysis_cache", "summary_failed")
+
+MIGRATIONS = [
+    add_content_hash_and_pipeline_path,  # 1
+    index_listing_columns,               # 2
+    index_listing_filters,               # 3
+    backfill_rollups,                    # 4 - fills the rollup tables from existing rows
+    add_analysis_stages,                 # 5
+    add_job_owner,                       # 6
+    add_cache_summary_failed             # 7
+]
 
-# Recreate tables with new schema
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+def init_db():
+    """Create missing tables and bring an existing database up to date - never drops data"""
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            if number > version:
+                migration(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
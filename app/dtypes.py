@@ -0,0 +1,55 @@
+import importlib.util
+import numpy as np
+import pandas as pd
+
+from .config import DTYPE_OPTIMIZATION, CATEGORY_MAX_RATIO, ARROW_STRINGS
+
+# Column types treated as categorical everywhere (select_dtypes include list)
+CATEGORICAL_DTYPES = ['object', 'category', 'string']
+
+def downcast_numeric(series):
+    """Smallest int width that holds the values; float32 only when it's lossless"""
+    if pd.api.types.is_bool_dtype(series) or series.dtype.kind not in "iuf":
+        return series
+    if series.dtype.kind in "iu":
+        return pd.to_numeric(series, downcast="integer" if series.dtype.kind == "i" else "unsigned")
+    if series.dtype == np.float64:
+        narrowed = series.astype(np.float32)
+        if np.array_equal(narrowed.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+            return narrowed
+    return series
+
+def optimize_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO, arrow_strings=ARROW_STRINGS):
+    """
+    Shrink a freshly loaded DataFrame's columns to cheaper dtypes (in place).
+
+    Numbers get the narrowest width that holds them exactly, object columns
+    with few distinct values become `category`, and the remaining text can
+    move to Arrow-backed strings. Memory before/after is recorded in
+    df.attrs["memory_optimization"] for the EDA stats.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    use_arrow = arrow_strings and importlib.util.find_spec("pyarrow") is not None
+
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            present = series.dropna()
+            if len(present) and present.nunique() <= category_max_ratio * len(present):
+                df[col] = series.astype("category")
+            elif use_arrow and present.map(type).eq(str).all():
+                df[col] = series.astype("string[pyarrow]")
+        else:
+            df[col] = downcast_numeric(series)
+
+    after = int(df.memory_usage(deep=True).sum())
+    df.attrs["memory_optimization"] = {
+        "before_mb": float(round(before / 1024 / 1024, 2)),
+        "after_mb": float(round(after / 1024 / 1024, 2)),
+        "saved_pct": float(round((1 - after / before) * 100, 1)) if before else 0.0
+    }
+    return df
+
+def maybe_optimize_dtypes(df):
+    """optimize_dtypes unless DTYPE_OPTIMIZATION is switched off"""
+    return optimize_dtypes(df) if DTYPE_OPTIMIZATION else df
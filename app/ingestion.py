@@ -0,0 +1,75 @@
+import hashlib
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from .config import STATIC_DIR, UPLOAD_CHUNK_BYTES, CSV_CHUNK_ROWS
+
+async def save_upload(file, destination, chunk_size=UPLOAD_CHUNK_BYTES):
+    """
+    Stream an uploaded file to disk chunk by chunk.
+
+    Only one chunk is ever held in memory, and the disk writes happen in the
+    threadpool so the event loop keeps serving other requests meanwhile.
+    Returns the number of bytes written and the sha256 of the content.
+    """
+    total_bytes = 0
+    digest = hashlib.sha256()
+    with open(destination, "wb") as f:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            await run_in_threadpool(f.write, chunk)
+            digest.update(chunk)
+            total_bytes += len(chunk)
+    return total_bytes, digest.hexdigest()
+
+def chain_content_hash(previous_hash, appended_hash):
+    """Content hash of a dataset after appending a file with hash `appended_hash`"""
+    return hashlib.sha256(f"{previous_hash}:{appended_hash}".encode("utf-8")).hexdigest()
+
+def temp_upload_path():
+    """Scratch path for an upload that hasn't been assigned a dataset id yet"""
+    return os.path.join(STATIC_DIR, f"upload_{uuid.uuid4().hex}.csv.part")
+
+def merge_dtypes(current, incoming):
+    """Combine the dtypes pandas inferred for the same column in two chunks"""
+    if current == incoming:
+        return current
+    # Mixed ints/floats widen to float (an all-NaN chunk reads as float64 too)
+    if (pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(incoming)
+            and not pd.api.types.is_bool_dtype(current) and not pd.api.types.is_bool_dtype(incoming)):
+        return np.dtype("float64")
+    return np.dtype("object")
+
+def profile_csv(path, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Count rows/columns and infer the schema of a CSV without loading it whole.
+
+    Reads the file in chunks of `chunk_rows` rows, so peak memory depends on the
+    chunk size rather than the file size. The merged dtypes match what a full
+    pd.read_csv would infer for the same file.
+    """
+    rows = 0
+    columns = None
+    dtypes = {}
+
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, encoding="utf-8"):
+        if columns is None:
+            columns = [str(c) for c in chunk.columns]
+            dtypes = {str(k): v for k, v in chunk.dtypes.items()}
+        else:
+            for k, v in chunk.dtypes.items():
+                dtypes[str(k)] = merge_dtypes(dtypes[str(k)], v)
+        rows += len(chunk)
+
+    columns = columns or []
+    return {
+        "rows": rows,
+        "columns": len(columns),
+        "column_names": columns,
+        "dtypes": dtypes
+    }
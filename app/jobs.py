@@ -0,0 +1,212 @@
+import json
+import os
+import socket
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .config import TRAINING_MAX_CONCURRENCY
+from .database import SessionLocal, Job
+from .tasks import init_worker, clear_job_files
+
+def process_start_time(pid):
+    """When `pid` started, in clock ticks since boot - None where /proc isn't available"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name can hold spaces, so count fields from its closing paren
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def process_owner():
+    """
+    Identifies this server process on job rows and batch files:
+    host_pid_starttime. The start time tells a restarted server that reused
+    the pid (pid 1 in a container) from the process that owned the jobs.
+    """
+    pid = os.getpid()
+    return f"{socket.gethostname()}_{pid}_{process_start_time(pid) or 0}"
+
+def owner_alive(owner):
+    """Whether the server process `owner` is still running - other hosts' are assumed to be"""
+    try:
+        host, pid, start_time = owner.rsplit("_", 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return start_time == "0" or process_start_time(pid) == start_time
+
+class JobManager:
+    """
+    Runs CPU-heavy jobs in a process pool and tracks them in the jobs table.
+
+    The pool size is the concurrency limit - extra jobs wait in the queue.
+    Workers push progress updates through a multiprocessing queue which a
+    listener thread writes to SQLite, so GET /jobs/{id} can report them.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.owner = None
+        self.executor = None
+        self.progress_queue = None
+        self._listener = None
+
+    def start(self):
+        # spawn rather than fork - forking a process with live threads isn't safe
+        context = multiprocessing.get_context("spawn")
+        self.progress_queue = context.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(self.progress_queue,)
+        )
+        self.owner = process_owner()
+        self._reap_orphans()
+        self._listener = threading.Thread(target=self._listen_for_progress, daemon=True)
+        self._listener.start()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.progress_queue is not None:
+            self.progress_queue.put(None)
+
+    def submit(self, kind, params, fn, args, on_complete=None, on_finish=None):
+        """
+        Queue `fn(job_id, *args)` in the pool and return the new job id.
+
+        `on_complete(db, params, result)` runs in the API process once the job
+        succeeds and returns what gets stored as the job's result. Rows it adds
+        to `db` are committed in one transaction with the job's completion.
+        `on_finish(job_id)` runs after the job is recorded, whatever its outcome.
+        Writes the job row with a sync session - request handlers use enqueue().
+        """
+        db = SessionLocal()
+        try:
+            job = self._new_job(kind, params)
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        self._dispatch(job_id, params, fn, args, on_complete, on_finish)
+        return job_id
+
+    async def enqueue(self, db, kind, params, fn, args, on_complete=None, on_finish=None):
+        """
+        submit() for request handlers - the job row is written through the
+        request's AsyncSession, so queueing never blocks the event loop.
+        """
+        job = self._new_job(kind, params)
+        db.add(job)
+        await db.commit()
+        self._dispatch(job.id, params, fn, args, on_complete, on_finish)
+        return job.id
+
+    def _new_job(self, kind, params):
+        return Job(kind=kind, status="queued", progress=0.0, params=json.dumps(params), owner=self.owner)
+
+    def _dispatch(self, job_id, params, fn, args, on_complete, on_finish):
+        future = self.executor.submit(fn, job_id, *args)
+        future.add_done_callback(lambda f: self._finish(job_id, params, f, on_complete, on_finish))
+
+    def _finish(self, job_id, params, future, on_complete, on_finish=None):
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            try:
+                result = future.result()
+                if on_complete is not None:
+                    result = on_complete(db, params, result)
+                job.status = "completed"
+                job.progress = 100.0
+                job.message = "Done"
+                job.result = json.dumps(result, default=str)
+            except Exception as e:
+                db.rollback()
+                job = db.query(Job).filter(Job.id == job_id).first()
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            print(f"Job bookkeeping error for job {job_id}: {e}")
+        finally:
+            db.close()
+        if on_finish is not None:
+            try:
+                on_finish(job_id)
+            except Exception as e:
+                print(f"Job cleanup error for job {job_id}: {e}")
+
+    def _listen_for_progress(self):
+        while True:
+            update = self.progress_queue.get()
+            if update is None:
+                break
+            job_id, progress, message = update
+            db = SessionLocal()
+            try:
+                # Conditional updates so a late message can't reopen a finished job
+                db.query(Job).filter(Job.id == job_id, Job.status == "queued").update(
+                    {"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False
+                )
+                db.query(Job).filter(Job.id == job_id, Job.status.in_(["queued", "running"])).update(
+                    {"progress": float(progress), "message": message}, synchronize_session=False
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Job progress error for job {job_id}: {e}")
+            finally:
+                db.close()
+
+    def _reap_orphans(self):
+        """
+        Mark jobs whose server process is gone as interrupted and remove their
+        files. With several workers (or a rolling restart) sharing the
+        database, jobs still owned by a live process keep running.
+        """
+        db = SessionLocal()
+        try:
+            unfinished = db.query(Job.id, Job.owner).filter(Job.status.in_(["queued", "running"])).all()
+            orphaned = [job_id for job_id, owner in unfinished if not owner_alive(owner)]
+            if orphaned:
+                db.query(Job).filter(Job.id.in_(orphaned), Job.status.in_(["queued", "running"])).update(
+                    {"status": "interrupted", "error": "Server restarted before the job finished",
+                     "finished_at": datetime.utcnow()},
+                    synchronize_session=False
+                )
+                db.commit()
+        finally:
+            db.close()
+        clear_job_files(owner_alive, orphaned)
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "params": json.loads(job.params) if job.params else {},
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+job_manager = JobManager(max_workers=TRAINING_MAX_CONCURRENCY)
@@ -0,0 +1,48 @@
+"""
+Keyset pagination and field selection for the /history and /models listings.
+
+Pages are ordered newest first by (timestamp, id). The cursor carries the
+last row's key, so each page is an index range scan from that point - no
+OFFSET, and page 1000 costs the same as page 1.
+"""
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_fields(fields, allowed, default):
+    """Comma-separated field names -> list, checked against the listing's columns"""
+    if not fields:
+        return list(default)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return list(dict.fromkeys(requested))
+
+def keyset_query(stmt, time_column, id_column, cursor, limit):
+    """Newest-first page of `stmt` after `cursor` - one extra row tells whether there's a next page"""
+    if cursor:
+        stmt = stmt.where(tuple_(time_column, id_column) < tuple_(*decode_cursor(cursor)))
+    return stmt.order_by(time_column.desc(), id_column.desc()).limit(limit + 1)
+
+def page_result(rows, limit, formatters, fields):
+    """Rows (with cursor_time/cursor_id columns) -> (items, next_cursor)"""
+    items = []
+    for row in rows[:limit]:
+        mapping = row._mapping
+        items.append({field: formatters.get(field, lambda value: value)(mapping[field]) for field in fields})
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]._mapping
+        next_cursor = encode_cursor(last["cursor_time"], last["cursor_id"])
+    return items, next_cursor
@@ -1,51 +1,138 @@
+import asyncio
+import hashlib
+import importlib.util
 import httpx
-import json
 import os
 from dotenv import load_dotenv
 
+from .config import (
+    OPENROUTER_URL, LLM_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE,
+    LLM_MAX_RETRIES, LLM_BACKOFF_SECONDS, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+)
+from .cache import TTLCache
+
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+LLM_MODEL = "openai/gpt-3.5-turbo"
+
+# Responses worth retrying - rate limits and transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Completions for prompts we've already sent, keyed by normalized prompt hash
+completion_cache = TTLCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+
+# One pooled client for the whole app, opened/closed by the FastAPI lifespan
+_client = None
+
+def create_client():
+    return httpx.AsyncClient(
+        # HTTP/2 multiplexes requests over one keep-alive connection when h2 is installed
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE
+        ),
+        timeout=LLM_TIMEOUT_SECONDS
+    )
+
+async def start_client():
+    global _client
+    if _client is None:
+        _client = create_client()
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client():
+    """The shared client - created on first use when running outside the lifespan"""
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+def prompt_cache_key(prompt, model, max_tokens):
+    """Whitespace differences don't change the completion, so they don't change the key"""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(f"{model}|{max_tokens}|{normalized}".encode("utf-8")).hexdigest()
+
+def retry_delay(attempt, response=None):
+    """
+    Exponential backoff, or the server's Retry-After when it gives one in
+    seconds. None when Retry-After is longer than LLM_TIMEOUT_SECONDS - the
+    request is not worth holding open that long, so it is not retried.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= LLM_TIMEOUT_SECONDS else None
+    return min(LLM_BACKOFF_SECONDS * (2 ** attempt), LLM_TIMEOUT_SECONDS)
+
+def is_summary_error(summary):
+    """True when generate_summary returned an error message instead of a summary"""
+    return summary.startswith(("OpenRouter API key not configured", "Error generating summary", "Error connecting to OpenRouter"))
 
 async def generate_summary(stats_data):
     """Generate natural language summary using OpenRouter API"""
     if not OPENROUTER_API_KEY:
         return "OpenRouter API key not configured. Please set OPENROUTER_API_KEY in .env file."
-    
+
     prompt = f"""
     Analyze this dataset and provide a concise summary in plain English:
-    
+
     Dataset Info:
     - Shape: {stats_data.get('shape', 'Unknown')}
     - Columns: {', '.join(stats_data.get('columns', []))}
     - Missing values: {stats_data.get('missing_values', {})}
-    
+
     Provide insights about the data quality, key patterns, and recommendations in 2-3 sentences.
     """
-    
+
+    max_tokens = 200
+    cache_key = prompt_cache_key(prompt, LLM_MODEL, max_tokens)
+    cached = completion_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json"
     }
-    
+
     payload = {
-        "model": "openai/gpt-3.5-turbo",
+        "model": LLM_MODEL,
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": 200
+        "max_tokens": max_tokens
     }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(OPENROUTER_URL, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
+
+    client = get_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        last_attempt = attempt == LLM_MAX_RETRIES
+        try:
+            response = await client.post(OPENROUTER_URL, headers=headers, json=payload)
+        except httpx.TransportError as e:
+            if last_attempt:
+                return f"Error connecting to OpenRouter: {str(e)}"
+            await asyncio.sleep(retry_delay(attempt))
+            continue
+        except Exception as e:
+            return f"Error connecting to OpenRouter: {str(e)}"
+
+        if response.status_code == 200:
+            try:
                 result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                return f"Error generating summary: {response.status_code}"
-    
-    except Exception as e:
-        return f"Error connecting to OpenRouter: {str(e)}"
\ No newline at end of file
+                summary = result["choices"][0]["message"]["content"].strip()
+            except (ValueError, KeyError, IndexError) as e:
+                return f"Error generating summary: malformed response ({str(e)})"
+            completion_cache.put(cache_key, summary)
+            return summary
+
+        delay = None if last_attempt else retry_delay(attempt, response)
+        if response.status_code not in RETRY_STATUS_CODES or delay is None:
+            return f"Error generating summary: {response.status_code}"
+        await asyncio.sleep(delay)
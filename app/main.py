@@ -1,12 +1,41 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import router
+from .database import init_db
+from .jobs import job_manager
+from .workers import analysis_pool, chart_pool
+from .llm import start_client, close_client, completion_cache
+from .warmup import start_warm_up
+from .telemetry import RequestMetrics, render_metrics, CONTENT_TYPE
+from .cache import dataset_cache, correlation_cache, model_cache
+from .config import WARMUP_ON_STARTUP, STATIC_DIR
+
+@asynccontextmanager
+async def lifespan(app):
+    # Schema migrations, worker processes for background training jobs, pools
+    # for analysis requests, and the pooled HTTP client for OpenRouter
+    init_db()
+    job_manager.start()
+    analysis_pool.start()
+    chart_pool.start()
+    await start_client()
+    if WARMUP_ON_STARTUP:
+        start_warm_up()
+    yield
+    await close_client()
+    chart_pool.shutdown()
+    analysis_pool.shutdown()
+    job_manager.shutdown()
 
 app = FastAPI(
     title="AI-Powered Data Insights Dashboard",
     description="Backend API for data analysis and visualization",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,8 +47,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latency and in-flight gauge for GET /metrics
+app.add_middleware(RequestMetrics)
+
 # Static files for charts
-app.mount("/static", StaticFiles(directory="static"), name="static")
+os.makedirs(STATIC_DIR, exist_ok=True)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 # Include API routes
 app.include_router(router)
@@ -30,4 +63,16 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint - stage and request histograms, cache hit ratios, pools, RSS"""
+    caches = {
+        "dataset": dataset_cache,
+        "correlation": correlation_cache,
+        "model": model_cache,
+        "llm": completion_cache
+    }
+    pools = {"analysis": analysis_pool, "charts": chart_pool}
+    return Response(render_metrics(caches, pools), media_type=CONTENT_TYPE)
@@ -1,18 +1,37 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
+import matplotlib.style
+from matplotlib.figure import Figure
 import joblib
-import json
+import time
 from datetime import datetime
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import r2_score, accuracy_score
-from sklearn.preprocessing import LabelEncoder
 import os
 
+from .config import STATIC_DIR, PREDICT_BATCH_ROWS, TRAINING_N_JOBS, TRAINING_WARM_START_STEP
+from .cache import model_cache
+from .dtypes import CATEGORICAL_DTYPES
+from .storage import get_dataset
+from .telemetry import StageTimer
+
+def training_params(n_estimators=100, max_depth=None, max_samples=None, n_jobs=None,
+                    warm_start=False, warm_start_step=TRAINING_WARM_START_STEP):
+    """RandomForest settings for a training job, with defaults filled in"""
+    return {
+        "n_estimators": n_estimators,
+        "max_depth": max_depth,
+        "max_samples": max_samples,
+        # Never more cores than the machine has - the pool may run several jobs at once
+        "n_jobs": min(n_jobs or TRAINING_N_JOBS, os.cpu_count() or 1),
+        "warm_start": warm_start,
+        "warm_start_step": warm_start_step
+    }
+
 def determine_model_type(target_series):
     """Determine if target is numeric (regression) or categorical (classification)"""
     if pd.api.types.is_numeric_dtype(target_series):
@@ -33,20 +52,120 @@ def prepare_features(df, target_column):
     X = df.drop(columns=[target_column])
     y = df[target_column]
     
-    # Convert categorical features to numbers using LabelEncoder
-    # This assumes some ordering which isn't always true, but Random Forest handles it okay
-    categorical_cols = X.select_dtypes(include=['object']).columns
-    for col in categorical_cols:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col].astype(str))
+    pipeline = FeaturePipeline()
+    X = pipeline.fit_transform(X)
     
-    # Fill missing values with column mean - simple but works for most cases
-    # TODO: Could be smarter about this, but good enough for now
-    X = X.fillna(X.mean() if len(X.select_dtypes(include=[np.number]).columns) > 0 else 0)
-    
-    return X, y
+    return X, y, pipeline
+
+def prepare_shared_features(df, target_columns):
+    """
+    One feature matrix for training several targets on the same dataset.
+
+    Every column is encoded and mean-filled once. For a target with no
+    missing values, dropping its column from that matrix gives exactly what
+    prepare_features would have built, so those targets share it. Targets
+    with missing values drop rows, which changes the fill values - they
+    are left out and get prepared on their own.
+    """
+    shared = [col for col in target_columns if col in df.columns and df[col].notna().all()]
+    if not shared:
+        return None
+    pipeline = FeaturePipeline()
+    X = pipeline.fit_transform(df)
+    return {
+        "X": X.to_numpy(dtype=np.float64),
+        "columns": list(X.columns),
+        "pipeline": pipeline,
+        "targets": {col: df[col] for col in shared}
+    }
+
+def shared_features_for(shared, target_column):
+    """The (X, y, pipeline) prepare_features would give, cut from the shared matrix"""
+    columns = shared["columns"]
+    keep = [i for i, col in enumerate(columns) if col != target_column]
+    X = pd.DataFrame(shared["X"][:, keep], columns=[columns[i] for i in keep])
+    return X, shared["targets"][target_column], shared["pipeline"].without(target_column)
 
-def train_model(df, target_column, dataset_id):
+class FeaturePipeline:
+    """
+    The fitted feature transforms of one model: column order, label-encoding
+    classes, fill values and the target's classes.
+
+    Saved next to the model so scoring replays exactly what training did,
+    without touching the training data again.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.encoders = {}
+        self.fill_values = None
+        self.target_classes = None
+
+    def fit_transform(self, X):
+        self.columns = list(X.columns)
+        
+        # Convert categorical features to numbers using label encoding
+        # This assumes some ordering which isn't always true, but Random Forest handles it okay
+        categorical_cols = X.select_dtypes(include=CATEGORICAL_DTYPES).columns
+        self.encoders = {col: pd.Index(np.unique(as_text(X[col]))) for col in categorical_cols}
+        encoded = self._encode(X)
+        
+        # Fill missing values with column mean - simple but works for most cases
+        # TODO: Could be smarter about this, but good enough for now
+        self.fill_values = encoded.mean() if len(encoded.select_dtypes(include=[np.number]).columns) > 0 else 0
+        return encoded.fillna(self.fill_values)
+
+    def transform(self, X):
+        """Turn raw feature columns into the model's input matrix"""
+        missing = [col for col in self.columns if col not in X.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(map(str, missing))}")
+        X = self._encode(X)
+        # Text in a numeric feature (e.g. from JSON input) can't be scored - treat as missing
+        for col in X.columns:
+            if X[col].dtype == object:
+                X[col] = pd.to_numeric(X[col], errors="coerce")
+        return X.fillna(self.fill_values)
+
+    def _encode(self, X):
+        """Hash lookups into the training classes - unseen values become NaN (then mean-filled)"""
+        X = X[self.columns].copy()
+        for col, classes in self.encoders.items():
+            series = X[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Look up each category once instead of every row
+                lookup = np.append(classes.get_indexer(series.cat.categories.astype(str)), classes.get_indexer(["nan"]))
+                codes = lookup[series.cat.codes.to_numpy()]  # code -1 (missing) picks the "nan" entry
+            else:
+                codes = classes.get_indexer(as_text(series))
+            X[col] = codes if (codes >= 0).all() else np.where(codes >= 0, codes, np.nan)
+        return X
+
+    def fit_target(self, y):
+        """Label-encode a classification target (same codes as LabelEncoder)"""
+        self.target_classes, codes = np.unique(as_text(y), return_inverse=True)
+        return codes
+
+    def without(self, column):
+        """Copy of this pipeline with one feature column dropped"""
+        pipeline = FeaturePipeline()
+        pipeline.columns = [col for col in self.columns if col != column]
+        pipeline.encoders = {col: classes for col, classes in self.encoders.items() if col != column}
+        pipeline.fill_values = self.fill_values.drop(column) if isinstance(self.fill_values, pd.Series) else self.fill_values
+        return pipeline
+
+    def decode_target(self, predictions):
+        if self.target_classes is None:
+            return predictions
+        return self.target_classes[predictions.astype(int)]
+
+def as_text(series):
+    """Values as strings for label encoding - every kind of missing value is "nan" """
+    text = series.astype(str).to_numpy()
+    text[series.isna().to_numpy()] = "nan"
+    return text
+
+def train_model(df, target_column, dataset_id, params=None, on_round=None, timer=None):
     """
     Train ML model with simple algorithm selection.
     
@@ -66,130 +185,205 @@ def train_model(df, target_column, dataset_id):
             raise ValueError("Insufficient data after removing missing target values")
         
         # Prepare features
-        X, y = prepare_features(df_clean, target_column)
-        
-        # Simple logic: numeric target = regression, categorical = classification
-        model_type, algorithm = determine_model_type(y)
-        
-        # Handle categorical target for classification
-        if model_type == "classification":
-            le_target = LabelEncoder()
-            y_encoded = le_target.fit_transform(y.astype(str))
-        else:
-            y_encoded = y
-        
-        # I've found this works well in practice - 80% for training, 20% for testing
-        # Using random_state=42 so I get consistent results (makes debugging easier)
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y_encoded, test_size=0.2, random_state=42
-        )
-        
-        # I always start with Linear Regression for continuous targets
-        # It's interpretable - I can see exactly how each feature contributes
-        # Plus it's fast and serves as a good baseline to beat
-        if model_type == "regression":
-            model = LinearRegression()
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            score = r2_score(y_test, y_pred)
-            score_name = "R² Score"
-        else:
-            # Random Forest for classification because it handles complexity well
-            # Doesn't need feature scaling, handles mixed data types, robust to outliers
-            # The 100 trees is a good balance - more trees = better but slower
-            model = RandomForestClassifier(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            score = accuracy_score(y_test, y_pred)
-            score_name = "Accuracy"
-        
-        # Get feature importance and check if it's reliable
-        # This helps understand what drives predictions, but can be misleading
-        if hasattr(model, 'feature_importances_'):
-            importance = dict(zip(X.columns, model.feature_importances_))
-        elif hasattr(model, 'coef_'):
-            # For linear regression, use absolute coefficients
-            importance = dict(zip(X.columns, abs(model.coef_)))
-        else:
-            importance = {}
-        
-        # Sort by importance and check reliability
-        importance = dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
-        importance_warnings = analyze_feature_importance_reliability(importance, len(df_clean))
-        
-        # Generate model name
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        model_name = f"model_{dataset_id}_{target_column}_{timestamp}"
-        
-        # Save model
-        model_path = f"models/{model_name}.joblib"
-        joblib.dump(model, model_path)
-        
-        # Create feature importance plot
-        chart_path = create_importance_plot(importance, model_name, target_column)
-        
-        performance_result = get_performance_interpretation(score, model_type)
+        timer = timer or StageTimer()
+        with timer.stage("prepare"):
+            X, y, pipeline = prepare_features(df_clean, target_column)
         
-        return {
-            "model_name": model_name,
-            "model_type": model_type,
-            "algorithm": algorithm,
-            "score": float(round(score, 4)),
-            "score_name": score_name,
-            "feature_importance": importance,
-            "model_path": model_path,
-            "chart_path": chart_path,
-            "n_features": len(X.columns),
-            "n_samples": len(df_clean),
-            "train_test_split": "80/20",
-            "preprocessing_applied": ["categorical_encoding", "missing_value_imputation"],
-            "model_assumptions": get_model_assumptions(model_type),
-            "performance_interpretation": performance_result["interpretation"],
-            "trust_level": performance_result["trust_level"],
-            "performance_warnings": performance_result["warnings"],
-            "feature_importance_warnings": importance_warnings
-        }
+        return fit_model(X, y, pipeline, target_column, dataset_id, params, on_round, timer)
         
     except Exception as e:
         raise Exception(f"Model training failed: {str(e)}")
 
-def create_importance_plot(importance, model_name, target_column):
-    """Create feature importance visualization"""
-    if not importance:
-        return None
+def fit_model(X, y, pipeline, target_column, dataset_id, params=None, on_round=None, timer=None):
+    """
+    Fit, score and save a model on already-prepared features.
+
+    Split out of train_model so batch training can hand in a feature
+    matrix it prepared once for several targets. `params` are the
+    RandomForest settings (see training_params); `on_round` is passed to
+    grow_forest when they ask for warm-start training. The fit and save
+    times are added to `timer` and returned as the result's "stages".
+    """
+    params = params or training_params()
+    timer = timer or StageTimer()
+    score_history = None
+    # Simple logic: numeric target = regression, categorical = classification
+    model_type, algorithm = determine_model_type(y)
     
-    # Take top 10 features
-    top_features = dict(list(importance.items())[:10])
+    # Handle categorical target for classification
+    if model_type == "classification":
+        y_encoded = pipeline.fit_target(y)
+    else:
+        y_encoded = y
     
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(12, 8))
-    fig.patch.set_facecolor('#0a0a0a')
+    # I've found this works well in practice - 80% for training, 20% for testing
+    # Using random_state=42 so I get consistent results (makes debugging easier)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_encoded, test_size=0.2, random_state=42
+    )
     
-    features = list(top_features.keys())
-    importances = list(top_features.values())
+    # I always start with Linear Regression for continuous targets
+    # It's interpretable - I can see exactly how each feature contributes
+    # Plus it's fast and serves as a good baseline to beat
+    if model_type == "regression":
+        model = LinearRegression()
+        with timer.stage("fit"):
+            model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        score = r2_score(y_test, y_pred)
+        score_name = "R² Score"
+    else:
+        # Random Forest for classification because it handles complexity well
+        # Doesn't need feature scaling, handles mixed data types, robust to outliers
+        # The 100 trees is a good balance - more trees = better but slower
+        model = RandomForestClassifier(
+            n_estimators=params["n_estimators"],
+            max_depth=params["max_depth"],
+            max_samples=params["max_samples"],
+            n_jobs=params["n_jobs"],
+            random_state=42
+        )
+        with timer.stage("fit"):
+            if params["warm_start"]:
+                # Rounds are scored on a slice of the training split, so the test
+                # split behind the reported score plays no part in when to stop
+                X_fit, X_val, y_fit, y_val = train_test_split(
+                    X_train, y_train, test_size=0.2, random_state=42
+                )
+                score_history = grow_forest(model, X_fit, y_fit, X_val, y_val, params["warm_start_step"], on_round)
+            else:
+                model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        score = accuracy_score(y_test, y_pred)
+        score_name = "Accuracy"
     
-    # Create horizontal bar plot
-    colors = plt.cm.viridis(np.linspace(0, 1, len(features)))
-    bars = ax.barh(features, importances, color=colors, alpha=0.8)
+    with timer.stage("save"):
+        result = save_trained_model(model, X, pipeline, target_column, dataset_id, model_type, algorithm, score, score_name)
+    result["training_params"] = params if model_type == "classification" else {}
+    result["score_history"] = score_history
+    result["stages"] = timer.summary()
+    return result
+
+def save_trained_model(model, X, pipeline, target_column, dataset_id, model_type, algorithm, score, score_name,
+                       split="80/20"):
+    """Save a fitted model with its pipeline and importance chart, and describe it"""
+    # Get feature importance and check if it's reliable
+    # This helps understand what drives predictions, but can be misleading
+    if hasattr(model, 'feature_importances_'):
+        importance = dict(zip(X.columns, model.feature_importances_))
+    elif hasattr(model, 'coef_'):
+        # For linear models, use absolute coefficients (averaged over classes)
+        coef = np.abs(model.coef_)
+        importance = dict(zip(X.columns, coef.mean(axis=0) if coef.ndim > 1 else coef))
+    else:
+        importance = {}
     
-    # Customize plot
-    ax.set_xlabel('Feature Importance', fontsize=12, color='#ccc')
-    ax.set_title(f'Feature Importance: {target_column}', fontsize=16, fontweight='300', color='white', pad=20)
-    ax.grid(True, alpha=0.2, axis='x')
+    # Sort by importance and check reliability
+    importance = dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+    importance_warnings = analyze_feature_importance_reliability(importance, len(X))
     
-    # Add value labels
-    for bar, importance in zip(bars, importances):
-        width = bar.get_width()
-        ax.text(width + width*0.01, bar.get_y() + bar.get_height()/2,
-                f'{importance:.3f}', ha='left', va='center', fontsize=10, color='white')
+    # Generate model name
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    model_name = f"model_{dataset_id}_{target_column}_{timestamp}"
     
-    plt.tight_layout()
+    # Save model, and the preprocessing it expects next to it
+    model_path = f"models/{model_name}.joblib"
+    joblib.dump(model, model_path)
+    pipeline_path = f"models/{model_name}_pipeline.joblib"
+    joblib.dump(pipeline, pipeline_path)
     
-    # Save plot
-    chart_filename = f"feature_importance_{model_name}.png"
-    chart_path = f"static/{chart_filename}"
-    plt.savefig(chart_path, dpi=150, bbox_inches='tight', facecolor='#0a0a0a')
-    plt.close()
+    # Create feature importance plot
+    chart_path = create_importance_plot(importance, model_name, target_column)
+    
+    performance_result = get_performance_interpretation(score, model_type)
+    
+    return {
+        "model_name": model_name,
+        "model_type": model_type,
+        "algorithm": algorithm,
+        "score": float(round(score, 4)),
+        "score_name": score_name,
+        "feature_importance": importance,
+        "model_path": model_path,
+        "pipeline_path": pipeline_path,
+        "chart_path": chart_path,
+        "n_features": len(X.columns),
+        "n_samples": len(X),
+        "train_test_split": split,
+        "preprocessing_applied": ["categorical_encoding", "missing_value_imputation"],
+        "model_assumptions": get_model_assumptions(model_type),
+        "performance_interpretation": performance_result["interpretation"],
+        "trust_level": performance_result["trust_level"],
+        "performance_warnings": performance_result["warnings"],
+        "feature_importance_warnings": importance_warnings
+    }
+
+def grow_forest(model, X_train, y_train, X_val, y_val, step, on_round=None):
+    """
+    Fit a random forest `step` trees at a time, scoring on the validation
+    split after each round.
+
+    `on_round(n_trees, total, score)` can return True to stop growing - the
+    forest keeps the trees it has. With the same random_state the finished
+    forest is the same one a single fit would build.
+    """
+    total = model.n_estimators
+    model.set_params(warm_start=True)
+    history = []
+    start_time = time.time()
+    n_trees = 0
+    while n_trees < total:
+        n_trees = min(n_trees + step, total)
+        model.set_params(n_estimators=n_trees)
+        model.fit(X_train, y_train)
+        score = accuracy_score(y_val, model.predict(X_val))
+        history.append({
+            "n_estimators": n_trees,
+            "score": float(round(score, 4)),
+            "elapsed": round(time.time() - start_time, 3)
+        })
+        if on_round is not None and on_round(n_trees, total, score):
+            break
+    model.set_params(warm_start=False)
+    return history
+
+def create_importance_plot(importance, model_name, target_column):
+    """Create feature importance visualization"""
+    if not importance:
+        return None
+    
+    # Take top 10 features
+    top_features = dict(list(importance.items())[:10])
+    
+    with matplotlib.style.context('dark_background'):
+        fig = Figure(figsize=(12, 8))
+        fig.patch.set_facecolor('#0a0a0a')
+        ax = fig.subplots()
+        
+        features = list(top_features.keys())
+        importances = list(top_features.values())
+        
+        # Create horizontal bar plot
+        colors = matplotlib.colormaps['viridis'](np.linspace(0, 1, len(features)))
+        bars = ax.barh(features, importances, color=colors, alpha=0.8)
+        
+        # Customize plot
+        ax.set_xlabel('Feature Importance', fontsize=12, color='#ccc')
+        ax.set_title(f'Feature Importance: {target_column}', fontsize=16, fontweight='300', color='white', pad=20)
+        ax.grid(True, alpha=0.2, axis='x')
+        
+        # Add value labels
+        for bar, importance in zip(bars, importances):
+            width = bar.get_width()
+            ax.text(width + width*0.01, bar.get_y() + bar.get_height()/2,
+                    f'{importance:.3f}', ha='left', va='center', fontsize=10, color='white')
+        
+        fig.tight_layout()
+        
+        # Save plot
+        chart_filename = f"feature_importance_{model_name}.png"
+        chart_path = os.path.join(STATIC_DIR, chart_filename)
+        fig.savefig(chart_path, dpi=150, bbox_inches='tight', facecolor='#0a0a0a')
     
     return f"/static/{chart_filename}"
 
@@ -200,6 +394,62 @@ def load_model(model_path):
     except Exception as e:
         raise Exception(f"Failed to load model: {str(e)}")
 
+def get_predictor(model_path, pipeline_path, dataset_id, target_column):
+    """
+    A loaded model with its feature pipeline, cached while the files are unchanged.
+
+    Models trained before pipelines were saved get one re-fitted on their
+    training dataset, the same way train_model fitted it.
+    """
+    paths = [path for path in (model_path, pipeline_path) if path]
+    signature = tuple(os.path.getmtime(path) for path in paths)
+    predictor = model_cache.get(model_path, signature)
+    if predictor is not None:
+        return predictor
+    
+    model = load_model(model_path)
+    if pipeline_path:
+        pipeline = load_model(pipeline_path)
+    else:
+        pipeline = refit_pipeline(dataset_id, target_column, is_classifier(model))
+    
+    predictor = {
+        "model": model,
+        "pipeline": pipeline,
+        "nbytes": sum(os.path.getsize(path) for path in paths)
+    }
+    model_cache.put(model_path, predictor, signature)
+    return predictor
+
+def is_classifier(model):
+    return hasattr(model, "classes_")
+
+def refit_pipeline(dataset_id, target_column, classification):
+    """Rebuild a legacy model's pipeline from its training data"""
+    df = get_dataset(dataset_id)
+    if target_column not in df.columns:
+        raise ValueError(f"Training column '{target_column}' is no longer in the dataset")
+    df_clean = df.dropna(subset=[target_column])
+    _, y, pipeline = prepare_features(df_clean, target_column)
+    if classification:
+        pipeline.fit_target(y)
+    return pipeline
+
+def predict_frame(predictor, df):
+    """Predictions for a DataFrame of raw feature rows, as a list"""
+    pipeline = predictor["pipeline"]
+    predictions = predictor["model"].predict(pipeline.transform(df))
+    return pipeline.decode_target(predictions).tolist()
+
+def predict_csv(predictor, csv_path, batch_rows=PREDICT_BATCH_ROWS):
+    """Score a CSV in vectorized batches of `batch_rows` rows"""
+    # Encoded columns are read as text so values match the training strings
+    text_columns = {col: str for col in predictor["pipeline"].encoders}
+    predictions = []
+    for batch in pd.read_csv(csv_path, chunksize=batch_rows, dtype=text_columns, encoding="utf-8"):
+        predictions.extend(predict_frame(predictor, batch))
+    return predictions
+
 def get_performance_warnings(score, model_type):
     """Flag potential issues I've learned to watch out for"""
     warnings = []
@@ -0,0 +1,98 @@
+"""
+Rollup counters and latency histograms behind /metrics.
+
+Each write that adds a dataset or an analysis also runs the statements built
+here, in the same transaction, as atomic increments - so reading the
+metrics costs the same however many rows the tables hold.
+"""
+from bisect import bisect_left
+from sqlalchemy.dialects.sqlite import insert
+
+from .database import Rollup, LatencyBucket
+
+# Histogram bucket upper edges in seconds: 1ms to ~1h, each 2^(1/4) (~19%) wider
+# than the last, so a percentile read from a bucket is within ~9% of the truth
+LATENCY_BUCKET_EDGES = [0.001 * 2 ** (i / 4) for i in range(88)]
+
+def latency_bucket(seconds):
+    """Index of the bucket holding `seconds` (the last one collects everything slower)"""
+    return bisect_left(LATENCY_BUCKET_EDGES, seconds)
+
+def bucket_value(bucket):
+    """Representative latency of a bucket - the geometric middle of its edges"""
+    if bucket == 0:
+        return LATENCY_BUCKET_EDGES[0]
+    if bucket >= len(LATENCY_BUCKET_EDGES):
+        return LATENCY_BUCKET_EDGES[-1]
+    return (LATENCY_BUCKET_EDGES[bucket - 1] * LATENCY_BUCKET_EDGES[bucket]) ** 0.5
+
+def increment_rollup(key, count=1, total=0.0):
+    stmt = insert(Rollup).values(key=key, count=count, total=total)
+    return stmt.on_conflict_do_update(
+        index_elements=[Rollup.key],
+        set_={"count": Rollup.count + stmt.excluded.count, "total": Rollup.total + stmt.excluded.total}
+    )
+
+def increment_bucket(analysis_type, bucket):
+    stmt = insert(LatencyBucket).values(type=analysis_type, bucket=bucket, count=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[LatencyBucket.type, LatencyBucket.bucket],
+        set_={"count": LatencyBucket.count + 1}
+    )
+
+def dataset_added():
+    """Statements to run alongside inserting a Dataset"""
+    return [increment_rollup("datasets")]
+
+def analysis_recorded(analysis_type, processing_time):
+    """Statements to run alongside inserting an Analysis"""
+    return [
+        increment_rollup(f"analyses:{analysis_type}", 1, processing_time),
+        increment_bucket(analysis_type, latency_bucket(processing_time))
+    ]
+
+def percentile(buckets, q):
+    """Latency at quantile `q` from {bucket: count}"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen >= target:
+            return bucket_value(bucket)
+    return bucket_value(max(buckets))
+
+def summarize(rollups, buckets):
+    """
+    Metrics from the rollup rows: dataset/analysis totals, overall average
+    processing time and count/avg/p50/p95/p99 per analysis type.
+    """
+    totals = {rollup.key: rollup for rollup in rollups}
+    by_type = {}
+    for row in buckets:
+        by_type.setdefault(row.type, {})[row.bucket] = row.count
+
+    latency = {}
+    for key, rollup in totals.items():
+        if not key.startswith("analyses:"):
+            continue
+        analysis_type = key.split(":", 1)[1]
+        histogram = by_type.get(analysis_type, {})
+        latency[analysis_type] = {
+            "count": rollup.count,
+            "avg": round(rollup.total / rollup.count, 3) if rollup.count else 0,
+            "p50": round(percentile(histogram, 0.50) or 0, 3),
+            "p95": round(percentile(histogram, 0.95) or 0, 3),
+            "p99": round(percentile(histogram, 0.99) or 0, 3)
+        }
+
+    analyses = sum(stats["count"] for stats in latency.values())
+    total_time = sum(rollup.total for key, rollup in totals.items() if key.startswith("analyses:"))
+    return {
+        "total_datasets": totals["datasets"].count if "datasets" in totals else 0,
+        "total_analyses": analyses,
+        "avg_processing_time": round(total_time / analyses, 2) if analyses else 0,
+        "latency": latency
+    }
@@ -1,76 +1,294 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
-import pandas as pd
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Response, Query
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import io
 import json
+import os
+import threading
 import time
-from datetime import datetime
+from typing import List, Optional
 
-from .database import get_db, Dataset, Analysis, MLModel
-from .analysis import perform_eda, get_chart_data
-from .visualization import generate_charts
-from .llm import generate_summary
-from .ml import train_model
+from .database import get_db, Dataset, Analysis, MLModel, AnalysisCache, Job, Rollup, LatencyBucket
+from .rollups import dataset_added, analysis_recorded, summarize
+from .listing import parse_fields, keyset_query, page_result
+from .llm import generate_summary, is_summary_error, completion_cache
+from .cache import dataset_cache, correlation_cache, model_cache
+from .jobs import job_manager, job_to_dict
+from .tasks import (
+    run_training_job, run_batch_prepare_job, run_batch_training_job, batch_features_path, request_stop,
+    run_selection_job
+)
+from .workers import analysis_pool, chart_pool, PoolSaturated
+from .telemetry import StageTimer, observe_stages, analysis_cache_lookups
+from .config import (
+    STATIC_DIR, ANALYSIS_CACHE_MAX_ENTRIES, TRAINING_WARM_START_STEP, MODEL_SELECTION_FOLDS, MODEL_SELECTION_BUDGET_SECONDS
+)
+
+# The analytics modules (analysis, approximate, visualization, ml, storage,
+# ingestion - and with them pandas, scipy, matplotlib and scikit-learn) are
+# imported inside the handlers that use them, so starting the app and serving
+# /health, /history or /metrics doesn't load them. See app/warmup.py.
 
 router = APIRouter(prefix="/api/v1")
 
 @router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_dataset(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     """Upload CSV file and store metadata"""
+    from .ingestion import save_upload, temp_upload_path, profile_csv
+    from .storage import dataset_csv_path, write_columnar_store
+    
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are supported")
     
+    temp_path = temp_upload_path()
+    timer = StageTimer()
     try:
-        # Read CSV
-        content = await file.read()
-        df = pd.read_csv(pd.io.common.StringIO(content.decode('utf-8')))
+        # Stream the upload to disk, then profile it in chunks off the event loop
+        with timer.stage("receive"):
+            _, content_hash = await save_upload(file, temp_path)
+        with timer.stage("parse"):
+            profile = await run_in_threadpool(profile_csv, temp_path)
         
         # Store dataset metadata
         dataset = Dataset(
             name=file.filename.split('.')[0],
             filename=file.filename,
-            rows=int(len(df)),
-            columns=int(len(df.columns))
+            rows=profile["rows"],
+            columns=profile["columns"],
+            content_hash=content_hash
         )
-        db.add(dataset)
-        db.commit()
-        db.refresh(dataset)
+        with timer.stage("db_write"):
+            db.add(dataset)
+            for statement in dataset_added():
+                await db.execute(statement)
+            await db.commit()
+            await db.refresh(dataset)
         
-        # Save CSV file
-        with open(f"static/dataset_{dataset.id}.csv", "wb") as f:
-            f.write(content)
+        # Move the CSV into place under its dataset id (kept for download),
+        # then convert it once into the typed columnar store used for reads
+        os.replace(temp_path, dataset_csv_path(dataset.id))
+        try:
+            with timer.stage("columnar"):
+                await run_in_threadpool(write_columnar_store, dataset.id, profile["dtypes"])
+        except Exception as e:
+            # Not fatal - reads fall back to the CSV
+            print(f"Columnar conversion error: {e}")
+        observe_stages("upload", timer.stages)
         
         return {
             "dataset_id": dataset.id,
             "message": "Dataset uploaded successfully",
-            "rows": len(df),
-            "columns": len(df.columns)
+            "rows": profile["rows"],
+            "columns": profile["columns"]
         }
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
-@router.get("/analyze/{dataset_id}")
-async def analyze_dataset(dataset_id: int, db: Session = Depends(get_db)):
-    """Perform analysis on uploaded dataset"""
-    start_time = time.time()
+# Analysis modes - see eda_function for the implementation behind each
+EDA_MODES = ("exact", "approximate", "streaming")
+
+def eda_function(mode):
+    """The EDA implementation for an analysis mode - exact takes a frame, the others a dataset id"""
+    from .analysis import perform_eda
+    from .approximate import perform_eda_approximate, perform_eda_streaming
+    return {
+        "exact": perform_eda,
+        "approximate": perform_eda_approximate,
+        "streaming": perform_eda_streaming
+    }[mode]
+
+@router.post("/datasets/{dataset_id}/append")
+async def append_dataset_rows(dataset_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+    """
+    Append the rows of a CSV (same columns) to an existing dataset.
+
+    The streaming EDA stats are updated from the saved aggregates using just
+    the new rows and returned; the next /analyze recomputes the other modes.
+    """
+    from .ingestion import save_upload, temp_upload_path, profile_csv, chain_content_hash
+    from .approximate import append_rows
     
-    # Get dataset
-    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are supported")
+    
+    dataset = await db.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
+    temp_path = temp_upload_path()
     try:
-        # Load dataset
-        df = pd.read_csv(f"static/dataset_{dataset_id}.csv")
+        _, appended_hash = await save_upload(file, temp_path)
+        profile = await run_in_threadpool(profile_csv, temp_path)
+        if profile["rows"] == 0:
+            raise HTTPException(status_code=400, detail="No rows to append")
         
-        # Perform EDA
-        stats = perform_eda(df)
+        stats = await analysis_pool.run(append_rows, dataset_id, temp_path, profile["dtypes"])
         
-        # Generate charts
-        chart_urls = generate_charts(df, dataset_id)
+        # New content, new hash - results cached for the old content stop matching
+        dataset.rows = (dataset.rows or 0) + profile["rows"]
+        dataset.content_hash = chain_content_hash(dataset.content_hash, appended_hash)
+        await db.commit()
         
-        # Generate summary
-        summary = await generate_summary(stats)
+        return {
+            "dataset_id": dataset_id,
+            "appended_rows": profile["rows"],
+            "rows": dataset.rows,
+            "columns": dataset.columns,
+            "stats": stats
+        }
+    
+    except HTTPException:
+        raise
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=f"Server busy, try again shortly: {str(e)}",
+                            headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error appending to dataset: {str(e)}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def analysis_cache_key(dataset, chart_mode, mode="exact", correlation_method="pearson"):
+    """Results are reusable for identical content analyzed by the same code version"""
+    from .analysis import ANALYSIS_VERSION
+    
+    if not dataset.content_hash:
+        return None
+    return f"{dataset.content_hash}:{ANALYSIS_VERSION}:{mode}:{correlation_method}:{chart_mode}"
+
+async def prune_analysis_cache(db):
+    """Drop results of older analysis versions, and the oldest beyond ANALYSIS_CACHE_MAX_ENTRIES"""
+    from .analysis import ANALYSIS_VERSION
+    
+    # Keys are "{content_hash}:{version}:..." - see analysis_cache_key
+    await db.execute(delete(AnalysisCache).where(AnalysisCache.cache_key.not_like(f"%:{ANALYSIS_VERSION}:%")))
+    newest = select(AnalysisCache.id).order_by(AnalysisCache.id.desc()).limit(ANALYSIS_CACHE_MAX_ENTRIES)
+    await db.execute(delete(AnalysisCache).where(AnalysisCache.id.not_in(newest)))
+
+def charts_available(chart_urls):
+    """Cached chart URLs are only good while the PNGs are still on disk"""
+    return all(os.path.exists(os.path.join(STATIC_DIR, os.path.basename(url))) for url in chart_urls)
+
+async def render_charts_in_pool(chart_specs):
+    """Render each planned chart in its own chart-pool process, keeping their order"""
+    results = await asyncio.gather(
+        *(chart_pool.run(render, **kwargs) for render, kwargs in chart_specs),
+        return_exceptions=True
+    )
+    chart_urls = []
+    for result in results:
+        if isinstance(result, PoolSaturated):
+            raise result
+        if isinstance(result, Exception):
+            print(f"Chart generation error: {result}")
+        else:
+            chart_urls.append(result)
+    return chart_urls
+
+@router.get("/analyze/{dataset_id}")
+async def analyze_dataset(dataset_id: int, refresh: bool = False, chart_mode: str = "image",
+                          mode: str = "exact", correlation_method: str = "pearson",
+                          db: AsyncSession = Depends(get_db)):
+    """
+    Perform analysis on uploaded dataset (served from cache unless refresh=true).
+
+    chart_mode=image renders PNGs; chart_mode=data returns the aggregated plot
+    data (histogram bins, box-plot stats, category counts) for client-side charts.
+    mode=approximate computes the stats from streaming sketches and adds their
+    error bounds - much cheaper on very large datasets. mode=streaming gets
+    exact counts, category counts and correlations the same way and saves its
+    state for appends. Both read the stored dataset chunk by chunk and never
+    load it whole, for files larger than memory. correlation_method picks pearson or spearman (streaming mode
+    supports pearson only).
+    """
+    from .analysis import CORRELATION_METHODS
+    from .visualization import plan_charts, build_chart_data, chart_columns
+    from .storage import get_dataset
+    
+    if chart_mode not in ("image", "data"):
+        raise HTTPException(status_code=400, detail="chart_mode must be 'image' or 'data'")
+    if mode not in EDA_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(EDA_MODES)}")
+    if correlation_method not in CORRELATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"correlation_method must be one of: {', '.join(CORRELATION_METHODS)}")
+    if mode == "streaming" and correlation_method != "pearson":
+        raise HTTPException(status_code=400, detail="Streaming mode supports only pearson correlations")
+    
+    start_time = time.time()
+    timer = StageTimer()
+    
+    # Get dataset
+    dataset = await db.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    # Reuse a previous result for the same content and analysis version
+    cache_key = analysis_cache_key(dataset, chart_mode, mode, correlation_method)
+    if cache_key and not refresh:
+        with timer.stage("cache_lookup"):
+            cached = await db.scalar(select(AnalysisCache).where(AnalysisCache.cache_key == cache_key))
+            cache_hit = cached is not None and (chart_mode == "data" or charts_available(json.loads(cached.charts)))
+        analysis_cache_lookups.inc("hit" if cache_hit else "miss")
+        if cache_hit:
+            stats = json.loads(cached.stats)
+            summary = cached.summary
+            if cached.summary_failed:
+                # Only the summary failed last time - retry just that, not the whole analysis
+                with timer.stage("summary"):
+                    summary = await generate_summary(stats)
+                if not is_summary_error(summary):
+                    cached.summary = summary
+                    cached.summary_failed = False
+                    await db.commit()
+            observe_stages("analyze", timer.stages)
+            return {
+                "stats": stats,
+                "charts": json.loads(cached.charts),
+                "summary": summary,
+                "processing_time": time.time() - start_time,
+                "cached": True
+            }
+    
+    try:
+        # Load dataset and perform EDA in the analysis pool
+        if mode == "exact":
+            with timer.stage("load"):
+                df = await analysis_pool.run(get_dataset, dataset_id)
+            with timer.stage("eda"):
+                stats = await analysis_pool.run(eda_function(mode), df, correlation_method)
+            shape = None
+        else:
+            # Chunked modes read and compute in one pass - there's no separate load stage for the stats
+            with timer.stage("eda"):
+                stats = await analysis_pool.run(eda_function(mode), dataset_id, correlation_method)
+            # The charts only need their own columns, not the whole dataset
+            with timer.stage("load"):
+                df = await analysis_pool.run(get_dataset, dataset_id, chart_columns(stats))
+            shape = stats["shape"]
+        if chart_mode == "data":
+            # Aggregates only - nothing to render
+            with timer.stage("charts"):
+                chart_urls = await analysis_pool.run(build_chart_data, df, shape)
+            with timer.stage("summary"):
+                summary = await generate_summary(stats)
+        else:
+            with timer.stage("plan_charts"):
+                chart_specs = await analysis_pool.run(plan_charts, df, dataset_id, shape)
+            # Render the charts in parallel while the LLM writes the summary
+            charts_task = asyncio.create_task(timer.timed("charts", render_charts_in_pool(chart_specs)))
+            try:
+                with timer.stage("summary"):
+                    summary = await generate_summary(stats)
+            finally:
+                chart_urls = await charts_task
         
         # Calculate processing time
         processing_time = time.time() - start_time
@@ -81,161 +299,601 @@ async def analyze_dataset(dataset_id: int, db: Session = Depends(get_db)):
         except:
             stats_json = json.dumps({"error": "Stats serialization failed"})
         
-        analysis = Analysis(
-            dataset_id=dataset_id,
-            processing_time=processing_time,
-            summary=summary,
-            stats=stats_json,
-            type="EDA"
-        )
-        db.add(analysis)
-        db.commit()
+        # The stored breakdown can't include the write that stores it - the
+        # histograms and the response do
+        with timer.stage("db_write"):
+            analysis = Analysis(
+                dataset_id=dataset_id,
+                processing_time=processing_time,
+                summary=summary,
+                stats=stats_json,
+                stages=json.dumps(timer.summary()),
+                type="EDA"
+            )
+            db.add(analysis)
+            for statement in analysis_recorded("EDA", processing_time):
+                await db.execute(statement)
+            
+            # Remember the result unless the EDA itself failed. A failed summary
+            # is flagged, so the next hit retries just the summary
+            if cache_key and "error" not in stats:
+                await db.execute(delete(AnalysisCache).where(AnalysisCache.cache_key == cache_key))
+                db.add(AnalysisCache(
+                    cache_key=cache_key,
+                    dataset_id=dataset_id,
+                    stats=stats_json,
+                    charts=json.dumps(chart_urls),
+                    summary=summary,
+                    summary_failed=is_summary_error(summary)
+                ))
+                await db.flush()
+                await prune_analysis_cache(db)
+            await db.commit()
+        observe_stages("analyze", timer.stages)
         
         return {
             "stats": stats,
             "charts": chart_urls,
             "summary": summary,
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "stages": timer.summary(),
+            "cached": False
         }
     
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=f"Server busy, try again shortly: {str(e)}",
+                            headers={"Retry-After": "5"})
     except Exception as e:
         import traceback
         print(f"Analysis error: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error analyzing dataset: {str(e)}")
 
+@router.get("/analyze/{dataset_id}/correlations")
+async def get_dataset_correlations(dataset_id: int, method: str = "pearson", offset: int = 0, limit: int = 100,
+                                   format: str = "json", db: AsyncSession = Depends(get_db)):
+    """
+    Full correlation matrix of the numeric columns, for datasets too wide to embed it in the stats.
+
+    format=json returns `limit` rows starting at `offset`; format=npz returns
+    the whole matrix as a float32 NumPy archive (arrays "matrix" and "columns").
+    """
+    import numpy as np
+    from .analysis import CORRELATION_METHODS
+    from .storage import get_correlations
+    
+    if method not in CORRELATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of: {', '.join(CORRELATION_METHODS)}")
+    if format not in ("json", "npz"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'npz'")
+    if offset < 0 or limit < 1:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1")
+    
+    dataset = await db.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    try:
+        columns, matrix = await analysis_pool.run(get_correlations, dataset_id, method)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=f"Server busy, try again shortly: {str(e)}",
+                            headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing correlations: {str(e)}")
+    
+    if format == "npz":
+        buffer = io.BytesIO()
+        np.savez(buffer, matrix=matrix, columns=np.array(columns, dtype=str))
+        return Response(
+            content=buffer.getvalue(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="correlations_{dataset_id}_{method}.npz"'}
+        )
+    
+    rows = np.round(np.nan_to_num(matrix[offset:offset + limit].astype(np.float64), nan=0.0), 6).tolist()
+    return {
+        "method": method,
+        "columns": columns,
+        "total": len(columns),
+        "offset": offset,
+        "limit": limit,
+        "rows": dict(zip(columns[offset:offset + limit], rows))
+    }
+
+# Columns each listing can return (`fields=`), and the ones it returns by default
+HISTORY_FIELDS = {
+    "id": Analysis.id,
+    "dataset_id": Analysis.dataset_id,
+    "dataset_name": Dataset.name,
+    "type": Analysis.type,
+    "timestamp": Analysis.analysis_time,
+    "summary": Analysis.summary,
+    "processing_time": Analysis.processing_time,
+    "stats": Analysis.stats,
+    "stages": Analysis.stages
+}
+HISTORY_DEFAULT_FIELDS = ["dataset_name", "timestamp", "summary", "processing_time"]
+
+MODEL_FIELDS = {
+    "id": MLModel.id,
+    "model_name": MLModel.model_name,
+    "dataset_id": MLModel.dataset_id,
+    "dataset_name": Dataset.name,
+    "target_column": MLModel.target_column,
+    "model_type": MLModel.model_type,
+    "algorithm": MLModel.algorithm,
+    "score": MLModel.score,
+    "feature_importance": MLModel.feature_importance,
+    "chart_url": MLModel.chart_path,
+    "created_at": MLModel.created_at
+}
+MODEL_DEFAULT_FIELDS = [
+    "id", "model_name", "dataset_name", "target_column", "model_type", "algorithm",
+    "score", "feature_importance", "chart_url", "created_at"
+]
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+def json_or_empty(value):
+    return json.loads(value) if value else {}
+
+LISTING_FORMATTERS = {
+    "timestamp": isoformat,
+    "created_at": isoformat,
+    "stats": json_or_empty,
+    "stages": json_or_empty,
+    "feature_importance": json_or_empty
+}
+
+def listing_query(columns, fields, time_column, id_column, join_dataset_on=None):
+    """SELECT of just the requested columns, plus the keyset columns the cursor needs"""
+    stmt = select(
+        time_column.label("cursor_time"), id_column.label("cursor_id"),
+        *[columns[field].label(field) for field in fields]
+    )
+    if "dataset_name" in fields:
+        stmt = stmt.join(Dataset, join_dataset_on == Dataset.id)
+    return stmt
+
 @router.get("/history")
-async def get_analysis_history(db: Session = Depends(get_db)):
-    """Get last 10 analyses"""
-    analyses = db.query(Analysis, Dataset).join(Dataset, Analysis.dataset_id == Dataset.id).order_by(Analysis.analysis_time.desc()).limit(10).all()
-    
-    history = []
-    for analysis, dataset in analyses:
-        history.append({
-            "dataset_name": dataset.name,
-            "timestamp": analysis.analysis_time.isoformat(),
-            "summary": analysis.summary,
-            "processing_time": analysis.processing_time
-        })
+async def get_analysis_history(
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = None,
+    analysis_type: Optional[str] = Query(None, alias="type"),
+    dataset_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Analyses, newest first, a page at a time.
+
+    Pass the response's next_cursor back as `cursor` for the next page;
+    `fields` is a comma-separated subset of the columns to return.
+    """
+    try:
+        selected = parse_fields(fields, HISTORY_FIELDS, HISTORY_DEFAULT_FIELDS)
+        stmt = listing_query(HISTORY_FIELDS, selected, Analysis.analysis_time, Analysis.id, Analysis.dataset_id)
+        if analysis_type is not None:
+            stmt = stmt.where(Analysis.type == analysis_type)
+        if dataset_id is not None:
+            stmt = stmt.where(Analysis.dataset_id == dataset_id)
+        stmt = keyset_query(stmt, Analysis.analysis_time, Analysis.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"history": history}
+    rows = (await db.execute(stmt)).all()
+    history, next_cursor = page_result(rows, limit, LISTING_FORMATTERS, selected)
+    return {"history": history, "next_cursor": next_cursor}
 
 @router.get("/metrics")
-async def get_system_metrics(db: Session = Depends(get_db)):
-    """Get system metrics"""
-    total_datasets = db.query(Dataset).count()
-    total_analyses = db.query(Analysis).count()
+async def get_system_metrics(db: AsyncSession = Depends(get_db)):
+    """Get system metrics - read from the rollups, so the cost doesn't grow with the tables"""
+    rollups = (await db.execute(select(Rollup))).scalars().all()
+    buckets = (await db.execute(select(LatencyBucket))).scalars().all()
     
-    from sqlalchemy import func
-    avg_processing_time = db.query(func.avg(Analysis.processing_time)).scalar() or 0
+    return {
+        **summarize(rollups, buckets),
+        "dataset_cache": dataset_cache.stats(),
+        "correlation_cache": correlation_cache.stats(),
+        "model_cache": model_cache.stats(),
+        "llm_cache": completion_cache.stats(),
+        "worker_pools": {"analysis": analysis_pool.stats(), "charts": chart_pool.stats()}
+    }
+
+def store_training_result(db, params, result):
+    """Persist a finished training job - runs in the API process when the job completes"""
+    dataset_id = params["dataset_id"]
+    target_column = params["target_column"]
+    processing_time = result["processing_time"]
+    # Timed in the worker - the API process owns the histograms
+    stages = result.get("stages") or {}
+    observe_stages("train", stages)
+    
+    # Store model metadata
+    ml_model = MLModel(
+        dataset_id=dataset_id,
+        model_name=result["model_name"],
+        target_column=target_column,
+        model_type=result["model_type"],
+        algorithm=result["algorithm"],
+        score=result["score"],
+        feature_importance=json.dumps(result["feature_importance"]),
+        model_path=result["model_path"],
+        pipeline_path=result["pipeline_path"],
+        chart_path=result["chart_path"]
+    )
+    db.add(ml_model)
+    
+    # Log training in analysis history
+    analysis = Analysis(
+        dataset_id=dataset_id,
+        processing_time=processing_time,
+        summary=f"Trained {result['algorithm']} model for {target_column}. {result['score_name']}: {result['score']:.4f}",
+        stats=json.dumps({
+            "model_type": result["model_type"],
+            "algorithm": result["algorithm"],
+            "score": result["score"],
+            "n_features": result["n_features"],
+            "n_samples": result["n_samples"],
+            "training_params": result["training_params"]
+        }),
+        stages=json.dumps(stages),
+        type="ML Training"
+    )
+    db.add(analysis)
+    for statement in analysis_recorded("ML Training", processing_time):
+        db.execute(statement)
+    # No commit here - the job manager commits these rows together with the job's status
     
     return {
-        "total_datasets": total_datasets,
-        "total_analyses": total_analyses,
-        "avg_processing_time": round(avg_processing_time, 2)
+        "model_name": result["model_name"],
+        "model_type": result["model_type"],
+        "algorithm": result["algorithm"],
+        "score": result["score"],
+        "score_name": result["score_name"],
+        "feature_importance": result["feature_importance"],
+        "chart_url": result["chart_path"],
+        "processing_time": processing_time,
+        "data_split": result["train_test_split"],
+        "preprocessing": result["preprocessing_applied"],
+        "assumptions": result["model_assumptions"],
+        "interpretation": result["performance_interpretation"],
+        "trust_level": result["trust_level"],
+        "warnings": result["performance_warnings"] + result["feature_importance_warnings"],
+        "training_params": result["training_params"],
+        "score_history": result["score_history"],
+        "leaderboard": result.get("leaderboard"),
+        "stages": stages
     }
 
+def training_options(
+    n_estimators: int = Query(100, ge=1, le=5000),
+    max_depth: Optional[int] = Query(None, ge=1),
+    max_samples: Optional[float] = Query(None, gt=0, le=1),
+    n_jobs: Optional[int] = Query(None, ge=1),
+    warm_start: bool = False,
+    warm_start_step: int = Query(TRAINING_WARM_START_STEP, ge=1)
+):
+    """RandomForest settings accepted by the training endpoints"""
+    from .ml import training_params
+    return training_params(n_estimators, max_depth, max_samples, n_jobs, warm_start, warm_start_step)
+
+def target_model_types(dataset_id, target_columns, csv_path=None):
+    """
+    The model type train_model will pick for each target (None if the column
+    is missing), read from the stored schema or from the replacement CSV.
+    """
+    from .storage import has_columnar_store, stored_dtypes, dataset_csv_path
+    from .ingestion import profile_csv
+    import pandas as pd
+    if csv_path:
+        dtypes = profile_csv(csv_path)["dtypes"]
+    elif has_columnar_store(dataset_id):
+        dtypes = stored_dtypes(dataset_id)
+    else:
+        dtypes = profile_csv(dataset_csv_path(dataset_id))["dtypes"]
+    return {
+        col: None if col not in dtypes else
+        "regression" if pd.api.types.is_numeric_dtype(dtypes[col]) else "classification"
+        for col in target_columns
+    }
+
+def check_warm_start(options, model_types):
+    """Warm start grows a RandomForest - numeric targets fit a LinearRegression, which has no rounds"""
+    numeric = [col for col, model_type in model_types.items() if model_type == "regression"]
+    if options["warm_start"] and numeric:
+        raise HTTPException(
+            status_code=400,
+            detail=f"warm_start applies to classification targets only - numeric: {', '.join(numeric)}"
+        )
+
 @router.post("/train")
 async def train_ml_model(
     dataset_id: int, 
     target_column: str, 
     file: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    options: dict = Depends(training_options),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Train ML model on dataset"""
-    start_time = time.time()
+    """Queue ML model training - poll GET /jobs/{job_id} for progress and the result"""
+    from .ingestion import save_upload, temp_upload_path
     
     # Get dataset
-    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    dataset = await db.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     try:
-        # Load dataset - either from file upload or existing dataset
+        # A replacement CSV is streamed to disk and handed to the worker by path
+        csv_path = None
         if file:
-            # Handle new file upload
-            content = await file.read()
-            df = pd.read_csv(pd.io.common.StringIO(content.decode('utf-8')))
-        else:
-            # Use existing dataset
-            df = pd.read_csv(f"static/dataset_{dataset_id}.csv")
+            csv_path = temp_upload_path()
+            timer = StageTimer()
+            with timer.stage("receive"):
+                await save_upload(file, csv_path)
+            observe_stages("train", timer.stages)
         
-        # Train model
-        result = train_model(df, target_column, dataset_id)
+        model_types = await run_in_threadpool(target_model_types, dataset_id, [target_column], csv_path)
+        check_warm_start(options, model_types)
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        params = {"dataset_id": dataset_id, "target_column": target_column, "training_params": options,
+                  "model_type": model_types[target_column]}
+        job_id = await job_manager.enqueue(
+            db, "train", params, run_training_job, (dataset_id, target_column, csv_path, options),
+            on_complete=store_training_result
+        )
+        
+        return {
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v1/jobs/{job_id}"
+        }
+        
+    except Exception as e:
+        # Not queued - the worker won't be there to remove the upload
+        if csv_path and os.path.exists(csv_path):
+            os.remove(csv_path)
+        if isinstance(e, HTTPException):
+            raise
+        if csv_path and isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=f"Could not read the uploaded CSV: {str(e)}")
+        import traceback
+        print(f"ML training error: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error queueing training: {str(e)}")
+
+@router.post("/train/select")
+async def select_ml_model(
+    dataset_id: int,
+    target_column: str,
+    folds: int = Query(MODEL_SELECTION_FOLDS, ge=2, le=20),
+    budget_seconds: int = Query(MODEL_SELECTION_BUDGET_SECONDS, ge=1),
+    options: dict = Depends(training_options),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue cross-validated model selection - Ridge, HistGradientBoosting and
+    RandomForest are compared and the winner is stored like a trained model.
+    """
+    dataset = await db.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    try:
+        params = {
+            "dataset_id": dataset_id, "target_column": target_column, "folds": folds,
+            "budget_seconds": budget_seconds, "training_params": options
+        }
+        job_id = await job_manager.enqueue(
+            db, "train_select", params, run_selection_job, (dataset_id, target_column, folds, budget_seconds, options),
+            on_complete=store_training_result
+        )
         
-        # Store model metadata
-        ml_model = MLModel(
-            dataset_id=dataset_id,
-            model_name=result["model_name"],
-            target_column=target_column,
-            model_type=result["model_type"],
-            algorithm=result["algorithm"],
-            score=result["score"],
-            feature_importance=json.dumps(result["feature_importance"]),
-            model_path=result["model_path"],
-            chart_path=result["chart_path"]
+        return {
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v1/jobs/{job_id}"
+        }
+        
+    except Exception as e:
+        import traceback
+        print(f"Model selection error: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error queueing model selection: {str(e)}")
+
+def remove_after_jobs(path, count):
+    """on_finish callback that deletes `path` once `count` jobs have finished"""
+    remaining = [count]
+    lock = threading.Lock()
+    def on_finish(job_id):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and os.path.exists(path):
+            os.remove(path)
+    return on_finish
+
+def start_batch_fits(db, params, result):
+    """Fan a prepared batch out into one training job per target - runs in the API process"""
+    dataset_id = params["dataset_id"]
+    features_path = result["features_path"]
+    shared_targets = set(result["shared_targets"])
+    on_finish = remove_after_jobs(features_path, len(shared_targets)) if features_path else None
+    
+    jobs = []
+    options = params["training_params"]
+    for target_column in params["target_columns"]:
+        shared = target_column in shared_targets
+        job_id = job_manager.submit(
+            "train", {"dataset_id": dataset_id, "target_column": target_column, "training_params": options},
+            run_batch_training_job, (dataset_id, target_column, features_path if shared else None, options),
+            on_complete=store_training_result, on_finish=on_finish if shared else None
         )
-        db.add(ml_model)
-        
-        # Log training in analysis history
-        analysis = Analysis(
-            dataset_id=dataset_id,
-            processing_time=processing_time,
-            summary=f"Trained {result['algorithm']} model for {target_column}. {result['score_name']}: {result['score']:.4f}",
-            stats=json.dumps({
-                "model_type": result["model_type"],
-                "algorithm": result["algorithm"],
-                "score": result["score"],
-                "n_features": result["n_features"],
-                "n_samples": result["n_samples"]
-            }),
-            type="ML Training"
+        jobs.append({
+            "target_column": target_column,
+            "job_id": job_id,
+            "shared_features": shared,
+            "status_url": f"/api/v1/jobs/{job_id}"
+        })
+    return {"jobs": jobs}
+
+@router.post("/train/batch")
+async def train_ml_models_batch(
+    dataset_id: int,
+    target_columns: List[str] = Query(...),
+    options: dict = Depends(training_options),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue training for several target columns of one dataset.
+
+    The dataset is loaded and encoded once; when that finishes the batch job's
+    result lists one training job per target, each storing its model as it completes.
+    """
+    dataset = await db.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    target_columns = list(dict.fromkeys(target_columns))
+    try:
+        if options["warm_start"]:
+            check_warm_start(options, await run_in_threadpool(target_model_types, dataset_id, target_columns))
+        params = {"dataset_id": dataset_id, "target_columns": target_columns, "training_params": options}
+        job_id = await job_manager.enqueue(
+            db, "train_batch", params, run_batch_prepare_job,
+            (dataset_id, target_columns, batch_features_path(job_manager.owner)),
+            on_complete=start_batch_fits
         )
-        db.add(analysis)
-        db.commit()
         
         return {
-            "model_name": result["model_name"],
-            "model_type": result["model_type"],
-            "algorithm": result["algorithm"],
-            "score": result["score"],
-            "score_name": result["score_name"],
-            "feature_importance": result["feature_importance"],
-            "chart_url": result["chart_path"],
-            "processing_time": processing_time,
-            "data_split": result["train_test_split"],
-            "preprocessing": result["preprocessing_applied"],
-            "assumptions": result["model_assumptions"],
-            "interpretation": result["performance_interpretation"],
-            "trust_level": result["trust_level"],
-            "warnings": result["performance_warnings"] + result["feature_importance_warnings"]
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v1/jobs/{job_id}"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
-        print(f"ML training error: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Error training model: {str(e)}")
+        print(f"ML batch training error: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error queueing training: {str(e)}")
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Status, progress and (once completed) the result of a background job"""
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+@router.post("/jobs/{job_id}/stop")
+async def stop_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Stop a warm-start training job early - it saves the forest grown so far"""
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    params = json.loads(job.params) if job.params else {}
+    if job.kind != "train" or not params.get("training_params", {}).get("warm_start"):
+        raise HTTPException(status_code=400, detail="Only warm-start training jobs can be stopped early")
+    if params.get("model_type") == "regression":
+        raise HTTPException(
+            status_code=409,
+            detail="Numeric targets train a LinearRegression in one step - there are no rounds to stop"
+        )
+    if job.status not in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    request_stop(job_id)
+    return {"job_id": job_id, "stop_requested": True}
 
 @router.get("/models")
-async def get_ml_models(db: Session = Depends(get_db)):
-    """Get all trained models metadata"""
-    models = db.query(MLModel, Dataset).join(Dataset, MLModel.dataset_id == Dataset.id).order_by(MLModel.created_at.desc()).all()
-    
-    model_list = []
-    for ml_model, dataset in models:
-        model_list.append({
-            "id": ml_model.id,
+async def get_ml_models(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    dataset_id: Optional[int] = None,
+    target_column: Optional[str] = None,
+    model_type: Optional[str] = None,
+    algorithm: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Trained models metadata, newest first - paginated and filterable like /history"""
+    try:
+        selected = parse_fields(fields, MODEL_FIELDS, MODEL_DEFAULT_FIELDS)
+        stmt = listing_query(MODEL_FIELDS, selected, MLModel.created_at, MLModel.id, MLModel.dataset_id)
+        for column, value in ((MLModel.dataset_id, dataset_id), (MLModel.target_column, target_column),
+                              (MLModel.model_type, model_type), (MLModel.algorithm, algorithm)):
+            if value is not None:
+                stmt = stmt.where(column == value)
+        stmt = keyset_query(stmt, MLModel.created_at, MLModel.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = (await db.execute(stmt)).all()
+    models, next_cursor = page_result(rows, limit, LISTING_FORMATTERS, selected)
+    return {"models": models, "next_cursor": next_cursor}
+
+@router.post("/models/{model_id}/predict")
+async def predict_with_model(model_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Score rows with a trained model.
+
+    Send either JSON {"rows": [{column: value, ...}, ...]} or a multipart CSV
+    upload in `file`. CSVs are streamed to disk and scored in batches.
+    """
+    import pandas as pd
+    from .ingestion import save_upload, temp_upload_path
+    from .ml import get_predictor, predict_frame, predict_csv
+    
+    ml_model = await db.get(MLModel, model_id)
+    if not ml_model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    temp_path = None
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            file = form.get("file")
+            if file is None or not hasattr(file, "filename"):
+                raise HTTPException(status_code=400, detail="Upload a CSV in the 'file' field")
+            temp_path = temp_upload_path()
+            await save_upload(file, temp_path)
+        else:
+            try:
+                body = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Body must be JSON or a multipart CSV upload")
+            rows = body.get("rows") if isinstance(body, dict) else None
+            if not isinstance(rows, list) or not rows:
+                raise HTTPException(status_code=400, detail="JSON body must contain a non-empty 'rows' list")
+        
+        predictor = await analysis_pool.run(
+            get_predictor, ml_model.model_path, ml_model.pipeline_path, ml_model.dataset_id, ml_model.target_column
+        )
+        
+        start_time = time.time()
+        if temp_path:
+            predictions = await analysis_pool.run(predict_csv, predictor, temp_path)
+        else:
+            predictions = await analysis_pool.run(predict_frame, predictor, pd.DataFrame(rows))
+        processing_time = time.time() - start_time
+        
+        return {
+            "model_id": model_id,
             "model_name": ml_model.model_name,
-            "dataset_name": dataset.name,
             "target_column": ml_model.target_column,
-            "model_type": ml_model.model_type,
-            "algorithm": ml_model.algorithm,
-            "score": ml_model.score,
-            "feature_importance": json.loads(ml_model.feature_importance) if ml_model.feature_importance else {},
-            "chart_url": ml_model.chart_path,
-            "created_at": ml_model.created_at.isoformat()
-        })
+            "predictions": predictions,
+            "rows": len(predictions),
+            "processing_time": processing_time,
+            "rows_per_second": round(len(predictions) / processing_time, 1) if processing_time > 0 else None
+        }
     
-    return {"models": model_list}
\ No newline at end of file
+    except HTTPException:
+        raise
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=f"Server busy, try again shortly: {str(e)}",
+                            headers={"Retry-After": "5"})
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,217 @@
+"""
+Cross-validated model selection.
+
+Several candidate estimators are scored under k-fold CV, with the
+(candidate, fold) fits fanned out through joblib. The best candidate is
+refit on all rows and saved like any other trained model.
+"""
+import multiprocessing
+import time
+from concurrent import futures
+import numpy as np
+from joblib import Parallel, delayed
+from joblib.externals.loky import get_reusable_executor
+from sklearn.base import clone
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier, HistGradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.linear_model import Ridge, RidgeClassifier
+from sklearn.metrics import r2_score, accuracy_score
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from .config import MODEL_SELECTION_FOLDS, MODEL_SELECTION_BUDGET_SECONDS, MODEL_SELECTION_CACHE_MAX_MB
+from .cache import LRUCache
+from .storage import get_dataset, dataset_signature
+from .ml import prepare_features, determine_model_type, save_trained_model, training_params
+from .telemetry import StageTimer
+
+# Preprocessed matrix and fold splits per (dataset, target, folds). Lives in
+# the worker process, so a repeat selection there skips straight to fitting.
+selection_cache = LRUCache(
+    max_bytes=MODEL_SELECTION_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda prepared: prepared["X"].memory_usage(deep=True).sum() + prepared["y"].nbytes
+)
+
+def candidate_models(model_type, params):
+    """Estimators to compare, cheapest first so a tight budget still ranks something"""
+    # Folds already run in parallel, so each forest fit stays on one core
+    forest = {
+        "n_estimators": params["n_estimators"],
+        "max_depth": params["max_depth"],
+        "max_samples": params["max_samples"],
+        "n_jobs": 1,
+        "random_state": 42
+    }
+    if model_type == "regression":
+        return {
+            "Ridge": Ridge(),
+            "HistGradientBoostingRegressor": HistGradientBoostingRegressor(random_state=42),
+            "RandomForestRegressor": RandomForestRegressor(**forest)
+        }
+    return {
+        "RidgeClassifier": RidgeClassifier(),
+        "HistGradientBoostingClassifier": HistGradientBoostingClassifier(random_state=42),
+        "RandomForestClassifier": RandomForestClassifier(**forest)
+    }
+
+def score_predictions(model_type, y_true, y_pred):
+    return r2_score(y_true, y_pred) if model_type == "regression" else accuracy_score(y_true, y_pred)
+
+def fold_splits(y, model_type, folds):
+    """Shuffled k-fold indices - stratified when every class has enough rows"""
+    if model_type == "classification" and np.bincount(y).min() >= folds:
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    else:
+        splitter = KFold(n_splits=folds, shuffle=True, random_state=42)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+def prepare_selection(dataset_id, target_column, folds):
+    """Features, encoded target and fold splits - from the cache while the dataset is unchanged"""
+    # Signature first - if the files change while we read, the entry is just stale
+    signature = dataset_signature(dataset_id)
+    key = (dataset_id, target_column, folds)
+    prepared = selection_cache.get(key, signature)
+    if prepared is not None:
+        return prepared, True
+
+    df = get_dataset(dataset_id)
+    if target_column not in df.columns:
+        raise ValueError(f"Target column '{target_column}' not found in dataset")
+    df_clean = df.dropna(subset=[target_column])
+    if len(df_clean) < max(10, folds):
+        raise ValueError("Insufficient data after removing missing target values")
+
+    X, y, pipeline = prepare_features(df_clean, target_column)
+    model_type, _ = determine_model_type(y)
+    if model_type == "classification":
+        y_encoded = pipeline.fit_target(y)
+    else:
+        y_encoded = y.to_numpy(dtype=np.float64)
+
+    prepared = {
+        "X": X,
+        "y": y_encoded,
+        "pipeline": pipeline,
+        "model_type": model_type,
+        "splits": fold_splits(y_encoded, model_type, folds)
+    }
+    selection_cache.put(key, prepared, signature)
+    return prepared, False
+
+def fit_fold(model, X, y, train, test, model_type):
+    """Fit one candidate on one fold - returns (score, fit seconds)"""
+    start_time = time.perf_counter()
+    model.fit(X.iloc[train], y[train])
+    fit_time = time.perf_counter() - start_time
+    return score_predictions(model_type, y[test], model.predict(X.iloc[test])), fit_time
+
+def run_fits(calls, n_jobs, deadline):
+    """
+    Yield the results of joblib `delayed` calls in order, raising TimeoutError
+    once a fit runs past `deadline` (a time.time() value).
+
+    joblib only enforces its timeout on process backends, and it runs n_jobs=1
+    in-process - so those fits go one at a time to a single loky worker
+    instead, which is killed if a fit overruns.
+    """
+    if n_jobs > 1:
+        results = Parallel(n_jobs=n_jobs, return_as="generator", timeout=max(deadline - time.time(), 1))(calls)
+        try:
+            yield from results
+        finally:
+            # Closing the generator cancels the fits that haven't started
+            results.close()
+        return
+
+    executor = get_reusable_executor(max_workers=1)
+    for fn, args, kwargs in calls:
+        future = executor.submit(fn, *args, **kwargs)
+        try:
+            yield future.result(timeout=max(deadline - time.time(), 0))
+        except futures.TimeoutError:
+            executor.shutdown(wait=False, kill_workers=True)
+            raise TimeoutError("Fit ran past the selection budget")
+
+def select_model(dataset_id, target_column, folds=MODEL_SELECTION_FOLDS,
+                 budget_seconds=MODEL_SELECTION_BUDGET_SECONDS, params=None, on_progress=None):
+    """
+    Rank the candidates by mean CV score and save the winner refit on all rows.
+
+    Fits stop being collected once `budget_seconds` have passed, and a fit
+    still running then is cut off; candidates without every fold scored are
+    reported but not ranked. The budget covers preprocessing and CV only -
+    the winner's refit on all rows comes after it (timed as the "fit" stage).
+    `on_progress(fraction, message)` is called as folds finish.
+    """
+    params = params or training_params()
+    start_time = time.time()
+    timer = StageTimer()
+    with timer.stage("prepare"):
+        prepared, cached = prepare_selection(dataset_id, target_column, folds)
+    X, y, splits, model_type = prepared["X"], prepared["y"], prepared["splits"], prepared["model_type"]
+    candidates = candidate_models(model_type, params)
+
+    tasks = [(name, fold) for name in candidates for fold in range(len(splits))]
+    scores = {name: [] for name in candidates}
+    fit_times = {name: [] for name in candidates}
+    budget_exhausted = False
+
+    results = run_fits(
+        (delayed(fit_fold)(clone(candidates[name]), X, y, *splits[fold], model_type) for name, fold in tasks),
+        params["n_jobs"], start_time + budget_seconds
+    )
+    cv_start_time = time.perf_counter()
+    try:
+        for done, ((name, fold), (score, fit_time)) in enumerate(zip(tasks, results), start=1):
+            scores[name].append(score)
+            fit_times[name].append(fit_time)
+            if on_progress is not None:
+                on_progress(done / len(tasks), f"{name} fold {fold + 1}/{len(splits)}: {score:.4f}")
+            if time.time() - start_time > budget_seconds:
+                budget_exhausted = True
+                break
+    except (TimeoutError, multiprocessing.TimeoutError):
+        # joblib's process backends raise the multiprocessing flavour
+        budget_exhausted = True
+    finally:
+        results.close()
+        timer.stages["cross_validation"] = time.perf_counter() - cv_start_time
+
+    leaderboard = []
+    for name in candidates:
+        complete = len(scores[name]) == len(splits)
+        leaderboard.append({
+            "algorithm": name,
+            "status": "completed" if complete else ("incomplete" if scores[name] else "skipped"),
+            "mean_score": float(round(np.mean(scores[name]), 4)) if complete else None,
+            "std_score": float(round(np.std(scores[name]), 4)) if complete else None,
+            "fold_scores": [float(round(score, 4)) for score in scores[name]],
+            "fit_time": round(sum(fit_times[name]), 3),
+            "mean_fit_time": round(float(np.mean(fit_times[name])), 3) if fit_times[name] else None
+        })
+    leaderboard.sort(key=lambda entry: (entry["mean_score"] is None, -(entry["mean_score"] or 0)))
+    best = leaderboard[0]
+    if best["mean_score"] is None:
+        raise ValueError(f"No candidate finished {len(splits)}-fold CV within the {budget_seconds}s budget")
+
+    if on_progress is not None:
+        on_progress(1.0, f"Refitting {best['algorithm']} on all rows")
+    model = clone(candidates[best["algorithm"]])
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=params["n_jobs"])
+    with timer.stage("fit"):
+        model.fit(X, y)
+
+    score_name = "R² Score" if model_type == "regression" else "Accuracy"
+    with timer.stage("save"):
+        result = save_trained_model(
+            model, X, prepared["pipeline"], target_column, dataset_id, model_type,
+            best["algorithm"], best["mean_score"], f"CV {score_name}", split=f"{len(splits)}-fold CV"
+        )
+    result["training_params"] = params
+    result["score_history"] = None
+    result["leaderboard"] = leaderboard
+    result["budget_exhausted"] = budget_exhausted
+    result["cached_preprocessing"] = cached
+    result["stages"] = timer.summary()
+    return result
@@ -0,0 +1,407 @@
+"""
+Mergeable streaming summaries used by the approximate and chunked EDA modes.
+
+Every summary here is fed one chunk at a time with vectorized NumPy updates,
+keeps memory independent of the number of rows seen, and can report how far
+its answers may be from the exact ones.
+"""
+import math
+import numpy as np
+import pandas as pd
+
+class MomentSketch:
+    """
+    Exact count/mean/central moments/min/max/zeros for a block of columns.
+
+    Chunk statistics are combined with the pairwise update formulas of Chan
+    and Pebay, so the result matches a single pass over all rows (up to
+    floating point) without holding them.
+    """
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.m4 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.zeros = np.zeros(n_columns, dtype=np.int64)
+
+    def update(self, values):
+        """Add a (rows, columns) float block with NaN as missing"""
+        mask = ~np.isnan(values)
+        count = mask.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(mask, values, 0.0).sum(axis=0) / count
+            dev = np.where(mask, values - mean, 0.0)
+            dev2 = dev ** 2
+            chunk = (count, np.nan_to_num(mean), dev2.sum(axis=0),
+                     (dev2 * dev).sum(axis=0), (dev2 ** 2).sum(axis=0))
+        self._combine(*chunk)
+        self.min = np.minimum(self.min, np.where(mask, values, np.inf).min(axis=0, initial=np.inf))
+        self.max = np.maximum(self.max, np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf))
+        self.zeros += (values == 0).sum(axis=0)
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.m3, other.m4)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.zeros += other.zeros
+
+    def _combine(self, n_b, mean_b, m2_b, m3_b, m4_b):
+        n_a, mean_a, m2_a, m3_a, m4_a = self.count, self.mean, self.m2, self.m3, self.m4
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - mean_a
+            safe_n = np.where(n > 0, n, 1.0)
+            mean = mean_a + delta * n_b / safe_n
+            m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+            m3 = (m3_a + m3_b + delta ** 3 * n_a * n_b * (n_a - n_b) / safe_n ** 2
+                  + 3 * delta * (n_a * m2_b - n_b * m2_a) / safe_n)
+            m4 = (m4_a + m4_b
+                  + delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / safe_n ** 3
+                  + 6 * delta ** 2 * (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / safe_n ** 2
+                  + 4 * delta * (n_a * m3_b - n_b * m3_a) / safe_n)
+        self.count, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+
+    def finalize(self):
+        """std (ddof=1) and biased skewness/excess kurtosis, as pandas/scipy report them"""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.where(n > 1, self.m2 / (n - 1), np.nan))
+            m2 = self.m2 / n
+            degenerate = m2 <= (np.finfo(np.float64).eps * self.mean) ** 2
+            skewness = np.where(degenerate, np.nan, (self.m3 / n) / m2 ** 1.5)
+            kurtosis = np.where(degenerate, np.nan, (self.m4 / n) / m2 ** 2.0) - 3
+        return {"std": std, "skewness": skewness, "kurtosis": kurtosis}
+
+class CoMomentSketch:
+    """
+    Exact pairwise Pearson correlations for a block of columns.
+
+    Keeps, for every column pair, the count and sums over rows where both are
+    present - the same pairwise-complete rule as DataFrame.corr(). Each chunk
+    is folded in with a few matrix products; values are shifted by the first
+    chunk's means to keep the sums well conditioned.
+    """
+
+    def __init__(self, n_columns):
+        self.shift = None
+        self.n = np.zeros((n_columns, n_columns))
+        self.sx = np.zeros((n_columns, n_columns))   # sx[i, j]: sum of x_i where x_j is present
+        self.sxx = np.zeros((n_columns, n_columns))
+        self.sxy = np.zeros((n_columns, n_columns))
+
+    def update(self, values):
+        """Add a (rows, columns) float block with NaN as missing"""
+        mask = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1])
+        present = mask.astype(np.float64)
+        x = np.where(mask, values - self.shift, 0.0)
+        self.n += present.T @ present
+        self.sx += x.T @ present
+        self.sxx += (x * x).T @ present
+        self.sxy += x.T @ x
+
+    def merge(self, other):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift
+        # Re-express the other sketch's sums around our shift
+        d = other.shift - self.shift
+        sx = other.sx + d[:, None] * other.n
+        self.sxx += other.sxx + 2 * d[:, None] * other.sx + d[:, None] ** 2 * other.n
+        self.sxy += (other.sxy + d[:, None] * other.sx.T + d[None, :] * other.sx
+                     + d[:, None] * d[None, :] * other.n)
+        self.sx += sx
+        self.n += other.n
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.sxy - self.sx * self.sx.T / self.n
+            var = self.sxx - self.sx ** 2 / self.n
+            corr = cov / np.sqrt(var * var.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        diagonal = np.diag(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return corr
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Keeps a stack of compactors whose capacities shrink geometrically; a full
+    compactor sorts itself and promotes every other item (random offset) to
+    the next level with double weight. Rank error is about 1.3% of n with
+    k=200, independent of n.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd leftover item stays behind so weights stay exact
+                keep = items[len(items) - len(items) % 2:]
+                offset = self.rng.integers(2)
+                promoted = items[offset:len(items) - len(items) % 2:2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Capacities depend on the height, so re-check from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2 ** level, dtype=np.float64)
+                                  for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Value at normalized rank q (0-1) - q may be an array"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items, cumulative = self._weighted_items()
+        ranks = np.asarray(q, dtype=np.float64) * cumulative[-1]
+        idx = np.clip(np.searchsorted(cumulative, ranks, side="left"), 0, len(items) - 1)
+        return items[idx]
+
+    def rank(self, value, inclusive=False):
+        """Estimated fraction of values below (or at, if inclusive) `value`"""
+        if self.n == 0:
+            return 0.0
+        items, cumulative = self._weighted_items()
+        pos = np.searchsorted(items, value, side="right" if inclusive else "left")
+        return float(cumulative[pos - 1] / cumulative[-1]) if pos > 0 else 0.0
+
+    def rank_error(self):
+        """Normalized rank error at ~99% confidence (empirical KLL bound)"""
+        return 2.296 / self.k ** 0.9723
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit hashes (Flajolet et al. 2007).
+
+    2**p one-byte registers; relative standard error is 1.04 / sqrt(2**p),
+    about 0.8% for the default p=14 (16 KB).
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        remaining_bits = 64 - self.p
+        rest = hashes & np.uint64((1 << remaining_bits) - 1)
+        # frexp gives the exact bit length for integers below 2**53
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (remaining_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add_values(self, values):
+        """Hash and add an array/Series of values (NaN/None skipped)"""
+        values = pd.Series(values).dropna()
+        if len(values):
+            self.add_hashes(pd.util.hash_array(values.to_numpy()))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Small-range correction: linear counting is more accurate there
+        if estimate <= 2.5 * self.m and zeros > 0:
+            estimate = self.m * math.log(self.m / zeros)
+        return float(estimate)
+
+    def relative_error(self):
+        """Relative standard error of estimate()"""
+        return 1.04 / math.sqrt(self.m)
+
+def sorted_unique(values):
+    """np.unique for integer hashes - sort-based, which beats its hash table on large uint64 arrays"""
+    # Stable (timsort) sorts the concatenated sorted runs _compact hands it in linear-ish time
+    values = np.sort(values, kind="stable")
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+class DistinctHashes:
+    """
+    Distinct count of 64-bit hashes - exact while there are at most `limit`
+    of them (8 bytes each), a HyperLogLog estimate beyond that.
+
+    Exact here means exact up to hash collisions, which for 64-bit hashes
+    are vanishingly rare below billions of values.
+    """
+
+    def __init__(self, limit, p=14):
+        self.limit = limit
+        self.hll = HyperLogLog(p)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.pending = []
+        self.pending_count = 0
+        self.exact = True
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        self.hll.add_hashes(hashes)
+        if not self.exact:
+            return
+        self.pending.append(sorted_unique(hashes))
+        self.pending_count += len(self.pending[-1])
+        # Merge once the pending hashes outgrow the set - amortized O(n log n)
+        if self.pending_count > max(len(self.hashes), self.limit // 16):
+            self._compact()
+
+    def _compact(self):
+        if self.pending:
+            self.hashes = sorted_unique(np.concatenate([self.hashes, *self.pending]))
+            self.pending = []
+            self.pending_count = 0
+        if len(self.hashes) > self.limit:
+            self.exact = False
+            self.hashes = np.empty(0, dtype=np.uint64)
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        if self.exact and other.exact:
+            other._compact()
+            self.pending.append(other.hashes)
+            self._compact()
+        else:
+            self.exact = False
+            self.hashes = np.empty(0, dtype=np.uint64)
+            self.pending = []
+            self.pending_count = 0
+
+    def estimate(self):
+        if self.exact:
+            self._compact()
+        return float(len(self.hashes)) if self.exact else self.hll.estimate()
+
+    def relative_error(self):
+        """Relative standard error of estimate() - 0 while it's exact"""
+        if self.exact:
+            self._compact()
+        return 0.0 if self.exact else self.hll.relative_error()
+
+class MisraGries:
+    """
+    Misra-Gries heavy hitters with k counters, updated a chunk at a time.
+
+    Every count is an underestimate by at most (n - sum of counters) / (k + 1),
+    so any value more frequent than that is guaranteed to be tracked. The k
+    largest counters are kept even when the decrement takes them to zero, so
+    a column with more distinct values than counters still reports candidates.
+    """
+
+    def __init__(self, k=64):
+        self.k = k
+        self.n = 0
+        self.counters = pd.Series(dtype=np.int64)
+
+    def update(self, values):
+        counts = pd.Series(values).dropna().value_counts()
+        self.n += int(counts.sum())
+        if len(counts) > 2 * self.k + 1:
+            # Outside the chunk's top 2k+1, a value not already counted is at or
+            # below the decrement _absorb applies - skip aligning it at all
+            keep = np.zeros(len(counts), dtype=bool)
+            keep[:2 * self.k + 1] = True
+            keep |= counts.index.isin(self.counters.index)
+            counts = counts[keep]
+        self._absorb(counts)
+
+    def merge(self, other):
+        self.n += other.n
+        self._absorb(other.counters)
+
+    def _absorb(self, counts):
+        combined = self.counters.add(counts, fill_value=0).astype(np.int64)
+        if len(combined) > self.k:
+            # Subtract the (k+1)-th largest count - the batched Misra-Gries decrement
+            threshold = np.partition(combined.to_numpy(), len(combined) - self.k - 1)[len(combined) - self.k - 1]
+            combined = (combined - threshold).nlargest(self.k, keep="first")
+        self.counters = combined
+
+    def top(self, n):
+        return self.counters.sort_values(ascending=False, kind="stable").head(n)
+
+    def max_error(self):
+        return (self.n - int(self.counters.sum())) / (self.k + 1)
+
+class ReservoirSample:
+    """
+    Uniform row sample of bounded size, mergeable across chunks.
+
+    Each row gets a random key and the `size` smallest keys are kept
+    (bottom-k sampling), which is equivalent to reservoir sampling.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.rows = None
+
+    def update(self, chunk):
+        keys = self.rng.random(len(chunk))
+        chunk = chunk.reset_index(drop=True)
+        if self.rows is None:
+            rows, all_keys = chunk, keys
+        else:
+            rows = pd.concat([self.rows, chunk], ignore_index=True)
+            all_keys = np.concatenate([self.keys, keys])
+        if len(all_keys) > self.size:
+            keep = np.argpartition(all_keys, self.size - 1)[:self.size]
+            rows, all_keys = rows.iloc[keep].reset_index(drop=True), all_keys[keep]
+        self.rows, self.keys = rows, all_keys
+
+    def sample(self):
+        return self.rows if self.rows is not None else pd.DataFrame()
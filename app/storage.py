@@ -0,0 +1,224 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from .config import STATIC_DIR, DATA_DIR, UPLOAD_CHUNK_BYTES, CSV_CHUNK_ROWS
+from .cache import dataset_cache, correlation_cache
+from .analysis import correlation_matrix
+from .ingestion import profile_csv, merge_dtypes
+from .dtypes import maybe_optimize_dtypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet store is an optimization - CSV still works without it
+    pa = None
+    pq = None
+
+
+def dataset_csv_path(dataset_id):
+    """Original CSV upload - kept around so users can download it"""
+    return os.path.join(STATIC_DIR, f"dataset_{dataset_id}.csv")
+
+def dataset_store_path(dataset_id):
+    """Directory holding the Parquet parts for a dataset"""
+    return os.path.join(DATA_DIR, f"dataset_{dataset_id}")
+
+def has_columnar_store(dataset_id):
+    store = dataset_store_path(dataset_id)
+    return pq is not None and os.path.isdir(store) and any(
+        name.endswith(".parquet") for name in os.listdir(store)
+    )
+
+def store_parts(dataset_id):
+    """Parquet part files of a dataset, in append order"""
+    store = dataset_store_path(dataset_id)
+    return [os.path.join(store, name) for name in sorted(os.listdir(store)) if name.endswith(".parquet")]
+
+def stored_dtypes(dataset_id):
+    """pandas dtypes of the columnar store's schema"""
+    schema = pq.read_schema(store_parts(dataset_id)[0])
+    return {str(k): v for k, v in schema.empty_table().to_pandas().dtypes.items()}
+
+def arrow_schema(dtypes):
+    """Map the pandas dtypes inferred at upload time onto a fixed Arrow schema"""
+    fields = []
+    for name, dtype in dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            arrow_type = pa.bool_()
+        elif pd.api.types.is_integer_dtype(dtype):
+            arrow_type = pa.int64()
+        elif pd.api.types.is_float_dtype(dtype):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+def write_columnar_store(dataset_id, dtypes, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Convert the uploaded CSV into a typed Parquet file, once.
+
+    The CSV is parsed in chunks with the dtypes inferred by profile_csv, so every
+    chunk lands with the same schema and memory stays bounded by the chunk size.
+    Returns False (and leaves reads on the CSV) if pyarrow isn't installed.
+    """
+    if pq is None:
+        return False
+
+    # Built beside the live store and swapped in, so a failed rewrite keeps the old one
+    store = dataset_store_path(dataset_id)
+    staging = store + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    schema = arrow_schema(dtypes)
+
+    try:
+        with pq.ParquetWriter(os.path.join(staging, "part-00000.parquet"), schema) as writer:
+            for chunk in pd.read_csv(dataset_csv_path(dataset_id), chunksize=chunk_rows,
+                                     dtype=dtypes, encoding="utf-8"):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        shutil.rmtree(store, ignore_errors=True)
+        os.replace(staging, store)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return True
+
+def append_to_dataset(dataset_id, csv_path, dtypes, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Append the rows of another CSV with the same columns to a dataset.
+
+    The rows go onto the end of the dataset CSV and, when there is a columnar
+    store, into a new Parquet part with the existing schema. If the new rows
+    need a wider type (e.g. floats in an int column) the store is rebuilt with
+    the widened schema instead. If any step fails the CSV is truncated back
+    and the store left as it was. Returns the dtypes the new rows should be
+    parsed with to match the stored data.
+    """
+    path = dataset_csv_path(dataset_id)
+    existing_columns = [str(c) for c in pd.read_csv(path, nrows=0, encoding="utf-8").columns]
+    if list(dtypes) != existing_columns:
+        raise ValueError(f"Appended CSV must have the dataset's columns: {', '.join(existing_columns)}")
+
+    original_size = os.path.getsize(path)
+    try:
+        with open(csv_path, "rb") as source, open(path, "ab") as target:
+            source.readline()  # header
+            if original_size > 0:
+                with open(path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        target.write(b"\n")
+            shutil.copyfileobj(source, target, UPLOAD_CHUNK_BYTES)
+
+        if not has_columnar_store(dataset_id):
+            return dtypes
+        return _append_to_columnar_store(dataset_id, csv_path, dtypes, chunk_rows)
+    except BaseException:
+        os.truncate(path, original_size)
+        raise
+
+def _append_to_columnar_store(dataset_id, csv_path, dtypes, chunk_rows):
+    """Add the appended rows to the Parquet store - a new part, or a rewrite if a column widened"""
+    stored = stored_dtypes(dataset_id)
+    merged = {name: merge_dtypes(stored[name], dtypes[name]) for name in stored}
+    if merged != stored:
+        write_columnar_store(dataset_id, merged, chunk_rows)
+        return merged
+
+    # Written under a temporary name so readers never pick up a half-written part
+    parts = store_parts(dataset_id)
+    part_path = os.path.join(dataset_store_path(dataset_id), f"part-{len(parts):05d}.parquet")
+    schema = arrow_schema(stored)
+    try:
+        with pq.ParquetWriter(part_path + ".tmp", schema) as writer:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=stored, encoding="utf-8"):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        os.replace(part_path + ".tmp", part_path)
+    finally:
+        if os.path.exists(part_path + ".tmp"):
+            os.remove(part_path + ".tmp")
+    return stored
+
+def load_dataset(dataset_id, columns=None, memory_map=False):
+    """
+    Load a dataset, preferring the Parquet store over re-parsing the CSV.
+
+    `columns` limits the read to just those columns (Parquet only reads the
+    column chunks it needs), and `memory_map` maps the file instead of
+    copying it into memory before decoding. Columns are then narrowed to
+    cheaper dtypes (see dtypes.optimize_dtypes).
+    """
+    if has_columnar_store(dataset_id):
+        df = pd.read_parquet(dataset_store_path(dataset_id), columns=columns, memory_map=memory_map)
+    else:
+        df = pd.read_csv(dataset_csv_path(dataset_id), usecols=columns)
+    return maybe_optimize_dtypes(df)
+
+def iter_dataset_chunks(dataset_id, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Yield the dataset as DataFrames of at most `chunk_rows` rows.
+
+    Parquet parts are read record batch by record batch. The CSV fallback is
+    profiled first so every chunk is parsed with the same dtypes.
+    """
+    if has_columnar_store(dataset_id):
+        for part_path in store_parts(dataset_id):
+            for batch in pq.ParquetFile(part_path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        return
+
+    path = dataset_csv_path(dataset_id)
+    dtypes = profile_csv(path, chunk_rows)["dtypes"]
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes, encoding="utf-8")
+
+def dataset_signature(dataset_id):
+    """Identify the on-disk version of a dataset - changes whenever its files do"""
+    if has_columnar_store(dataset_id):
+        paths = store_parts(dataset_id)
+    else:
+        paths = [dataset_csv_path(dataset_id)]
+    signature = []
+    for path in paths:
+        st = os.stat(path)
+        signature.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+def get_dataset(dataset_id, columns=None):
+    """
+    Cached load_dataset - repeat work on a hot dataset skips the parse entirely.
+
+    A column subset is served from the cached full frame when there is one.
+    """
+    signature = dataset_signature(dataset_id)
+    key = (dataset_id, tuple(columns) if columns is not None else None)
+
+    df = dataset_cache.get(key, signature)
+    if df is not None:
+        return df
+    if columns is not None:
+        full = dataset_cache.get((dataset_id, None), signature)
+        if full is not None:
+            return full[list(columns)]
+
+    df = load_dataset(dataset_id, columns)
+    dataset_cache.put(key, df, signature)
+    return df
+
+def get_correlations(dataset_id, method="pearson"):
+    """(numeric column names, float32 correlation matrix) for a dataset, cached"""
+    signature = dataset_signature(dataset_id)
+    key = (dataset_id, method)
+
+    entry = correlation_cache.get(key, signature)
+    if entry is not None:
+        return entry
+
+    df = get_dataset(dataset_id)
+    numeric_cols = [str(col) for col in df.select_dtypes(include=[np.number]).columns]
+    entry = (numeric_cols, correlation_matrix(df, numeric_cols, method).astype(np.float32))
+    correlation_cache.put(key, entry, signature)
+    return entry
@@ -0,0 +1,170 @@
+"""
+Functions that run inside the job worker processes.
+
+Kept apart from jobs.py on purpose: workers must not import the database
+module, only the analytics code they actually run.
+"""
+import os
+import shutil
+import time
+import uuid
+
+from .config import DATA_DIR
+from .telemetry import StageTimer
+
+# The analytics modules (pandas, scikit-learn...) are imported inside the job
+# functions: the API process imports this module for the job manager, and
+# shouldn't pay for them until a job actually runs.
+
+# Shared feature matrices of batch training runs, removed once their fits finish
+BATCH_DIR = os.path.join(DATA_DIR, "batches")
+
+# Marker files asking a warm-start training job to stop growing its forest
+STOP_DIR = os.path.join(DATA_DIR, "stop_requests")
+
+# Set in each worker process by init_worker
+_progress_queue = None
+
+def init_worker(progress_queue):
+    """ProcessPoolExecutor initializer - hands the worker the progress channel"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def report_progress(job_id, progress, message=None):
+    """Send a progress update back to the JobManager in the API process"""
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, progress, message))
+
+def stop_request_path(job_id):
+    return os.path.join(STOP_DIR, f"job_{job_id}")
+
+def request_stop(job_id):
+    """Ask a running warm-start job to finish with the trees it has (called from the API)"""
+    os.makedirs(STOP_DIR, exist_ok=True)
+    open(stop_request_path(job_id), "w").close()
+
+def round_reporter(job_id):
+    """grow_forest callback - reports each round's validation score and checks for a stop request"""
+    def on_round(n_trees, total, score):
+        report_progress(job_id, 20 + 75 * n_trees / total, f"{n_trees}/{total} trees - validation accuracy {score:.4f}")
+        return os.path.exists(stop_request_path(job_id))
+    return on_round
+
+def run_training_job(job_id, dataset_id, target_column, csv_path=None, params=None):
+    """Load the dataset (or an uploaded replacement CSV) and train a model on it"""
+    import pandas as pd
+    from .storage import get_dataset
+    from .dtypes import maybe_optimize_dtypes
+    from .ml import train_model
+
+    start_time = time.time()
+    timer = StageTimer()
+    try:
+        report_progress(job_id, 5, "Loading dataset")
+        with timer.stage("load"):
+            df = maybe_optimize_dtypes(pd.read_csv(csv_path)) if csv_path else get_dataset(dataset_id)
+
+        report_progress(job_id, 20, "Training model")
+        result = train_model(df, target_column, dataset_id, params, round_reporter(job_id), timer)
+        result["processing_time"] = time.time() - start_time
+        return result
+    finally:
+        if csv_path and os.path.exists(csv_path):
+            os.remove(csv_path)
+        if os.path.exists(stop_request_path(job_id)):
+            os.remove(stop_request_path(job_id))
+
+def batch_features_path(owner):
+    """A new feature matrix file, under the directory of the server process that owns the batch"""
+    directory = os.path.join(BATCH_DIR, owner)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"features_{uuid.uuid4().hex}.joblib")
+
+def clear_job_files(owner_alive, job_ids):
+    """
+    Leftovers of server processes that are gone: the batch directories of
+    owners `owner_alive` rejects and the stop requests of `job_ids`. Files of
+    live processes - other workers of the same server - are left alone.
+    """
+    if os.path.isdir(BATCH_DIR):
+        for owner in os.listdir(BATCH_DIR):
+            if not owner_alive(owner):
+                shutil.rmtree(os.path.join(BATCH_DIR, owner), ignore_errors=True)
+    for job_id in job_ids:
+        if os.path.exists(stop_request_path(job_id)):
+            os.remove(stop_request_path(job_id))
+
+def run_batch_prepare_job(job_id, dataset_id, target_columns, features_path):
+    """
+    Load the dataset once and write the feature matrix its targets can share.
+
+    The per-target fits memory-map the file instead of each re-reading and
+    re-encoding the dataset.
+    """
+    import joblib
+    from .storage import get_dataset
+    from .ml import prepare_shared_features
+
+    report_progress(job_id, 10, "Loading dataset")
+    df = get_dataset(dataset_id)
+    missing = [col for col in target_columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Target columns not found in dataset: {', '.join(missing)}")
+
+    report_progress(job_id, 40, "Preparing shared features")
+    shared = prepare_shared_features(df, target_columns)
+    if shared is None:
+        return {"features_path": None, "shared_targets": []}
+    try:
+        # Uncompressed so the arrays can be opened with mmap_mode
+        joblib.dump(shared, features_path)
+    except Exception:
+        if os.path.exists(features_path):
+            os.remove(features_path)
+        raise
+    return {"features_path": features_path, "shared_targets": list(shared["targets"])}
+
+def run_batch_training_job(job_id, dataset_id, target_column, features_path=None, params=None):
+    """Train one target of a batch - from the shared matrix when it has one"""
+    if features_path is None:
+        return run_training_job(job_id, dataset_id, target_column, params=params)
+    import joblib
+    from .ml import fit_model, shared_features_for
+
+    start_time = time.time()
+    timer = StageTimer()
+    try:
+        report_progress(job_id, 5, "Loading shared features")
+        with timer.stage("load"):
+            shared = joblib.load(features_path, mmap_mode="r")
+        try:
+            if len(shared["X"]) < 10:
+                raise ValueError("Insufficient data after removing missing target values")
+            with timer.stage("prepare"):
+                X, y, pipeline = shared_features_for(shared, target_column)
+
+            report_progress(job_id, 20, "Training model")
+            result = fit_model(X, y, pipeline, target_column, dataset_id, params, round_reporter(job_id), timer)
+        except Exception as e:
+            raise Exception(f"Model training failed: {str(e)}")
+        result["processing_time"] = time.time() - start_time
+        return result
+    finally:
+        if os.path.exists(stop_request_path(job_id)):
+            os.remove(stop_request_path(job_id))
+
+def run_selection_job(job_id, dataset_id, target_column, folds, budget_seconds, params=None):
+    """Cross-validate the candidate models and save the best one"""
+    from .selection import select_model
+
+    start_time = time.time()
+    report_progress(job_id, 5, "Preparing features")
+    try:
+        result = select_model(
+            dataset_id, target_column, folds, budget_seconds, params,
+            on_progress=lambda fraction, message: report_progress(job_id, 10 + 85 * fraction, message)
+        )
+    except Exception as e:
+        raise Exception(f"Model selection failed: {str(e)}")
+    result["processing_time"] = time.time() - start_time
+    return result
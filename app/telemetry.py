@@ -0,0 +1,208 @@
+"""
+In-process request and stage timing, exposed in the Prometheus text format.
+
+Handlers time their stages (CSV parsing, EDA, charts, the LLM call, DB
+writes...) with a StageTimer and observe them into the histograms here;
+GET /metrics renders everything for a scraper. The counters live in the API
+process only - training jobs time their stages in the worker and hand them
+back with the result. Nothing here imports the analytics stack, so worker
+processes can use StageTimer cheaply.
+"""
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds - from a cache hit up to a long training job
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labelnames, labels):
+    if not labelnames:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, labels)) + "}"
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge(Counter):
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, like a Prometheus client's"""
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            index = next((i for i, edge in enumerate(self.buckets) if value <= edge), len(self.buckets))
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for edge, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{format_labels(names, labels + (edge,))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+stage_seconds = Histogram(
+    "datalab_stage_duration_seconds", "Time spent in each stage of an operation", ("operation", "stage")
+)
+http_requests = Counter(
+    "datalab_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_seconds = Histogram(
+    "datalab_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_in_flight = Gauge("datalab_http_requests_in_flight", "HTTP requests being served")
+analysis_cache_lookups = Counter(
+    "datalab_analysis_cache_lookups_total", "Stored analysis results reused or recomputed", ("result",)
+)
+
+METRICS = [stage_seconds, http_requests, http_request_seconds, http_in_flight, analysis_cache_lookups]
+
+class StageTimer:
+    """
+    Wall-clock seconds per named stage of one operation.
+
+    Stages that run concurrently (charts render while the summary is written)
+    each get their own time, so they can add up to more than the total.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start_time
+
+    async def timed(self, name, awaitable):
+        """Await `awaitable` as stage `name` - for stages run as tasks"""
+        with self.stage(name):
+            return await awaitable
+
+    def summary(self):
+        return {name: round(seconds, 4) for name, seconds in self.stages.items()}
+
+def observe_stages(operation, stages):
+    for name, seconds in stages.items():
+        stage_seconds.observe(seconds, operation, name)
+
+class RequestMetrics:
+    """ASGI middleware counting requests, their latency and how many are in flight"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            # The route template, not the raw path - one series per endpoint, not per id
+            route = scope.get("route")
+            path = getattr(route, "path", None) or ("/static" if scope["path"].startswith("/static/") else "unmatched")
+            http_requests.inc(scope["method"], path, status)
+            http_request_seconds.observe(time.perf_counter() - start_time, scope["method"], path)
+
+def resident_memory_bytes():
+    """Current RSS from /proc where there is one, else the peak from getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def sample_lines(name, help, labelname, values, kind="gauge"):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for label, value in values.items():
+        lines.append(f"{name}{format_labels((labelname,), (label,))} {value}")
+    return lines
+
+def render_metrics(caches, pools):
+    """
+    Prometheus exposition text for the metrics above plus point-in-time
+    gauges: the `caches` ({name: cache}) hit ratios, the `pools` ({name:
+    BoundedExecutor}) in-flight tasks and this process's RSS.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+    lines.extend(sample_lines("datalab_cache_hit_ratio", "Cache hits over lookups", "cache",
+                             {name: stats["hit_ratio"] for name, stats in cache_stats.items()}))
+    lines.extend(sample_lines("datalab_cache_hits_total", "Cache hits since startup", "cache",
+                             {name: stats["hits"] for name, stats in cache_stats.items()}, "counter"))
+    lines.extend(sample_lines("datalab_cache_misses_total", "Cache misses since startup", "cache",
+                             {name: stats["misses"] for name, stats in cache_stats.items()}, "counter"))
+    lines.extend(sample_lines("datalab_cache_entries", "Entries held by each cache", "cache",
+                             {name: stats["entries"] for name, stats in cache_stats.items()}))
+    lines.extend(sample_lines("datalab_pool_tasks_in_flight", "Tasks running or queued in each worker pool", "pool",
+                             {name: pool.in_flight for name, pool in pools.items()}))
+    lines.extend([
+        "# HELP process_resident_memory_bytes Resident memory size in bytes",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {resident_memory_bytes()}"
+    ])
+    return "\n".join(lines) + "\n"
@@ -1,113 +1,224 @@
-import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
-import pandas as pd
+import matplotlib.style
+from matplotlib.figure import Figure
 import numpy as np
-import seaborn as sns
+import os
 from datetime import datetime
 
-# Set style for dark theme
-plt.style.use('dark_background')
-sns.set_palette("husl")
+from .config import STATIC_DIR
+from .dtypes import CATEGORICAL_DTYPES
+
+# Dark theme, applied per figure so nothing depends on pyplot's global state
+CHART_STYLE = 'dark_background'
+BACKGROUND = '#0a0a0a'
+CATEGORY_COLORS = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#feca57', '#ff9ff3', '#54a0ff', '#5f27cd']
+
+def plan_charts(df, dataset_id, shape=None):
+    """
+    Work out which charts to draw and extract just the data each one needs.
+
+    Returns a list of (render_function, kwargs) pairs - at most
+    config.CHARTS_PER_ANALYSIS of them. Each render function is
+    independent and only gets small, picklable inputs, so the charts can be
+    rendered concurrently in separate processes. `shape` gives the full
+    dataset's (rows, columns) when df only holds the charted columns.
+    """
+    n_rows, n_columns = shape if shape is not None else df.shape
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    categorical_cols = df.select_dtypes(include=CATEGORICAL_DTYPES).columns
+
+    specs = []
+
+    # Enhanced Distribution Analysis
+    if len(numeric_cols) > 0:
+        col = numeric_cols[0]
+        specs.append((render_distribution_chart, {
+            "data": df[col].dropna().to_numpy(),
+            "column": str(col),
+            "filename": f"distribution_{dataset_id}_{timestamp}.png"
+        }))
+
+    # Enhanced Categorical Analysis
+    if len(categorical_cols) > 0:
+        col = categorical_cols[0]
+        specs.append((render_category_chart, {
+            "value_counts": df[col].value_counts().head(8),
+            "total_rows": n_rows,
+            "column": str(col),
+            "filename": f"categories_{dataset_id}_{timestamp}.png"
+        }))
+
+    # Simple overview chart
+    specs.append((render_overview_chart, {
+        "n_rows": n_rows,
+        "n_columns": n_columns,
+        "filename": f"overview_{dataset_id}_{timestamp}.png"
+    }))
+
+    return specs
 
 def generate_charts(df, dataset_id):
-    """Generate visually appealing charts with insights"""
-    try:
-        chart_urls = []
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        categorical_cols = df.select_dtypes(include=['object']).columns
-        
-        # Enhanced Distribution Analysis
-        if len(numeric_cols) > 0:
-            col = numeric_cols[0]
-            data = df[col].dropna()
-            
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
-            fig.patch.set_facecolor('#0a0a0a')
-            
-            # Histogram with KDE
-            ax1.hist(data, bins=30, alpha=0.7, color='#00d4ff', edgecolor='white', linewidth=0.5)
-            ax1.axvline(data.mean(), color='#ff6b6b', linestyle='--', linewidth=2, label=f'Mean: {data.mean():.2f}')
-            ax1.axvline(data.median(), color='#4ecdc4', linestyle='--', linewidth=2, label=f'Median: {data.median():.2f}')
-            ax1.set_title(f'Distribution Analysis: {col}', fontsize=16, fontweight='300', color='white', pad=20)
-            ax1.set_xlabel(col, fontsize=12, color='#ccc')
-            ax1.set_ylabel('Frequency', fontsize=12, color='#ccc')
-            ax1.legend(frameon=False, fontsize=10)
-            ax1.grid(True, alpha=0.2)
-            
-            # Box plot
-            bp = ax2.boxplot(data, patch_artist=True, widths=0.6)
-            bp['boxes'][0].set_facecolor('#00d4ff')
-            bp['boxes'][0].set_alpha(0.7)
-            for element in ['whiskers', 'fliers', 'medians', 'caps']:
-                plt.setp(bp[element], color='white')
-            ax2.set_title('Outlier Detection', fontsize=16, fontweight='300', color='white', pad=20)
-            ax2.set_ylabel(col, fontsize=12, color='#ccc')
-            ax2.grid(True, alpha=0.2)
-            
-            plt.tight_layout()
-            filename = f"distribution_{dataset_id}_{timestamp}.png"
-            filepath = f"static/{filename}"
-            plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='#0a0a0a')
-            plt.close()
-            chart_urls.append(f"/static/{filename}")
-        
-        # Enhanced Categorical Analysis
-        if len(categorical_cols) > 0:
-            col = categorical_cols[0]
-            value_counts = df[col].value_counts().head(8)
-            
-            fig, ax = plt.subplots(figsize=(14, 8))
-            fig.patch.set_facecolor('#0a0a0a')
-            
-            colors = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#feca57', '#ff9ff3', '#54a0ff', '#5f27cd']
-            bars = ax.bar(range(len(value_counts)), value_counts.values, color=colors[:len(value_counts)], alpha=0.8)
-            
-            # Add value labels on bars
-            for i, (bar, value) in enumerate(zip(bars, value_counts.values)):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                       f'{value}\n({value/len(df)*100:.1f}%)', ha='center', va='bottom', 
-                       fontsize=10, color='white', fontweight='500')
-            
-            ax.set_title(f'Category Distribution: {col}', fontsize=16, fontweight='300', color='white', pad=20)
-            ax.set_xlabel('Categories', fontsize=12, color='#ccc')
-            ax.set_ylabel('Count', fontsize=12, color='#ccc')
-            ax.set_xticks(range(len(value_counts)))
-            ax.set_xticklabels(value_counts.index, rotation=45, ha='right', fontsize=10)
-            ax.grid(True, alpha=0.2, axis='y')
-            
-            plt.tight_layout()
-            filename = f"categories_{dataset_id}_{timestamp}.png"
-            filepath = f"static/{filename}"
-            plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='#0a0a0a')
-            plt.close()
-            chart_urls.append(f"/static/{filename}")
-        
-        # Simple overview chart
-        fig, ax = plt.subplots(figsize=(12, 8))
-        fig.patch.set_facecolor('#0a0a0a')
-        
+    """Generate visually appealing charts with insights (sequentially, in-process)"""
+    chart_urls = []
+    for render, kwargs in plan_charts(df, dataset_id):
+        try:
+            chart_urls.append(render(**kwargs))
+        except Exception as e:
+            print(f"Chart generation error: {e}")
+    return chart_urls
+
+def build_chart_data(df, shape=None):
+    """
+    Pre-aggregated data for the same charts, for clients that draw them themselves.
+
+    Histogram bins, box-plot quartiles/whiskers and category counts are all
+    computed with vectorized NumPy/pandas - no matplotlib, and the payload is
+    a few KB instead of several hundred KB of PNG.
+    """
+    n_rows, n_columns = shape if shape is not None else df.shape
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    categorical_cols = df.select_dtypes(include=CATEGORICAL_DTYPES).columns
+
+    charts = []
+
+    if len(numeric_cols) > 0:
+        col = numeric_cols[0]
+        data = df[col].dropna().to_numpy(dtype=np.float64)
+        if len(data) > 0:
+            counts, edges = np.histogram(data, bins=30)
+            charts.append({
+                "type": "histogram",
+                "column": str(col),
+                "bin_edges": edges.tolist(),
+                "counts": counts.tolist(),
+                "mean": float(np.mean(data)),
+                "median": float(np.median(data))
+            })
+            charts.append({"type": "boxplot", "column": str(col), **box_plot_stats(data)})
+
+    if len(categorical_cols) > 0:
+        col = categorical_cols[0]
+        value_counts = df[col].value_counts().head(8)
+        charts.append({
+            "type": "categories",
+            "column": str(col),
+            "categories": [str(k) for k in value_counts.index],
+            "counts": [int(v) for v in value_counts.values],
+            "percentages": [float(round(v / n_rows * 100, 1)) for v in value_counts.values]
+        })
+
+    charts.append({"type": "overview", "rows": int(n_rows), "columns": int(n_columns)})
+    return charts
+
+def chart_columns(stats):
+    """The columns the charts above draw from - first numeric and first categorical"""
+    return [names[0] for names in (list(stats.get("numeric_insights", {})),
+                                   list(stats.get("categorical_insights", {}))) if names]
+
+def box_plot_stats(data):
+    """Quartiles and 1.5*IQR whiskers, following matplotlib's boxplot rules"""
+    q1, median, q3 = np.percentile(data, [25, 50, 75])
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = data[(data >= low_fence) & (data <= high_fence)]
+    # Whiskers stop at the most extreme points still inside the fences
+    whisker_low = float(inside.min()) if len(inside) else float(q1)
+    whisker_high = float(inside.max()) if len(inside) else float(q3)
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "whisker_low": whisker_low,
+        "whisker_high": whisker_high,
+        "outliers_count": int(len(data) - len(inside)),
+        "min": float(data.min()),
+        "max": float(data.max())
+    }
+
+def save_figure(fig, filename):
+    filepath = os.path.join(STATIC_DIR, filename)
+    fig.savefig(filepath, dpi=150, bbox_inches='tight', facecolor=BACKGROUND)
+    return f"/static/{filename}"
+
+def render_distribution_chart(data, column, filename):
+    """Histogram with mean/median markers next to a box plot"""
+    with matplotlib.style.context(CHART_STYLE):
+        fig = Figure(figsize=(16, 7))
+        fig.patch.set_facecolor(BACKGROUND)
+        ax1, ax2 = fig.subplots(1, 2)
+
+        mean, median = np.mean(data), np.median(data)
+
+        # Histogram with KDE
+        ax1.hist(data, bins=30, alpha=0.7, color='#00d4ff', edgecolor='white', linewidth=0.5)
+        ax1.axvline(mean, color='#ff6b6b', linestyle='--', linewidth=2, label=f'Mean: {mean:.2f}')
+        ax1.axvline(median, color='#4ecdc4', linestyle='--', linewidth=2, label=f'Median: {median:.2f}')
+        ax1.set_title(f'Distribution Analysis: {column}', fontsize=16, fontweight='300', color='white', pad=20)
+        ax1.set_xlabel(column, fontsize=12, color='#ccc')
+        ax1.set_ylabel('Frequency', fontsize=12, color='#ccc')
+        ax1.legend(frameon=False, fontsize=10)
+        ax1.grid(True, alpha=0.2)
+
+        # Box plot
+        bp = ax2.boxplot(data, patch_artist=True, widths=0.6)
+        bp['boxes'][0].set_facecolor('#00d4ff')
+        bp['boxes'][0].set_alpha(0.7)
+        for element in ['whiskers', 'fliers', 'medians', 'caps']:
+            for artist in bp[element]:
+                artist.set_color('white')
+        ax2.set_title('Outlier Detection', fontsize=16, fontweight='300', color='white', pad=20)
+        ax2.set_ylabel(column, fontsize=12, color='#ccc')
+        ax2.grid(True, alpha=0.2)
+
+        fig.tight_layout()
+        return save_figure(fig, filename)
+
+def render_category_chart(value_counts, total_rows, column, filename):
+    """Bar chart of the most frequent categories with counts and shares"""
+    with matplotlib.style.context(CHART_STYLE):
+        fig = Figure(figsize=(14, 8))
+        fig.patch.set_facecolor(BACKGROUND)
+        ax = fig.subplots()
+
+        bars = ax.bar(range(len(value_counts)), value_counts.values,
+                      color=CATEGORY_COLORS[:len(value_counts)], alpha=0.8)
+
+        # Add value labels on bars
+        for bar, value in zip(bars, value_counts.values):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+                   f'{value}\n({value/total_rows*100:.1f}%)', ha='center', va='bottom',
+                   fontsize=10, color='white', fontweight='500')
+
+        ax.set_title(f'Category Distribution: {column}', fontsize=16, fontweight='300', color='white', pad=20)
+        ax.set_xlabel('Categories', fontsize=12, color='#ccc')
+        ax.set_ylabel('Count', fontsize=12, color='#ccc')
+        ax.set_xticks(range(len(value_counts)))
+        ax.set_xticklabels(value_counts.index, rotation=45, ha='right', fontsize=10)
+        ax.grid(True, alpha=0.2, axis='y')
+
+        fig.tight_layout()
+        return save_figure(fig, filename)
+
+def render_overview_chart(n_rows, n_columns, filename):
+    """Big-number card with the dataset's size"""
+    with matplotlib.style.context(CHART_STYLE):
+        fig = Figure(figsize=(12, 8))
+        fig.patch.set_facecolor(BACKGROUND)
+        ax = fig.subplots()
+
         # Dataset info
-        ax.text(0.5, 0.7, f'{len(df):,}', ha='center', va='center', transform=ax.transAxes,
+        ax.text(0.5, 0.7, f'{n_rows:,}', ha='center', va='center', transform=ax.transAxes,
                 fontsize=48, color='#00d4ff', fontweight='200')
         ax.text(0.5, 0.5, 'Total Rows', ha='center', va='center', transform=ax.transAxes,
                 fontsize=18, color='#ccc')
-        ax.text(0.5, 0.3, f'{len(df.columns)} Columns', ha='center', va='center', transform=ax.transAxes,
+        ax.text(0.5, 0.3, f'{n_columns} Columns', ha='center', va='center', transform=ax.transAxes,
                 fontsize=14, color='#888')
         ax.set_title('Dataset Overview', fontsize=20, fontweight='300', color='white', pad=30)
         ax.axis('off')
-        
-        plt.tight_layout()
-        filename = f"overview_{dataset_id}_{timestamp}.png"
-        filepath = f"static/{filename}"
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='#0a0a0a')
-        plt.close()
-        chart_urls.append(f"/static/{filename}")
-        
-        return chart_urls
-    except Exception as e:
-        print(f"Chart generation error: {e}")
-        return []
\ No newline at end of file
+
+        fig.tight_layout()
+        return save_figure(fig, filename)
@@ -0,0 +1,39 @@
+"""
+Optional warm-up of the lazily imported analytics modules.
+
+The routes import these on first use, which would make the first analysis
+or training request pay a couple of seconds of imports. With
+WARMUP_ON_STARTUP the lifespan starts a background thread that imports them
+right after startup, so the server is ready at once and warm soon after.
+"""
+import importlib
+import threading
+import time
+
+# Heaviest first - together they pull in pandas, scipy, matplotlib and scikit-learn
+HEAVY_MODULES = [
+    "app.ml",
+    "app.analysis",
+    "app.visualization",
+    "app.storage",
+    "app.approximate",
+    "app.ingestion"
+]
+
+def warm_up(modules=HEAVY_MODULES):
+    """Import `modules` and return how long each took, in seconds"""
+    timings = {}
+    for name in modules:
+        start_time = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - start_time, 3)
+    return timings
+
+def start_warm_up():
+    """Warm up in a daemon thread - requests are served meanwhile"""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .config import ANALYSIS_MAX_WORKERS, CHART_MAX_WORKERS, ANALYSIS_MAX_QUEUED
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when a pool already has too much work"""
+
+class BoundedExecutor:
+    """
+    Runs blocking work off the event loop with a cap on outstanding tasks.
+
+    At most `max_workers` tasks run at once and `max_queued` more may wait;
+    anything beyond that raises PoolSaturated so the API can answer 429
+    instead of piling up requests it can't serve in time.
+    """
+
+    def __init__(self, name, max_workers, max_queued, use_processes=False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.use_processes = use_processes
+        self.in_flight = 0  # only touched from the event loop thread
+        self._executor = None
+
+    def start(self):
+        if self.use_processes:
+            # Separate processes keep matplotlib's global state out of the API process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def saturated(self):
+        return self.in_flight >= self.max_workers + self.max_queued
+
+    async def run(self, fn, *args, **kwargs):
+        if self.saturated:
+            raise PoolSaturated(f"{self.name} pool is busy ({self.in_flight} tasks in flight)")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_workers": self.max_workers,
+            "max_queued": self.max_queued
+        }
+
+# EDA is numpy/pandas heavy and releases the GIL for most of it - threads are enough
+analysis_pool = BoundedExecutor("analysis", ANALYSIS_MAX_WORKERS, ANALYSIS_MAX_QUEUED)
+# Chart rendering goes through matplotlib, which isn't thread-safe - use processes
+chart_pool = BoundedExecutor("charts", CHART_MAX_WORKERS, ANALYSIS_MAX_QUEUED, use_processes=True)
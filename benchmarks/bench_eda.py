@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized numeric stats against the per-column reference.
+
+Usage: python benchmarks/bench_eda.py [rows] [columns]
+Defaults to 1,000,000 x 200 (needs a few GB of RAM).
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.analysis import compute_numeric_insights, numeric_insights_per_column
+
+def make_frame(rows, columns, seed=42):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 4 == 0:
+            data[f"int_{i}"] = rng.integers(0, 1000, rows)
+        else:
+            col = rng.normal(rng.uniform(-100, 100), rng.uniform(1, 50), rows)
+            col[rng.random(rows) < 0.02] = np.nan
+            data[f"float_{i}"] = col
+    return pd.DataFrame(data)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"Building {rows:,} x {columns} frame...")
+    df = make_frame(rows, columns)
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+
+    reference, reference_time = timed(numeric_insights_per_column, df, numeric_cols)
+    vectorized, vectorized_time = timed(compute_numeric_insights, df, numeric_cols)
+
+    matches = reference == vectorized
+    print(f"Per-column:  {reference_time:8.2f}s")
+    print(f"Vectorized:  {vectorized_time:8.2f}s")
+    print(f"Speedup:     {reference_time / vectorized_time:8.1f}x")
+    print(f"Output identical: {'yes' if matches else 'NO'}")
+    return 0 if matches else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
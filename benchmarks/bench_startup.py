@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Measure how long `import app.main` takes and fail when it's over budget.
+
+Runs the import in a fresh interpreter under `python -X importtime` (best of
+a few runs, so a cold disk cache doesn't count) and prints the cumulative
+import time of each app module and the heaviest third-party imports.
+
+Usage: python benchmarks/bench_startup.py [budget_ms] [runs]
+The budget defaults to STARTUP_BUDGET_MS (1500). Exits 1 when over it.
+"""
+
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import STARTUP_BUDGET_MS
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+def import_times():
+    """{module: cumulative import microseconds} for one fresh `import app.main`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Indentation marks nesting - the first (outermost) import is the one that counts
+        times.setdefault(name.strip(), int(cumulative))
+    return times
+
+def main():
+    budget_ms = int(sys.argv[1]) if len(sys.argv) > 1 else STARTUP_BUDGET_MS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    times = min((import_times() for _ in range(runs)), key=lambda run: run["app.main"])
+    total_ms = times["app.main"] / 1000
+
+    print("App modules (cumulative):")
+    for name, us in sorted(times.items(), key=lambda item: -item[1]):
+        if name.startswith("app"):
+            print(f"  {name:<28} {us / 1000:8.1f}ms")
+
+    print("Heaviest top-level packages:")
+    packages = {name: us for name, us in times.items() if "." not in name and name != "app"}
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<28} {us / 1000:8.1f}ms")
+
+    print(f"import app.main: {total_ms:.0f}ms (best of {runs}), budget {budget_ms}ms")
+    # Nothing here should pull in the analytics stack - that's what the lazy imports are for
+    heavy = [name for name in ("pandas", "numpy", "scipy", "sklearn", "matplotlib") if name in times]
+    if heavy:
+        print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+    within = total_ms <= budget_ms and not heavy
+    print("OK" if within else "OVER BUDGET")
+    return 0 if within else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
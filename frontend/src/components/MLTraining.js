@@ -23,7 +23,20 @@ const MLTraining = ({ datasetId, columns }) => {
         formData,
         { headers: { 'Content-Type': 'multipart/form-data' } }
       );
-      setResult(response.data);
+
+      // Training runs as a background job - poll until it finishes
+      const jobId = response.data.job_id;
+      let job;
+      do {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = (await axios.get(`/api/v1/jobs/${jobId}`)).data;
+      } while (job.status === 'queued' || job.status === 'running');
+
+      if (job.status === 'completed') {
+        setResult(job.result);
+      } else {
+        setError(job.error || 'Training failed');
+      }
     } catch (err) {
       setError(err.response?.data?.detail || 'Training failed');
     } finally {
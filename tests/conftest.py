@@ -0,0 +1,76 @@
+"""
+Shared setup for the test suite.
+
+app.config reads the environment at import time, so the database, data and
+chart directories are pointed at a scratch workspace before anything from
+app is imported. Models are saved under a relative models/ directory, so the
+tests also run from inside that workspace.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKSPACE = tempfile.mkdtemp(prefix="datalab-tests-")
+os.makedirs(os.path.join(WORKSPACE, "models"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKSPACE, 'dashboard.db')}",
+    "STATIC_DIR": os.path.join(WORKSPACE, "static"),
+    "DATA_DIR": os.path.join(WORKSPACE, "data"),
+    "OPENROUTER_API_KEY": "",
+    "WARMUP_ON_STARTUP": "false",
+    "TRAINING_MAX_CONCURRENCY": "1",
+    # Small chunks so a few thousand rows already take the multi-chunk paths
+    "UPLOAD_CHUNK_BYTES": "4096",
+    "CSV_CHUNK_ROWS": "500"
+})
+
+@pytest.fixture(scope="session", autouse=True)
+def in_workspace():
+    previous = os.getcwd()
+    os.chdir(WORKSPACE)
+    yield WORKSPACE
+    os.chdir(previous)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def upload_csv(client):
+    """Upload a DataFrame as a CSV and return the new dataset id"""
+    def upload(df, filename="data.csv"):
+        response = client.post("/api/v1/upload", files={"file": (filename, df.to_csv(index=False), "text/csv")})
+        assert response.status_code == 200, response.text
+        return response.json()["dataset_id"]
+    return upload
+
+@pytest.fixture
+def trained_model(upload_csv):
+    """Upload a DataFrame, train on it in-process and register the model - returns (model id, training result)"""
+    def train(df, target_column):
+        from app.database import SessionLocal, MLModel
+        from app.ml import train_model
+        from app.storage import get_dataset
+
+        dataset_id = upload_csv(df)
+        result = train_model(get_dataset(dataset_id), target_column, dataset_id)
+        db = SessionLocal()
+        try:
+            model = MLModel(dataset_id=dataset_id, model_name=result["model_name"], target_column=target_column,
+                            model_type=result["model_type"], algorithm=result["algorithm"], score=result["score"],
+                            model_path=result["model_path"], pipeline_path=result["pipeline_path"])
+            db.add(model)
+            db.commit()
+            return model.id, result
+        finally:
+            db.close()
+    return train
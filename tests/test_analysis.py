@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analysis import perform_eda, compute_numeric_insights, numeric_insights_per_column, NUMERIC_BLOCK_COLUMNS
+
+def make_frame(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "normal": rng.normal(50, 10, rows),
+        "counts": rng.integers(0, 20, rows),
+        "skewed": rng.exponential(3, rows),
+        "constant": np.full(rows, 7.0),
+        "sparse": np.where(rng.random(rows) < 0.9, 0.0, rng.normal(size=rows)),
+        "city": rng.choice(["Oslo", "Lima", "Pune", "Kyiv"], rows, p=[0.4, 0.3, 0.2, 0.1]),
+        "code": [f"c{i % 37}" for i in range(rows)]
+    })
+    df.loc[::11, "normal"] = np.nan
+    df.loc[::13, "city"] = None
+    df["empty"] = np.nan
+    # A block of exact duplicate rows
+    return pd.concat([df, df.head(50)], ignore_index=True)
+
+def baseline_categorical(df):
+    """Categorical insights as the original perform_eda computed them"""
+    insights = {}
+    for col in df.select_dtypes(include=["object"]).columns:
+        data = df[col].dropna()
+        value_counts = data.value_counts()
+        insights[col] = {
+            "unique_count": int(data.nunique()),
+            "most_frequent": str(value_counts.index[0]),
+            "most_frequent_count": int(value_counts.iloc[0]),
+            "diversity_ratio": float(round(data.nunique() / len(data), 3)),
+            "top_categories": {str(k): int(v) for k, v in value_counts.head(5).items()}
+        }
+    return insights
+
+def assert_same_insights(actual, expected):
+    """Equal column by column, counting NaN (skew of a constant column) as equal to NaN"""
+    assert actual.keys() == expected.keys()
+    for col, stats in expected.items():
+        assert actual[col] == pytest.approx(stats, nan_ok=True, rel=0, abs=0), col
+
+def test_numeric_insights_match_per_column_reference():
+    df = make_frame()
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    assert_same_insights(compute_numeric_insights(df, numeric_cols), numeric_insights_per_column(df, numeric_cols))
+
+def test_numeric_insights_match_across_column_blocks():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(size=(300, NUMERIC_BLOCK_COLUMNS + 5)),
+                      columns=[f"x{i}" for i in range(NUMERIC_BLOCK_COLUMNS + 5)])
+    df.iloc[::7, ::3] = np.nan
+    assert_same_insights(compute_numeric_insights(df, df.columns), numeric_insights_per_column(df, df.columns))
+
+def test_perform_eda_matches_baseline():
+    df = make_frame()
+    eda = perform_eda(df)
+
+    assert "error" not in eda
+    assert eda["shape"] == [len(df), df.shape[1]]
+    assert eda["missing_values"] == {col: int(v) for col, v in df.isnull().sum().items()}
+    assert eda["categorical_insights"] == baseline_categorical(df)
+    assert eda["quality_metrics"] == {
+        "completeness_ratio": float(round((df.size - df.isnull().sum().sum()) / df.size, 3)),
+        "duplicate_rows": int(df.duplicated().sum()),
+        "columns_with_missing": int((df.isnull().sum() > 0).sum()),
+        "numeric_columns": 6,
+        "categorical_columns": 2
+    }
+    assert_same_insights(eda["numeric_insights"], numeric_insights_per_column(df, df.select_dtypes(include=[np.number]).columns))
+    # The all-missing column gets no insights, as before
+    assert "empty" not in eda["numeric_insights"]
+
+    corr = df.select_dtypes(include=[np.number]).corr()
+    for col1, row in eda["correlations"]["matrix"].items():
+        for col2, value in row.items():
+            expected = corr.loc[col1, col2]
+            assert value == pytest.approx(0.0 if np.isnan(expected) else expected, abs=1e-9)
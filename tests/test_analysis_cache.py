@@ -0,0 +1,102 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import routes
+from app.database import SessionLocal, AnalysisCache
+from app.llm import is_summary_error
+from app.config import STATIC_DIR
+
+# Cache keys are content hashes - every test gets content of its own
+seeds = itertools.count()
+
+@pytest.fixture
+def dataset_id(upload_csv):
+    rng = np.random.default_rng(next(seeds))
+    return upload_csv(pd.DataFrame({
+        "x": rng.normal(size=300), "y": rng.integers(0, 9, 300), "group": rng.choice(["a", "b"], 300)
+    }))
+
+def analyze(client, dataset_id, **params):
+    response = client.get(f"/api/v1/analyze/{dataset_id}", params={"chart_mode": "data", **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def cache_rows(dataset_id):
+    db = SessionLocal()
+    try:
+        return db.query(AnalysisCache).filter(AnalysisCache.dataset_id == dataset_id).all()
+    finally:
+        db.close()
+
+def test_repeat_analysis_is_served_from_cache(client, dataset_id):
+    first = analyze(client, dataset_id)
+    second = analyze(client, dataset_id)
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["stats"] == first["stats"]
+    assert second["charts"] == first["charts"]
+
+def test_failed_summary_is_cached_and_retried_alone(client, dataset_id, monkeypatch):
+    # No OpenRouter key in the tests - the first summary is an error message
+    first = analyze(client, dataset_id)
+    assert is_summary_error(first["summary"])
+    assert cache_rows(dataset_id)[0].summary_failed
+
+    calls = []
+    async def summary_now_works(stats):
+        calls.append(stats)
+        return "Two numeric columns and one category."
+    monkeypatch.setattr(routes, "generate_summary", summary_now_works)
+
+    retried = analyze(client, dataset_id)
+    assert retried["cached"] is True
+    assert retried["summary"] == "Two numeric columns and one category."
+    assert calls == [first["stats"]]
+    assert not cache_rows(dataset_id)[0].summary_failed
+
+    # Fixed for good - the next hit doesn't ask again
+    assert analyze(client, dataset_id)["summary"] == retried["summary"]
+    assert len(calls) == 1
+
+def test_refresh_and_other_options_bypass_the_entry(client, dataset_id):
+    analyze(client, dataset_id)
+
+    assert analyze(client, dataset_id, refresh="true")["cached"] is False
+    assert analyze(client, dataset_id, correlation_method="spearman")["cached"] is False
+    assert analyze(client, dataset_id, correlation_method="spearman")["cached"] is True
+
+def test_failed_eda_is_not_cached(client, dataset_id, monkeypatch):
+    from app import approximate
+    monkeypatch.setattr(approximate, "perform_eda_approximate",
+                        lambda dataset_id, correlation_method: {"shape": [0, 0], "error": "out of disk"})
+
+    result = analyze(client, dataset_id, mode="approximate")
+
+    assert result["stats"]["error"] == "out of disk"
+    assert cache_rows(dataset_id) == []
+
+def test_cache_table_is_pruned_to_its_bound(client, dataset_id, monkeypatch):
+    monkeypatch.setattr(routes, "ANALYSIS_CACHE_MAX_ENTRIES", 2)
+
+    for method in ("pearson", "spearman"):
+        analyze(client, dataset_id, correlation_method=method)
+    analyze(client, dataset_id, mode="approximate")
+
+    keys = [row.cache_key for row in cache_rows(dataset_id)]
+    # The oldest (pearson) entry went
+    assert len(keys) == 2
+    assert not any(key.endswith(":exact:pearson:data") for key in keys)
+
+def test_missing_chart_files_force_a_recompute(client, dataset_id):
+    first = analyze(client, dataset_id, chart_mode="image")
+    assert first["charts"]
+    assert analyze(client, dataset_id, chart_mode="image")["cached"] is True
+
+    os.remove(os.path.join(STATIC_DIR, os.path.basename(first["charts"][0])))
+
+    assert analyze(client, dataset_id, chart_mode="image")["cached"] is False
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import storage
+from app.analysis import perform_eda
+from app.database import SessionLocal, Dataset
+from app.storage import dataset_csv_path, load_dataset, store_parts, stored_dtypes
+
+def make_frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "units": rng.integers(0, 40, rows),
+        "price": rng.normal(20, 4, rows).round(2),
+        "store": rng.choice(["a", "b", "c"], rows)
+    })
+    df.loc[::11, "price"] = np.nan
+    return df
+
+def append(client, dataset_id, df):
+    return client.post(f"/api/v1/datasets/{dataset_id}/append",
+                       files={"file": ("more.csv", df.to_csv(index=False), "text/csv")})
+
+def dataset_rows(dataset_id):
+    db = SessionLocal()
+    try:
+        return db.get(Dataset, dataset_id).rows
+    finally:
+        db.close()
+
+def test_incremental_stats_match_exact_eda_of_the_combined_data(client, upload_csv):
+    first, second = make_frame(1500, 0), make_frame(700, 1)
+    dataset_id = upload_csv(first)
+    # Saves the streaming state the append folds the new rows into
+    assert client.get(f"/api/v1/analyze/{dataset_id}", params={"mode": "streaming", "chart_mode": "data"}).status_code == 200
+
+    response = append(client, dataset_id, second)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["appended_rows"], body["rows"]) == (700, 2200)
+    stats = body["stats"]
+    exact = perform_eda(pd.concat([first, second], ignore_index=True))
+    assert stats["shape"] == exact["shape"]
+    assert stats["missing_values"] == exact["missing_values"]
+    assert stats["categorical_insights"]["store"]["top_categories"] == exact["categorical_insights"]["store"]["top_categories"]
+    for col in ("units", "price"):
+        for stat in ("mean", "std", "min", "max"):
+            assert stats["numeric_insights"][col][stat] == pytest.approx(exact["numeric_insights"][col][stat], abs=1e-3)
+    assert len(store_parts(dataset_id)) == 2
+    assert len(load_dataset(dataset_id)) == 2200
+
+def test_widened_column_rewrites_the_store(client, upload_csv):
+    dataset_id = upload_csv(make_frame(300, 2).assign(price=lambda df: df["price"].fillna(0).round()).astype({"price": int}))
+    assert str(stored_dtypes(dataset_id)["price"]) == "int64"
+
+    assert append(client, dataset_id, make_frame(50, 3)).status_code == 200
+
+    assert len(store_parts(dataset_id)) == 1
+    assert str(stored_dtypes(dataset_id)["price"]) == "float64"
+    assert len(load_dataset(dataset_id)) == 350
+
+@pytest.mark.parametrize("widened", [False, True])
+def test_failed_parquet_write_leaves_the_dataset_unchanged(client, upload_csv, monkeypatch, widened):
+    df = make_frame(400, 4)
+    if widened:
+        # Integer prices, so the float rows force a store rewrite
+        df["price"] = df["price"].fillna(0).round().astype(int)
+    dataset_id = upload_csv(df)
+    csv_before = open(dataset_csv_path(dataset_id), "rb").read()
+    parts_before = store_parts(dataset_id)
+
+    class FailingWriter(storage.pq.ParquetWriter):
+        def write_table(self, table, *args, **kwargs):
+            raise OSError("disk full")
+    monkeypatch.setattr(storage.pq, "ParquetWriter", FailingWriter)
+
+    response = append(client, dataset_id, make_frame(60, 5))
+
+    assert response.status_code == 500
+    assert "disk full" in response.json()["detail"]
+    assert open(dataset_csv_path(dataset_id), "rb").read() == csv_before
+    assert store_parts(dataset_id) == parts_before
+    assert not os.path.exists(storage.dataset_store_path(dataset_id) + ".tmp")
+    assert len(load_dataset(dataset_id)) == 400
+    assert dataset_rows(dataset_id) == 400
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analysis import perform_eda
+from app.approximate import perform_eda_approximate, perform_eda_streaming
+from app.storage import load_dataset
+
+@pytest.fixture
+def dataset_id(upload_csv):
+    rng = np.random.default_rng(0)
+    rows = 3000
+    df = pd.DataFrame({
+        "amount": rng.exponential(20, rows).round(2),
+        "units": rng.integers(0, 50, rows),
+        "channel": rng.choice(["web", "store", "phone", "partner"], rows, p=[0.5, 0.3, 0.15, 0.05])
+    })
+    df.loc[::9, "amount"] = np.nan
+    df.loc[::17, "channel"] = None
+    return upload_csv(pd.concat([df, df.head(120)], ignore_index=True))
+
+@pytest.mark.parametrize("eda", [perform_eda_approximate, perform_eda_streaming])
+def test_chunked_eda_agrees_with_exact(dataset_id, eda):
+    exact = perform_eda(load_dataset(dataset_id))
+    result = eda(dataset_id)
+
+    assert "error" not in result
+    assert result["shape"] == exact["shape"]
+    assert result["missing_values"] == exact["missing_values"]
+    assert result["categorical_insights"]["channel"]["top_categories"] == \
+        exact["categorical_insights"]["channel"]["top_categories"]
+    # Few enough rows that the duplicate count is still exact
+    assert result["quality_metrics"]["duplicate_rows"] == exact["quality_metrics"]["duplicate_rows"]
+    for col in ("amount", "units"):
+        for stat in ("mean", "std", "min", "max", "zero_count"):
+            assert result["numeric_insights"][col][stat] == pytest.approx(exact["numeric_insights"][col][stat], abs=1e-3)
+        assert result["numeric_insights"][col]["median"] == pytest.approx(
+            exact["numeric_insights"][col]["median"], rel=0.05, abs=1
+        )
+    assert result["error_bounds"]
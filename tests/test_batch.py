@@ -0,0 +1,84 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.database import SessionLocal, MLModel
+from app.ml import prepare_features, prepare_shared_features, shared_features_for
+from app.tasks import BATCH_DIR
+from test_jobs import wait_for
+
+def make_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "age": rng.integers(18, 70, rows),
+        "salary": rng.normal(50_000, 10_000, rows).round(2),
+        "dept": rng.choice(["IT", "HR", "Finance"], rows)
+    })
+    df["band"] = np.where(df["salary"] > 50_000, "high", "low")
+    # A target with gaps - its rows differ, so it can't share the matrix
+    df["grade"] = rng.choice(["a", "b"], rows)
+    df.loc[::9, "grade"] = None
+    return df
+
+def batch_files():
+    return [name for _, _, files in os.walk(BATCH_DIR) for name in files]
+
+def test_shared_matrix_matches_per_target_preparation():
+    df = make_frame()
+    shared = prepare_shared_features(df, ["band", "dept", "grade", "absent"])
+
+    assert list(shared["targets"]) == ["band", "dept"]
+    for target in ("band", "dept"):
+        X, y, pipeline = shared_features_for(shared, target)
+        X_alone, y_alone, pipeline_alone = prepare_features(df, target)
+        pd.testing.assert_frame_equal(X, X_alone, check_dtype=False)
+        assert y.equals(y_alone)
+        assert pipeline.columns == pipeline_alone.columns
+        pd.testing.assert_series_equal(pipeline.fill_values, pipeline_alone.fill_values)
+
+def test_no_shareable_target():
+    assert prepare_shared_features(make_frame(), ["grade"]) is None
+
+@pytest.mark.parametrize("targets", [["band", "dept", "grade"], ["grade"]])
+def test_batch_trains_every_target(client, upload_csv, targets):
+    dataset_id = upload_csv(make_frame(seed=len(targets)))
+
+    response = client.post("/api/v1/train/batch", params={"dataset_id": dataset_id, "target_columns": targets})
+    assert response.status_code == 200
+    batch, _ = wait_for(client, response.json()["job_id"])
+
+    assert batch["status"] == "completed", batch["error"]
+    jobs = batch["result"]["jobs"]
+    assert [job["target_column"] for job in jobs] == targets
+    assert {job["target_column"]: job["shared_features"] for job in jobs} == \
+        {target: target != "grade" for target in targets}
+    for job in jobs:
+        child, _ = wait_for(client, job["job_id"])
+        assert child["status"] == "completed", child["error"]
+        assert child["result"]["model_type"] == "classification"
+
+    db = SessionLocal()
+    try:
+        trained = {model.target_column for model in db.query(MLModel).filter(MLModel.dataset_id == dataset_id)}
+    finally:
+        db.close()
+    assert trained == set(targets)
+    # The shared matrix goes once its last job has finished (just after its status is recorded)
+    deadline = time.monotonic() + 5
+    while batch_files() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert batch_files() == []
+
+def test_batch_with_an_unknown_target_fails(client, upload_csv):
+    dataset_id = upload_csv(make_frame(rows=50, seed=7))
+
+    job_id = client.post("/api/v1/train/batch",
+                         params={"dataset_id": dataset_id, "target_columns": ["band", "nope"]}).json()["job_id"]
+    job, _ = wait_for(client, job_id)
+
+    assert job["status"] == "failed"
+    assert "nope" in job["error"]
+    assert client.post("/api/v1/train/batch", params={"dataset_id": 999999, "target_columns": ["band"]}).status_code == 404
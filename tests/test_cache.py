@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+
+from app.cache import LRUCache, dataset_cache
+from app.storage import get_dataset, store_parts
+
+def make_cache(max_bytes=100):
+    return LRUCache(max_bytes, sizeof=len)
+
+def test_evicts_least_recently_used_first():
+    cache = make_cache()
+    cache.put("a", "x" * 40)
+    cache.put("b", "x" * 40)
+    # Touching "a" makes "b" the oldest
+    assert cache.get("a") == "x" * 40
+    cache.put("c", "x" * 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes == 80
+
+def test_value_larger_than_budget_is_not_cached():
+    cache = make_cache()
+    cache.put("a", "x" * 40)
+    cache.put("huge", "x" * 101)
+
+    assert cache.get("huge") is None
+    assert cache.get("a") is not None
+
+def test_replacing_a_key_updates_its_size():
+    cache = make_cache()
+    cache.put("a", "x" * 60)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 90)
+
+    assert cache.current_bytes == 100
+    assert cache.stats()["evictions"] == 0
+
+def test_stale_signature_is_a_miss():
+    cache = make_cache()
+    cache.put("a", "old", signature=1)
+
+    assert cache.get("a", signature=2) is None
+    # The stale entry is dropped, not kept around for the old signature
+    assert cache.get("a", signature=1) is None
+    assert cache.stats()["misses"] == 2
+
+def test_invalidate_matching_keys():
+    cache = make_cache()
+    cache.put((1, "pearson"), "x")
+    cache.put((2, "pearson"), "y")
+    cache.invalidate(lambda key: key[0] == 1)
+
+    assert cache.get((1, "pearson")) is None
+    assert cache.get((2, "pearson")) == "y"
+
+def test_get_dataset_reuses_the_loaded_frame(upload_csv):
+    dataset_id = upload_csv(pd.DataFrame({"x": range(100), "y": ["a", "b"] * 50}))
+
+    first = get_dataset(dataset_id)
+    assert get_dataset(dataset_id) is first
+    # A column subset is cut from the cached full frame
+    assert get_dataset(dataset_id, ["y"])["y"].tolist() == first["y"].tolist()
+
+def test_get_dataset_reloads_when_the_file_changes(upload_csv):
+    dataset_id = upload_csv(pd.DataFrame({"x": range(100)}))
+    first = get_dataset(dataset_id)
+    misses = dataset_cache.stats()["misses"]
+
+    part = store_parts(dataset_id)[0]
+    stat = os.stat(part)
+    os.utime(part, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_dataset(dataset_id) is not first
+    assert dataset_cache.stats()["misses"] == misses + 1
@@ -0,0 +1,92 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analysis import correlation_matrix, strongest_pairs, format_correlations
+from app.config import CORRELATION_MATRIX_MAX_COLUMNS
+
+def make_frame(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=rows)
+    return pd.DataFrame({
+        "a": base,
+        "b": base * 2 + rng.normal(scale=0.1, size=rows),
+        "c": -base + rng.normal(scale=0.5, size=rows),
+        "noise": rng.normal(size=rows)
+    })
+
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_matrix_matches_pandas(method):
+    df = make_frame()
+    expected = df.corr(method=method).to_numpy()
+    np.testing.assert_allclose(correlation_matrix(df, df.columns, method), expected, atol=1e-9)
+
+def test_matrix_with_missing_values_uses_pairwise_rows():
+    df = make_frame()
+    df.loc[::5, "b"] = np.nan
+    df.loc[::7, "noise"] = np.nan
+    np.testing.assert_allclose(correlation_matrix(df, df.columns), df.corr().to_numpy(), atol=1e-9)
+
+def test_strongest_pairs_are_thresholded_and_ordered():
+    df = make_frame()
+    corr = df.corr().to_numpy()
+
+    pairs = strongest_pairs(corr, list(df.columns), threshold=0.5, top_k=10)
+
+    assert {(p["column1"], p["column2"]) for p in pairs} == {("a", "b"), ("a", "c"), ("b", "c")}
+    strengths = [abs(p["correlation"]) for p in pairs]
+    assert strengths == sorted(strengths, reverse=True)
+    assert all(strength > 0.5 for strength in strengths)
+    assert pairs[0]["correlation"] == round(corr[0, 1], 3)
+    assert len(strongest_pairs(corr, list(df.columns), threshold=0.5, top_k=1)) == 1
+
+def test_format_embeds_small_matrices_only():
+    df = make_frame()
+    small = format_correlations(df.corr().to_numpy(), df.columns)
+    assert small["matrix"]["a"]["b"] == pytest.approx(df["a"].corr(df["b"]))
+    assert small["strong_correlations"]
+
+    columns = [f"x{i}" for i in range(CORRELATION_MATRIX_MAX_COLUMNS + 1)]
+    wide = format_correlations(np.eye(len(columns)), columns, method="spearman")
+    assert wide["matrix_omitted"] is True
+    assert "matrix" not in wide
+    assert wide["method"] == "spearman"
+
+def test_correlations_endpoint_pages_rows(client, upload_csv):
+    df = make_frame(seed=4)
+    df["label"] = "x"
+    dataset_id = upload_csv(df)
+    url = f"/api/v1/analyze/{dataset_id}/correlations"
+
+    first = client.get(url, params={"limit": 2}).json()
+    rest = client.get(url, params={"offset": 2, "limit": 2}).json()
+
+    assert first["columns"] == ["a", "b", "c", "noise"]
+    assert first["total"] == 4
+    assert list(first["rows"]) == ["a", "b"]
+    assert list(rest["rows"]) == ["c", "noise"]
+    assert first["rows"]["a"][1] == pytest.approx(df["a"].corr(df["b"]), abs=1e-6)
+
+def test_correlations_endpoint_npz(client, upload_csv):
+    df = make_frame(seed=5)
+    dataset_id = upload_csv(df)
+
+    response = client.get(f"/api/v1/analyze/{dataset_id}/correlations", params={"format": "npz", "method": "spearman"})
+
+    assert response.status_code == 200
+    archive = np.load(io.BytesIO(response.content))
+    assert archive["matrix"].dtype == np.float32
+    assert archive["columns"].tolist() == list(df.columns)
+    np.testing.assert_allclose(archive["matrix"], df.corr(method="spearman").to_numpy(), atol=1e-6)
+
+def test_correlations_endpoint_rejects_bad_parameters(client, upload_csv):
+    dataset_id = upload_csv(make_frame(rows=50))
+    url = f"/api/v1/analyze/{dataset_id}/correlations"
+
+    assert client.get(url, params={"offset": -1}).status_code == 400
+    assert client.get(url, params={"limit": 0}).status_code == 400
+    assert client.get(url, params={"format": "csv"}).status_code == 400
+    assert client.get(url, params={"method": "kendall"}).status_code == 400
+    assert client.get("/api/v1/analyze/999999/correlations").status_code == 404
@@ -0,0 +1,105 @@
+from sqlalchemy import create_engine, inspect
+
+from app import database
+from app.database import Base, MIGRATIONS, init_db
+
+# Tables as the first release created them - before any migration existed
+BASELINE_SCHEMA = [
+    """CREATE TABLE datasets (id INTEGER PRIMARY KEY, name VARCHAR, filename VARCHAR,
+       upload_time DATETIME, rows INTEGER, columns INTEGER)""",
+    """CREATE TABLE analyses (id INTEGER PRIMARY KEY, dataset_id INTEGER, analysis_time DATETIME,
+       processing_time FLOAT, summary TEXT, stats TEXT, type VARCHAR)""",
+    """CREATE TABLE ml_models (id INTEGER PRIMARY KEY, dataset_id INTEGER, model_name VARCHAR,
+       target_column VARCHAR, model_type VARCHAR, algorithm VARCHAR, score FLOAT, feature_importance TEXT,
+       model_path VARCHAR, chart_path VARCHAR, created_at DATETIME)""",
+    "CREATE INDEX ix_datasets_id ON datasets (id)",
+    "CREATE INDEX ix_datasets_name ON datasets (name)",
+    "CREATE INDEX ix_analyses_id ON analyses (id)",
+    "CREATE INDEX ix_ml_models_id ON ml_models (id)",
+    "CREATE INDEX ix_ml_models_model_name ON ml_models (model_name)",
+    "INSERT INTO datasets (id, name, rows, columns) VALUES (1, 'sales', 10, 3)",
+    "INSERT INTO analyses (dataset_id, analysis_time, processing_time, type) VALUES (1, '2024-01-01 10:00:00', 1.5, 'EDA')",
+    "INSERT INTO analyses (dataset_id, analysis_time, processing_time, type) VALUES (1, '2024-01-02 10:00:00', 2.5, 'EDA')",
+    "INSERT INTO ml_models (dataset_id, model_name, score) VALUES (1, 'model_1', 0.9)"
+]
+
+def use_database(monkeypatch, path):
+    engine = create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(database, "engine", engine)
+    return engine
+
+def columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+def test_baseline_database_is_migrated_without_losing_rows(monkeypatch, tmp_path):
+    engine = use_database(monkeypatch, tmp_path / "baseline.db")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+
+    init_db()
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == len(MIGRATIONS)
+        assert conn.exec_driver_sql("SELECT count(*) FROM analyses").scalar() == 2
+        assert conn.exec_driver_sql("SELECT model_name FROM ml_models").scalar() == "model_1"
+        rollups = dict(conn.exec_driver_sql("SELECT key, count FROM rollups").all())
+        total = conn.exec_driver_sql("SELECT total FROM rollups WHERE key = 'analyses:EDA'").scalar()
+    assert rollups == {"datasets": 1, "analyses:EDA": 2}
+    assert total == 4.0
+    assert {"content_hash"} <= columns(engine, "datasets")
+    assert {"stages"} <= columns(engine, "analyses")
+    assert {"pipeline_path"} <= columns(engine, "ml_models")
+    assert "ix_analyses_type_time" in {index["name"] for index in inspect(engine).get_indexes("analyses")}
+
+def schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (columns(engine, table), {index["name"] for index in inspector.get_indexes(table)})
+        for table in inspector.get_table_names()
+    }
+
+def test_migrated_baseline_has_the_same_schema_as_a_fresh_database(monkeypatch, tmp_path):
+    fresh = use_database(monkeypatch, tmp_path / "fresh.db")
+    init_db()
+    migrated = use_database(monkeypatch, tmp_path / "baseline.db")
+    with migrated.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+    init_db()
+
+    assert schema(migrated) == schema(fresh)
+
+def test_each_migration_is_idempotent(monkeypatch, tmp_path):
+    engine = use_database(monkeypatch, tmp_path / "rerun.db")
+    init_db()
+    with engine.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
+
+def test_newer_database_only_runs_later_migrations(monkeypatch, tmp_path):
+    engine = use_database(monkeypatch, tmp_path / "v4.db")
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        # A database from before migrations 5 and 6
+        conn.exec_driver_sql("ALTER TABLE analyses DROP COLUMN stages")
+        conn.exec_driver_sql("ALTER TABLE jobs DROP COLUMN owner")
+        conn.exec_driver_sql("INSERT INTO rollups (key, count, total) VALUES ('datasets', 7, 0)")
+        conn.exec_driver_sql("PRAGMA user_version = 4")
+
+    init_db()
+
+    assert "stages" in columns(engine, "analyses")
+    assert "owner" in columns(engine, "jobs")
+    with engine.connect() as conn:
+        # The rollup backfill (migration 4) isn't run again
+        assert conn.exec_driver_sql("SELECT count FROM rollups WHERE key = 'datasets'").scalar() == 7
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == len(MIGRATIONS)
+
+def test_init_db_is_idempotent(monkeypatch, tmp_path):
+    engine = use_database(monkeypatch, tmp_path / "fresh.db")
+    init_db()
+    init_db()
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == len(MIGRATIONS)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analysis import perform_eda
+from app.dtypes import optimize_dtypes, downcast_numeric
+
+def make_frame(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "small_int": rng.integers(0, 100, rows),
+        "big_int": rng.integers(0, 2 ** 40, rows),
+        "halves": rng.integers(0, 200, rows) / 2,
+        "precise": rng.normal(size=rows),
+        "flag": rng.integers(0, 2, rows).astype(bool),
+        "region": rng.choice(["north", "south", "east"], rows),
+        "comment": [f"note {i}" for i in range(rows)]
+    })
+
+def test_numbers_get_the_narrowest_exact_type():
+    df = optimize_dtypes(make_frame(), arrow_strings=False)
+
+    assert df["small_int"].dtype == np.int8
+    assert df["big_int"].dtype == np.int64
+    # Halves are exact in float32, random normals aren't
+    assert df["halves"].dtype == np.float32
+    assert df["precise"].dtype == np.float64
+    assert df["flag"].dtype == bool
+
+def test_downcast_keeps_values():
+    series = pd.Series([0.5, np.nan, 1.25])
+    narrowed = downcast_numeric(series)
+    assert narrowed.dtype == np.float32
+    assert narrowed.astype(np.float64).equals(series)
+    assert downcast_numeric(pd.Series([0.1])).dtype == np.float64
+    assert downcast_numeric(pd.Series([3, 200], dtype=np.uint64)).dtype == np.uint8
+
+def test_low_cardinality_text_becomes_category():
+    df = optimize_dtypes(make_frame(), arrow_strings=False)
+
+    assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+    assert df["comment"].dtype == object
+
+def test_high_cardinality_text_moves_to_arrow_strings():
+    df = optimize_dtypes(make_frame(), arrow_strings=True)
+    assert df["comment"].dtype == "string[pyarrow]"
+
+def test_memory_saving_is_recorded():
+    df = optimize_dtypes(make_frame(), arrow_strings=False)
+
+    saving = df.attrs["memory_optimization"]
+    assert saving["after_mb"] < saving["before_mb"]
+    assert 0 < saving["saved_pct"] < 100
+
+def test_eda_is_unchanged_by_the_narrower_types():
+    df = make_frame()
+    df.loc[::7, "region"] = None
+
+    exact = perform_eda(df.copy())
+    optimized = perform_eda(optimize_dtypes(df.copy(), arrow_strings=False))
+
+    assert optimized["missing_values"] == exact["missing_values"]
+    assert optimized["categorical_insights"]["region"] == exact["categorical_insights"]["region"]
+    for col in ("small_int", "halves", "precise"):
+        assert optimized["numeric_insights"][col]["mean"] == pytest.approx(exact["numeric_insights"][col]["mean"])
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.database import SessionLocal, Dataset
+from app.ingestion import save_upload, profile_csv, merge_dtypes, chain_content_hash
+from app.config import UPLOAD_CHUNK_BYTES
+
+class FakeUpload:
+    """Just enough of UploadFile for save_upload - records the size of each read"""
+
+    def __init__(self, data):
+        self._buffer = io.BytesIO(data)
+        self.reads = []
+
+    async def read(self, size=-1):
+        chunk = self._buffer.read(size)
+        self.reads.append(size)
+        return chunk
+
+def write_csv(tmp_path, df, name="data.csv"):
+    path = tmp_path / name
+    df.to_csv(path, index=False)
+    return str(path)
+
+def test_save_upload_streams_in_bounded_chunks(tmp_path):
+    data = b"a,b\n" + b"".join(f"{i},{i * 2}\n".encode() for i in range(5000))
+    upload = FakeUpload(data)
+
+    total_bytes, digest = asyncio.run(save_upload(upload, tmp_path / "out.csv"))
+
+    assert total_bytes == len(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "out.csv").read_bytes() == data
+    assert len(upload.reads) > 1
+    assert all(size == UPLOAD_CHUNK_BYTES for size in upload.reads)
+
+def test_profile_matches_a_full_read(tmp_path):
+    rows = 2000
+    df = pd.DataFrame({
+        "count": np.arange(rows),
+        # Whole numbers in the first chunks, a gap in the last one
+        "score": np.arange(rows, dtype=float),
+        "flag": [True, False] * (rows // 2),
+        "code": [str(i) for i in range(rows)]
+    })
+    df.loc[rows - 3, "score"] = np.nan
+    df.loc[rows - 7, "code"] = "unknown"
+    path = write_csv(tmp_path, df)
+
+    profile = profile_csv(path, chunk_rows=300)
+
+    full = pd.read_csv(path)
+    assert profile["rows"] == rows
+    assert profile["columns"] == 4
+    assert profile["column_names"] == ["count", "score", "flag", "code"]
+    assert {col: str(dtype) for col, dtype in profile["dtypes"].items()} == \
+        {col: str(dtype) for col, dtype in full.dtypes.items()}
+
+def test_profile_of_header_only_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("a,b\n")
+    assert profile_csv(str(path))["rows"] == 0
+
+def test_merge_dtypes():
+    int64, float64, obj, boolean = (np.dtype(name) for name in ("int64", "float64", "object", "bool"))
+    assert merge_dtypes(int64, int64) == int64
+    assert merge_dtypes(int64, float64) == float64
+    assert merge_dtypes(float64, obj) == obj
+    assert merge_dtypes(boolean, int64) == obj
+
+def test_chain_content_hash_depends_on_both_parts():
+    assert chain_content_hash("a", "b") != chain_content_hash("b", "a")
+    assert chain_content_hash("a", "b") == chain_content_hash("a", "b")
+
+def test_upload_records_rows_columns_and_hash(client):
+    df = pd.DataFrame({"x": range(3000), "y": ["a", "b", "c"] * 1000})
+    body = df.to_csv(index=False).encode()
+
+    response = client.post("/api/v1/upload", files={"file": ("sales.csv", body, "text/csv")})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["rows"], result["columns"]) == (3000, 2)
+    db = SessionLocal()
+    try:
+        dataset = db.get(Dataset, result["dataset_id"])
+        assert dataset.name == "sales"
+        assert dataset.content_hash == hashlib.sha256(body).hexdigest()
+    finally:
+        db.close()
+
+def test_upload_rejects_non_csv(client):
+    response = client.post("/api/v1/upload", files={"file": ("data.txt", "a,b\n1,2\n", "text/plain")})
+    assert response.status_code == 400
@@ -0,0 +1,94 @@
+import os
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.database import SessionLocal, MLModel, Job
+from app.jobs import job_manager, owner_alive, process_owner
+
+@pytest.fixture
+def dataset_id(upload_csv):
+    rng = np.random.default_rng(0)
+    rows = 400
+    df = pd.DataFrame({
+        "age": rng.integers(18, 70, rows),
+        "salary": rng.normal(50_000, 10_000, rows).round(2),
+        "dept": rng.choice(["IT", "HR", "Finance"], rows)
+    })
+    df["band"] = np.where(df["salary"] > 50_000, "high", "low")
+    return upload_csv(df)
+
+def wait_for(client, job_id, timeout=120):
+    seen = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if not seen or seen[-1] != job["status"]:
+            seen.append(job["status"])
+        if job["status"] in ("completed", "failed"):
+            return job, seen
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} still {seen[-1]} after {timeout}s")
+
+def test_training_job_lifecycle(client, dataset_id):
+    response = client.post("/api/v1/train", params={"dataset_id": dataset_id, "target_column": "band"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "queued"
+    assert body["status_url"] == f"/api/v1/jobs/{body['job_id']}"
+
+    job, seen = wait_for(client, body["job_id"])
+
+    assert job["status"] == "completed", job["error"]
+    assert set(seen) <= {"queued", "running", "completed"}
+    assert job["progress"] == 100
+    assert job["started_at"] and job["finished_at"]
+    result = job["result"]
+    assert result["model_type"] == "classification"
+    db = SessionLocal()
+    try:
+        model = db.query(MLModel).filter(MLModel.model_name == result["model_name"]).one()
+        assert model.target_column == "band"
+        assert db.get(Job, body["job_id"]).owner == job_manager.owner
+    finally:
+        db.close()
+
+def test_failed_job_reports_its_error(client, dataset_id):
+    job_id = client.post("/api/v1/train", params={"dataset_id": dataset_id, "target_column": "missing"}).json()["job_id"]
+
+    job, _ = wait_for(client, job_id)
+
+    assert job["status"] == "failed"
+    assert "missing" in job["error"]
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/v1/jobs/999999").status_code == 404
+
+def test_owner_liveness():
+    assert owner_alive(process_owner())
+    host = socket.gethostname()
+    # Another host's jobs are never ours to reap
+    assert owner_alive(f"elsewhere.example_{os.getpid()}_1")
+    # A pid that's running but started at another time was reused
+    assert not owner_alive(f"{host}_{os.getpid()}_1")
+    assert not owner_alive(None)
+
+def test_startup_reaps_only_dead_owners_jobs(client):
+    host = socket.gethostname()
+    db = SessionLocal()
+    try:
+        mine = Job(kind="train", status="running", owner=job_manager.owner)
+        dead = Job(kind="train", status="running", owner=f"{host}_999999999_1")
+        legacy = Job(kind="train", status="queued", owner=None)
+        db.add_all([mine, dead, legacy])
+        db.commit()
+        job_manager._reap_orphans()
+        db.expire_all()
+        assert (mine.status, dead.status, legacy.status) == ("running", "interrupted", "interrupted")
+        mine.status = "failed"
+        db.commit()
+    finally:
+        db.close()
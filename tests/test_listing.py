@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from app.database import SessionLocal, Dataset, Analysis, MLModel
+from app.listing import encode_cursor, decode_cursor
+
+TIED_TIME = datetime(2024, 3, 1, 12, 0, 0)
+
+def add_rows(rows):
+    db = SessionLocal()
+    try:
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+def read_all_pages(client, path, key, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        items.extend(body[key])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+@pytest.fixture
+def dataset_id(client):
+    return add_rows([Dataset(name="tied", filename="tied.csv", rows=1, columns=1)])[0]
+
+def test_history_pages_through_tied_timestamps(client, dataset_id):
+    # Seven analyses in the same instant, plus one older
+    ids = add_rows([Analysis(dataset_id=dataset_id, analysis_time=TIED_TIME, processing_time=1.0, type="EDA")
+                    for _ in range(7)])
+    older = add_rows([Analysis(dataset_id=dataset_id, analysis_time=datetime(2024, 2, 1), type="EDA")])
+
+    items, pages = read_all_pages(client, "/api/v1/history", "history",
+                                  dataset_id=dataset_id, limit=3, fields="id,timestamp")
+
+    # Every row exactly once, newest first and by id within the tie
+    assert [item["id"] for item in items] == sorted(ids, reverse=True) + older
+    assert pages == 3
+
+def test_models_page_through_tied_timestamps(client, dataset_id):
+    ids = add_rows([MLModel(dataset_id=dataset_id, model_name=f"m{i}", created_at=TIED_TIME) for i in range(5)])
+
+    items, _ = read_all_pages(client, "/api/v1/models", "models", dataset_id=dataset_id, limit=2, fields="id")
+
+    assert [item["id"] for item in items] == sorted(ids, reverse=True)
+
+def test_last_full_page_has_no_cursor(client, dataset_id):
+    add_rows([Analysis(dataset_id=dataset_id, analysis_time=TIED_TIME, type="EDA") for _ in range(4)])
+
+    response = client.get("/api/v1/history", params={"dataset_id": dataset_id, "limit": 4})
+    assert len(response.json()["history"]) == 4
+    assert response.json()["next_cursor"] is None
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(TIED_TIME, 42)) == (TIED_TIME, 42)
+
+def test_bad_cursor_and_unknown_field_are_rejected(client):
+    assert client.get("/api/v1/history", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/v1/history", params={"fields": "id,password"}).status_code == 400
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import types
+
+import httpx
+import pytest
+
+from app import llm
+from app.cache import TTLCache
+from app.config import LLM_MAX_RETRIES, LLM_TIMEOUT_SECONDS
+
+STATS = {"shape": [100, 2], "columns": ["price", "region"], "missing_values": {"price": 3, "region": 0}}
+
+def completion(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": f"  {text}  "}}]})
+
+class StubServer:
+    """Answers OpenRouter calls from a script of responses (or exceptions) and records the requests"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting them out"""
+    delays = []
+    async def sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(llm, "asyncio", types.SimpleNamespace(sleep=sleep))
+    return delays
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Point the shared client at a StubServer"""
+    monkeypatch.setattr(llm, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "completion_cache", TTLCache(max_entries=10, ttl_seconds=60))
+
+    def serve(*responses):
+        server = StubServer(*responses)
+        monkeypatch.setattr(llm, "_client", httpx.AsyncClient(transport=httpx.MockTransport(server)))
+        return server
+    return serve
+
+def summarize(stats=STATS):
+    return asyncio.run(llm.generate_summary(stats))
+
+def test_returns_the_completion(serve, sleeps):
+    server = serve(completion("Prices are mostly complete."))
+
+    assert summarize() == "Prices are mostly complete."
+    request = server.requests[0]
+    assert request.headers["Authorization"] == "Bearer test-key"
+    body = json.loads(request.content)
+    assert body["model"] == llm.LLM_MODEL
+    assert "price, region" in body["messages"][0]["content"]
+    assert sleeps == []
+
+def test_honours_retry_after(serve, sleeps):
+    server = serve(httpx.Response(429, headers={"Retry-After": "2"}), completion("ok"))
+
+    assert summarize() == "ok"
+    assert len(server.requests) == 2
+    assert sleeps == [2.0]
+
+def test_backs_off_on_server_errors(serve, sleeps):
+    server = serve(httpx.Response(503), httpx.Response(502), completion("ok"))
+
+    assert summarize() == "ok"
+    assert len(server.requests) == 3
+    assert sleeps == [llm.LLM_BACKOFF_SECONDS, llm.LLM_BACKOFF_SECONDS * 2]
+
+def test_gives_up_when_retry_after_exceeds_the_timeout(serve, sleeps):
+    server = serve(httpx.Response(429, headers={"Retry-After": str(int(LLM_TIMEOUT_SECONDS) + 1)}), completion("ok"))
+
+    assert summarize() == "Error generating summary: 429"
+    assert len(server.requests) == 1
+    assert sleeps == []
+
+def test_gives_up_after_max_retries(serve, sleeps):
+    server = serve(httpx.Response(500))
+
+    summary = summarize()
+
+    assert summary == "Error generating summary: 500"
+    assert llm.is_summary_error(summary)
+    assert len(server.requests) == LLM_MAX_RETRIES + 1
+    assert len(sleeps) == LLM_MAX_RETRIES
+
+def test_client_errors_are_not_retried(serve, sleeps):
+    server = serve(httpx.Response(401))
+
+    assert summarize() == "Error generating summary: 401"
+    assert len(server.requests) == 1
+
+def test_retries_connection_errors(serve, sleeps):
+    server = serve(httpx.ConnectError("refused"), completion("ok"))
+
+    assert summarize() == "ok"
+    assert len(server.requests) == 2
+
+def test_malformed_body(serve, sleeps):
+    serve(httpx.Response(200, json={"unexpected": True}))
+
+    summary = summarize()
+
+    assert summary.startswith("Error generating summary: malformed response")
+    assert llm.is_summary_error(summary)
+
+def test_repeat_prompt_is_served_from_cache(serve, sleeps):
+    server = serve(completion("cached answer"))
+
+    assert summarize() == "cached answer"
+    assert summarize(dict(STATS)) == "cached answer"
+    assert len(server.requests) == 1
+
+def test_failed_summary_is_not_cached(serve, sleeps):
+    server = serve(httpx.Response(401), completion("second try"))
+
+    assert llm.is_summary_error(summarize())
+    assert summarize() == "second try"
+    assert len(server.requests) == 2
+
+def test_prompt_cache_key_ignores_whitespace():
+    assert llm.prompt_cache_key("a  b\n c", "m", 10) == llm.prompt_cache_key("a b c", "m", 10)
+    assert llm.prompt_cache_key("a b c", "m", 10) != llm.prompt_cache_key("a b c", "m", 20)
+
+def test_missing_api_key(monkeypatch):
+    monkeypatch.setattr(llm, "OPENROUTER_API_KEY", "")
+    assert llm.is_summary_error(summarize())
+
+def test_ttl_cache_bounds_entries():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    assert cache.get("a") is None
+    assert cache.get("c") == "C"
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=2, ttl_seconds=-1)
+    cache.put("a", "A")
+    assert cache.get("a") is None
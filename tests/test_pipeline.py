@@ -0,0 +1,93 @@
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.database import SessionLocal, MLModel
+from app.ml import FeaturePipeline, prepare_features, refit_pipeline
+
+def make_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "tenure": rng.integers(0, 20, rows).astype(float),
+        "plan": rng.choice(["basic", "plus", "pro"], rows),
+        "region": rng.choice(["north", "south"], rows)
+    })
+    df.loc[::13, "tenure"] = np.nan
+    df.loc[::17, "plan"] = None
+    df["churned"] = np.where(df["tenure"].fillna(0) < 5, "yes", "no")
+    return df
+
+def test_transform_replays_the_training_encoding():
+    df = make_frame()
+    X, _, pipeline = prepare_features(df, "churned")
+
+    restored = pickle.loads(pickle.dumps(pipeline))
+    pd.testing.assert_frame_equal(restored.transform(df.drop(columns="churned")), X)
+    # Same codes whether the column arrives as text or as a category
+    as_category = df.drop(columns="churned").astype({"plan": "category", "region": "category"})
+    pd.testing.assert_frame_equal(pipeline.transform(as_category), X, check_dtype=False)
+
+def test_unseen_categories_are_mean_filled():
+    X, _, pipeline = prepare_features(make_frame(), "churned")
+    rows = pd.DataFrame({"tenure": [3.0, np.nan], "plan": ["enterprise", "plus"], "region": ["north", "west"]})
+
+    encoded = pipeline.transform(rows)
+
+    assert not encoded.isna().any().any()
+    assert encoded.loc[0, "plan"] == pytest.approx(pipeline.fill_values["plan"])
+    assert encoded.loc[1, "tenure"] == pytest.approx(pipeline.fill_values["tenure"])
+    assert encoded.loc[1, "plan"] == list(pipeline.encoders["plan"]).index("plus")
+    assert encoded.loc[1, "region"] == pytest.approx(pipeline.fill_values["region"])
+
+def test_text_in_a_numeric_feature_counts_as_missing():
+    _, _, pipeline = prepare_features(make_frame(), "churned")
+    encoded = pipeline.transform(pd.DataFrame({"tenure": ["n/a"], "plan": ["pro"], "region": ["south"]}).astype(object))
+    assert encoded.loc[0, "tenure"] == pytest.approx(pipeline.fill_values["tenure"])
+
+def test_missing_feature_column_is_reported():
+    _, _, pipeline = prepare_features(make_frame(), "churned")
+    with pytest.raises(ValueError, match="region"):
+        pipeline.transform(pd.DataFrame({"tenure": [1.0], "plan": ["pro"]}))
+
+def test_target_classes_round_trip():
+    pipeline = FeaturePipeline()
+    codes = pipeline.fit_target(pd.Series(["yes", "no", "yes"]))
+    assert pipeline.decode_target(codes).tolist() == ["yes", "no", "yes"]
+    assert FeaturePipeline().decode_target(np.array([1.5])).tolist() == [1.5]
+
+def test_legacy_model_gets_a_refitted_pipeline(client, trained_model):
+    df = make_frame(seed=1)
+    model_id, result = trained_model(df, "churned")
+    saved = joblib.load(result["pipeline_path"])
+
+    refitted = refit_pipeline(result_dataset_id(model_id), "churned", classification=True)
+    assert refitted.columns == saved.columns
+    assert refitted.encoders.keys() == saved.encoders.keys()
+    assert all(refitted.encoders[col].equals(saved.encoders[col]) for col in saved.encoders)
+    assert refitted.target_classes.tolist() == saved.target_classes.tolist()
+
+    # JSON has no NaN - send complete rows
+    rows = {"rows": df.drop(columns="churned").dropna().head(40).to_dict(orient="records")}
+    with_pipeline = client.post(f"/api/v1/models/{model_id}/predict", json=rows).json()["predictions"]
+    forget_pipeline(model_id)
+    legacy = client.post(f"/api/v1/models/{model_id}/predict", json=rows).json()["predictions"]
+    assert legacy == with_pipeline
+
+def result_dataset_id(model_id):
+    db = SessionLocal()
+    try:
+        return db.get(MLModel, model_id).dataset_id
+    finally:
+        db.close()
+
+def forget_pipeline(model_id):
+    """Make a model look like one trained before pipelines were saved"""
+    db = SessionLocal()
+    try:
+        db.get(MLModel, model_id).pipeline_path = None
+        db.commit()
+    finally:
+        db.close()
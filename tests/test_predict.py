@@ -0,0 +1,75 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.cache import model_cache
+from app.ml import get_predictor, predict_frame, predict_csv
+
+def make_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "age": rng.integers(18, 70, rows),
+        "salary": rng.normal(50_000, 10_000, rows).round(2),
+        "dept": rng.choice(["IT", "HR", "Finance"], rows)
+    })
+    df["band"] = np.where(df["salary"] > 50_000, "high", "low")
+    return df
+
+def expected_predictions(result, features):
+    """What the saved model and pipeline say, scored without the endpoint"""
+    model, pipeline = joblib.load(result["model_path"]), joblib.load(result["pipeline_path"])
+    return pipeline.decode_target(model.predict(pipeline.transform(features))).tolist()
+
+def predict(client, model_id, **kwargs):
+    response = client.post(f"/api/v1/models/{model_id}/predict", **kwargs)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_json_rows_are_scored(client, trained_model):
+    df = make_frame(seed=1)
+    model_id, result = trained_model(df, "band")
+    features = df.drop(columns="band").head(25)
+
+    body = predict(client, model_id, json={"rows": features.to_dict(orient="records")})
+
+    assert body["rows"] == 25
+    assert body["predictions"] == expected_predictions(result, features)
+    assert set(body["predictions"]) <= {"high", "low"}
+
+def test_csv_upload_is_scored_in_batches(client, trained_model, tmp_path):
+    df = make_frame(seed=2)
+    model_id, result = trained_model(df, "band")
+    features = df.drop(columns="band")
+
+    body = predict(client, model_id, files={"file": ("rows.csv", features.to_csv(index=False), "text/csv")})
+    assert body["predictions"] == expected_predictions(result, features)
+
+    predictor = get_predictor(result["model_path"], result["pipeline_path"], None, "band")
+    path = tmp_path / "rows.csv"
+    features.to_csv(path, index=False)
+    assert predict_csv(predictor, path, batch_rows=37) == predict_frame(predictor, features)
+
+def test_loaded_models_are_cached_until_the_file_changes(trained_model):
+    model_id, result = trained_model(make_frame(seed=3), "band")
+    paths = (result["model_path"], result["pipeline_path"], None, "band")
+
+    first = get_predictor(*paths)
+    assert get_predictor(*paths) is first
+    assert model_cache.stats()["entries"] >= 1
+
+    stat = os.stat(result["model_path"])
+    os.utime(result["model_path"], (stat.st_atime, stat.st_mtime + 10))
+    assert get_predictor(*paths) is not first
+
+def test_bad_requests(client, trained_model):
+    model_id, _ = trained_model(make_frame(seed=4), "band")
+    url = f"/api/v1/models/{model_id}/predict"
+
+    assert client.post("/api/v1/models/999999/predict", json={"rows": [{}]}).status_code == 404
+    assert client.post(url, json={"rows": []}).status_code == 400
+    assert client.post(url, content=b"not json", headers={"content-type": "text/plain"}).status_code == 400
+    missing = client.post(url, json={"rows": [{"age": 30}]})
+    assert missing.status_code == 400
+    assert "salary" in missing.json()["detail"]
@@ -0,0 +1,51 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rollups import LATENCY_BUCKET_EDGES, latency_bucket, percentile, summarize
+
+def test_bucket_percentiles_are_within_the_bucket_width():
+    rng = np.random.default_rng(0)
+    latencies = rng.lognormal(-1, 1.5, 20_000)
+    buckets = {}
+    for seconds in latencies:
+        bucket = latency_bucket(seconds)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+
+    for q in (0.5, 0.95, 0.99):
+        assert percentile(buckets, q) == pytest.approx(np.quantile(latencies, q), rel=0.1)
+    assert percentile({}, 0.5) is None
+
+def test_out_of_range_latencies_land_in_the_end_buckets():
+    assert latency_bucket(0) == 0
+    assert latency_bucket(10 ** 6) == len(LATENCY_BUCKET_EDGES)
+    assert percentile({latency_bucket(10 ** 6): 1}, 0.5) == LATENCY_BUCKET_EDGES[-1]
+
+def test_summarize_rollup_rows():
+    rollups = [types.SimpleNamespace(key="datasets", count=4, total=0.0),
+               types.SimpleNamespace(key="analyses:EDA", count=2, total=3.0),
+               types.SimpleNamespace(key="analyses:ML Training", count=1, total=6.0)]
+    buckets = [types.SimpleNamespace(type="EDA", bucket=latency_bucket(1.5), count=2),
+               types.SimpleNamespace(type="ML Training", bucket=latency_bucket(6.0), count=1)]
+
+    metrics = summarize(rollups, buckets)
+
+    assert metrics["total_datasets"] == 4
+    assert metrics["total_analyses"] == 3
+    assert metrics["avg_processing_time"] == 3.0
+    assert metrics["latency"]["EDA"]["avg"] == 1.5
+    assert metrics["latency"]["EDA"]["p50"] == pytest.approx(1.5, rel=0.1)
+    assert summarize([], [])["total_analyses"] == 0
+
+def test_uploads_and_analyses_update_the_rollups(client, upload_csv):
+    before = client.get("/api/v1/metrics").json()
+    dataset_id = upload_csv(pd.DataFrame({"x": np.arange(50), "y": np.arange(50) % 3}))
+    assert client.get(f"/api/v1/analyze/{dataset_id}", params={"chart_mode": "data", "refresh": "true"}).status_code == 200
+
+    after = client.get("/api/v1/metrics").json()
+
+    assert after["total_datasets"] == before["total_datasets"] + 1
+    assert after["total_analyses"] == before["total_analyses"] + 1
+    assert sum(stats["count"] for stats in after["latency"].values()) == after["total_analyses"]
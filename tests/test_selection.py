@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml import training_params
+from app.selection import select_model
+
+def make_frame(rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "x1": rng.normal(size=rows),
+        "x2": rng.normal(size=rows),
+        "segment": rng.choice(["a", "b", "c"], rows)
+    })
+    df["y"] = 3 * df["x1"] - df["x2"] + rng.normal(scale=0.1, size=rows)
+    df["label"] = np.where(df["x1"] + df["x2"] > 0, "up", "down")
+    return df
+
+@pytest.mark.parametrize("target, n_jobs", [("label", 2), ("y", 1)])
+def test_leaderboard_ranks_every_candidate(upload_csv, target, n_jobs):
+    dataset_id = upload_csv(make_frame())
+    progress = []
+
+    result = select_model(dataset_id, target, folds=3, budget_seconds=300,
+                          params=training_params(n_estimators=20, n_jobs=n_jobs),
+                          on_progress=lambda fraction, message: progress.append(fraction))
+
+    leaderboard = result["leaderboard"]
+    assert len(leaderboard) == 3
+    assert all(entry["status"] == "completed" for entry in leaderboard)
+    assert all(len(entry["fold_scores"]) == 3 and entry["fit_time"] > 0 for entry in leaderboard)
+    means = [entry["mean_score"] for entry in leaderboard]
+    assert means == sorted(means, reverse=True)
+    assert result["algorithm"] == leaderboard[0]["algorithm"]
+    assert result["score"] == leaderboard[0]["mean_score"]
+    assert result["budget_exhausted"] is False
+    assert result["train_test_split"] == "3-fold CV"
+    assert progress[-1] == 1.0
+    assert {"prepare", "cross_validation", "fit", "save"} <= set(result["stages"])
+
+def test_repeat_selection_reuses_the_preprocessing(upload_csv):
+    dataset_id = upload_csv(make_frame(seed=1))
+    params = training_params(n_estimators=5, n_jobs=1)
+
+    assert select_model(dataset_id, "label", folds=3, params=params)["cached_preprocessing"] is False
+    assert select_model(dataset_id, "label", folds=3, params=params)["cached_preprocessing"] is True
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_budget_cuts_off_a_long_fit(upload_csv, n_jobs):
+    dataset_id = upload_csv(make_frame(rows=3000, seed=2))
+    # Far too many trees to fit inside the budget
+    params = training_params(n_estimators=20_000, n_jobs=n_jobs)
+
+    start = time.time()
+    result = select_model(dataset_id, "label", folds=3, budget_seconds=8, params=params)
+    elapsed = time.time() - start
+
+    forest = next(entry for entry in result["leaderboard"] if entry["algorithm"] == "RandomForestClassifier")
+    assert result["budget_exhausted"] is True
+    assert forest["status"] in ("incomplete", "skipped")
+    assert forest["mean_score"] is None
+    assert result["algorithm"] != "RandomForestClassifier"
+    # Nothing waited for the forest - only the quick refit of the winner ran after the budget
+    assert elapsed < 8 + 5
+
+def test_nothing_finished_within_the_budget(upload_csv):
+    dataset_id = upload_csv(make_frame(seed=3))
+    with pytest.raises(ValueError, match="budget"):
+        select_model(dataset_id, "label", folds=3, budget_seconds=0, params=training_params(n_jobs=1))
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.sketches import KLLSketch, HyperLogLog, DistinctHashes, MisraGries, ReservoirSample
+
+def hashes(start, stop):
+    return pd.util.hash_array(np.arange(start, stop))
+
+def test_kll_quantiles_stay_within_the_rank_error():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=200_000)
+    sketch = KLLSketch(k=200, seed=1)
+    for chunk in np.array_split(values, 40):
+        sketch.update(chunk)
+
+    assert sketch.n == len(values)
+    # Memory is bounded by k, not by the rows seen
+    assert sum(len(level) for level in sketch.levels) < 3 * sketch.k
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        true_rank = np.mean(values < sketch.quantile(q))
+        assert abs(true_rank - q) <= sketch.rank_error()
+
+def test_kll_merge_matches_one_sketch():
+    rng = np.random.default_rng(2)
+    left, right = rng.uniform(0, 1, 50_000), rng.uniform(1, 2, 50_000)
+    a, b = KLLSketch(seed=3), KLLSketch(seed=4)
+    a.update(left)
+    b.update(np.append(right, np.nan))
+    a.merge(b)
+
+    assert a.n == 100_000
+    assert a.rank(1.0) == pytest.approx(0.5, abs=a.rank_error())
+
+def test_hyperloglog_estimate_within_its_error():
+    sketch = HyperLogLog(p=12)
+    sketch.add_hashes(hashes(0, 60_000))
+    sketch.add_hashes(hashes(30_000, 100_000))
+
+    assert sketch.estimate() == pytest.approx(100_000, rel=4 * sketch.relative_error())
+
+def test_hyperloglog_merge_and_values():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.add_values(["x", "y", None])
+    b.add_values(pd.Series(["y", "z", np.nan]))
+    a.merge(b)
+
+    assert round(a.estimate()) == 3
+
+def test_distinct_hashes_exact_below_the_limit():
+    sketch = DistinctHashes(limit=10_000)
+    for start in range(0, 9000, 1000):
+        # Overlapping batches - repeats must not count twice
+        sketch.add_hashes(hashes(start, start + 1500))
+
+    assert sketch.estimate() == 9500
+    assert sketch.relative_error() == 0.0
+
+def test_distinct_hashes_falls_back_to_hyperloglog():
+    sketch = DistinctHashes(limit=1000)
+    sketch.add_hashes(hashes(0, 50_000))
+
+    assert not sketch.exact
+    assert sketch.relative_error() > 0
+    assert sketch.estimate() == pytest.approx(50_000, rel=4 * sketch.relative_error())
+
+def test_distinct_hashes_merge():
+    a, b = DistinctHashes(limit=1000), DistinctHashes(limit=1000)
+    a.add_hashes(hashes(0, 400))
+    b.add_hashes(hashes(200, 700))
+    a.merge(b)
+    assert a.estimate() == 700
+
+    a.merge(DistinctHashes(limit=1000))
+    big = DistinctHashes(limit=1000)
+    big.add_hashes(hashes(0, 5000))
+    a.merge(big)
+    assert not a.exact
+
+def test_misra_gries_finds_the_heavy_hitters():
+    rng = np.random.default_rng(5)
+    # Three heavy values over a long tail of distinct ones
+    values = np.concatenate([np.repeat(["a", "b", "c"], [30_000, 20_000, 10_000]),
+                             rng.integers(0, 1_000_000, 40_000).astype(str)])
+    rng.shuffle(values)
+    exact = pd.Series(values).value_counts()
+    sketch, other = MisraGries(k=16), MisraGries(k=16)
+    for chunk in np.array_split(values[:50_000], 10):
+        sketch.update(chunk)
+    other.update(values[50_000:])
+    sketch.merge(other)
+
+    top = sketch.top(3)
+    assert list(top.index) == ["a", "b", "c"]
+    for value, count in top.items():
+        # Counts only ever undershoot, and by at most max_error
+        assert exact[value] - sketch.max_error() <= count <= exact[value]
+
+def test_reservoir_sample_is_bounded_and_drawn_from_every_chunk():
+    sample = ReservoirSample(size=500, seed=0)
+    assert sample.sample().empty
+    for start in range(0, 10_000, 1000):
+        sample.update(pd.DataFrame({"row": np.arange(start, start + 1000)}))
+
+    rows = sample.sample()["row"]
+    assert len(rows) == 500
+    assert rows.is_unique
+    # Roughly uniform - every chunk is represented
+    assert set(rows // 1000) == set(range(10))
@@ -0,0 +1,67 @@
+import io
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from app.config import CSV_CHUNK_ROWS
+from app.storage import has_columnar_store, load_dataset, dataset_store_path, store_parts, iter_dataset_chunks
+
+def make_frame(rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "price": rng.normal(100, 15, rows).round(2),
+        # Whole numbers until a later chunk has a gap - must end up float, not int
+        "quantity": rng.integers(1, 9, rows).astype(float),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        # Looks numeric for the first chunks, text further down
+        "ref": [str(i) for i in range(rows)]
+    })
+    df.loc[rows - 10, "quantity"] = np.nan
+    df.loc[rows - 5, "ref"] = "unknown"
+    return df
+
+def as_plain(df):
+    """Undo the load-time dtype narrowing so frames compare by value"""
+    return pd.DataFrame({
+        col: df[col].astype(object) if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col]
+        for col in df.columns
+    })
+
+def test_upload_round_trips_through_parquet(upload_csv):
+    df = make_frame()
+    dataset_id = upload_csv(df)
+
+    assert has_columnar_store(dataset_id)
+    # Types are inferred over every chunk, not just the first
+    schema = pq.read_schema(store_parts(dataset_id)[0])
+    assert str(schema.field("quantity").type) == "double"
+    assert str(schema.field("ref").type) == "string"
+    expected = pd.read_csv(io.StringIO(df.to_csv(index=False)))
+    pd.testing.assert_frame_equal(as_plain(load_dataset(dataset_id)), expected, check_dtype=False)
+
+def test_chunks_cover_the_dataset(upload_csv):
+    df = make_frame(rows=1234)
+    dataset_id = upload_csv(df)
+
+    for fallback in (False, True):
+        if fallback:
+            shutil.rmtree(dataset_store_path(dataset_id))
+        chunks = list(iter_dataset_chunks(dataset_id))
+        assert len(chunks) > 1
+        assert all(len(chunk) <= CSV_CHUNK_ROWS for chunk in chunks)
+        assert pd.concat(chunks, ignore_index=True)["id"].tolist() == df["id"].tolist()
+
+def test_column_subset_reads_only_those_columns(upload_csv):
+    dataset_id = upload_csv(make_frame(rows=200))
+    assert list(load_dataset(dataset_id, columns=["price", "region"]).columns) == ["price", "region"]
+
+def test_reads_fall_back_to_the_csv(upload_csv):
+    df = make_frame(rows=300)
+    dataset_id = upload_csv(df)
+    shutil.rmtree(dataset_store_path(dataset_id))
+
+    assert not has_columnar_store(dataset_id)
+    assert as_plain(load_dataset(dataset_id))["id"].tolist() == df["id"].tolist()
@@ -0,0 +1,105 @@
+import asyncio
+import re
+import time
+
+import pandas as pd
+import pytest
+
+from app.telemetry import StageTimer, Counter, Gauge, Histogram, render_metrics, CONTENT_TYPE
+
+def sample(text, name, **labels):
+    """Value of one sample line in Prometheus text"""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = "^" + re.escape(name + (f"{{{label_text}}}" if labels else "")) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    assert match, f"no sample {name} {labels}"
+    return float(match.group(1))
+
+def test_stage_timer_accumulates_named_stages():
+    timer = StageTimer()
+    with timer.stage("load"):
+        time.sleep(0.01)
+    with timer.stage("load"):
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with timer.stage("fit"):
+            raise RuntimeError("failed stages are still timed")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "done"
+    assert asyncio.run(timer.timed("summary", work())) == "done"
+
+    summary = timer.summary()
+    assert list(summary) == ["load", "fit", "summary"]
+    assert summary["load"] >= 0.02
+    assert summary["summary"] >= 0.01
+
+def test_counter_and_gauge_render():
+    counter = Counter("jobs_total", "Jobs", ("kind",))
+    counter.inc("train")
+    counter.inc("train", amount=2)
+    counter.inc('odd "kind"')
+    gauge = Gauge("in_flight", "Running")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    text = "\n".join(counter.render() + gauge.render())
+
+    assert "# TYPE jobs_total counter" in text
+    assert sample(text, "jobs_total", kind="train") == 3
+    assert 'jobs_total{kind="odd \\"kind\\""} 1' in text
+    assert "# TYPE in_flight gauge" in text
+    assert sample(text, "in_flight") == 1
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value, "/x")
+
+    text = "\n".join(histogram.render())
+
+    assert sample(text, "latency_seconds_bucket", route="/x", le="0.1") == 1
+    assert sample(text, "latency_seconds_bucket", route="/x", le="1") == 3
+    assert sample(text, "latency_seconds_bucket", route="/x", le="+Inf") == 4
+    assert sample(text, "latency_seconds_sum", route="/x") == pytest.approx(6.25)
+    assert sample(text, "latency_seconds_count", route="/x") == 4
+
+def test_render_metrics_includes_caches_pools_and_memory():
+    class Cache:
+        def stats(self):
+            return {"hit_ratio": 0.75, "hits": 3, "misses": 1, "entries": 2}
+    class Pool:
+        in_flight = 4
+
+    text = render_metrics({"dataset": Cache()}, {"analysis": Pool()})
+
+    assert sample(text, "datalab_cache_hit_ratio", cache="dataset") == 0.75
+    assert sample(text, "datalab_cache_misses_total", cache="dataset") == 1
+    assert sample(text, "datalab_pool_tasks_in_flight", pool="analysis") == 4
+    assert sample(text, "process_resident_memory_bytes") > 0
+    assert text.endswith("\n")
+
+def test_metrics_endpoint_counts_requests_by_route(client, upload_csv):
+    dataset_id = upload_csv(pd.DataFrame({"x": range(30), "g": ["a", "b", "c"] * 10}))
+    before = client.get("/metrics").text
+    for _ in range(2):
+        assert client.get(f"/api/v1/analyze/{dataset_id}", params={"chart_mode": "data"}).status_code == 200
+    client.get("/api/v1/jobs/999999")
+
+    response = client.get("/metrics")
+    text = response.text
+
+    assert response.headers["content-type"] == CONTENT_TYPE
+    route = "/api/v1/analyze/{dataset_id}"
+    def analyze_count(text):
+        try:
+            return sample(text, "datalab_http_requests_total", method="GET", route=route, status=200)
+        except AssertionError:
+            return 0
+    assert analyze_count(text) == analyze_count(before) + 2
+    assert sample(text, "datalab_http_requests_total", method="GET", route="/api/v1/jobs/{job_id}", status=404) >= 1
+    # Stages of the upload and of the analyses were observed
+    assert sample(text, "datalab_stage_duration_seconds_count", operation="upload", stage="parse") >= 1
+    assert sample(text, "datalab_http_requests_in_flight") == 1
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from test_jobs import wait_for
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    rows = 400
+    df = pd.DataFrame({
+        "age": rng.integers(18, 70, rows),
+        "salary": rng.normal(50_000, 10_000, rows).round(2),
+        "dept": rng.choice(["IT", "HR", "Finance"], rows)
+    })
+    df["band"] = np.where(df["salary"] > 50_000, "high", "low")
+    return df
+
+@pytest.fixture
+def dataset_id(upload_csv, frame):
+    return upload_csv(frame)
+
+def train(client, dataset_id, target_column, file=None, **params):
+    files = {"file": ("replacement.csv", file.to_csv(index=False), "text/csv")} if file is not None else None
+    return client.post("/api/v1/train", params={"dataset_id": dataset_id, "target_column": target_column, **params},
+                       files=files)
+
+def test_warm_start_reports_each_round(client, dataset_id):
+    job_id = train(client, dataset_id, "band", warm_start="true", n_estimators=30, warm_start_step=10).json()["job_id"]
+    job, _ = wait_for(client, job_id)
+
+    assert job["status"] == "completed", job["error"]
+    history = job["result"]["score_history"]
+    assert [round_["n_estimators"] for round_ in history] == [10, 20, 30]
+    assert all(0 <= round_["score"] <= 1 for round_ in history)
+    assert job["result"]["training_params"]["warm_start"] is True
+    # Nothing left to stop
+    assert client.post(f"/api/v1/jobs/{job_id}/stop").status_code == 409
+
+def test_stop_keeps_the_trees_grown_so_far(client, dataset_id):
+    job_id = train(client, dataset_id, "band", warm_start="true", n_estimators=5000, warm_start_step=5).json()["job_id"]
+
+    response = client.post(f"/api/v1/jobs/{job_id}/stop")
+
+    assert response.json() == {"job_id": job_id, "stop_requested": True}
+    job, _ = wait_for(client, job_id)
+    assert job["status"] == "completed", job["error"]
+    assert len(job["result"]["score_history"]) < 1000
+
+def test_warm_start_is_rejected_for_numeric_targets(client, dataset_id):
+    response = train(client, dataset_id, "salary", warm_start="true")
+
+    assert response.status_code == 400
+    assert "salary" in response.json()["detail"]
+
+def test_replacement_csv_decides_the_target_type(client, dataset_id, frame):
+    # Numeric in the upload, even though the stored column is text
+    numeric_band = frame.assign(band=(frame["salary"] > 50_000).astype(int))
+    assert train(client, dataset_id, "band", file=numeric_band, warm_start="true").status_code == 400
+
+    # Text in the upload, even though the stored column is numeric
+    text_salary = frame.assign(salary=np.where(frame["salary"] > 50_000, "high", "low"))
+    response = train(client, dataset_id, "salary", file=text_salary, warm_start="true", n_estimators=10)
+    assert response.status_code == 200
+    job, _ = wait_for(client, response.json()["job_id"])
+    assert job["status"] == "completed", job["error"]
+    assert job["result"]["model_type"] == "classification"
+
+def test_unreadable_replacement_csv(client, dataset_id):
+    response = client.post("/api/v1/train", params={"dataset_id": dataset_id, "target_column": "band"},
+                           files={"file": ("empty.csv", "", "text/csv")})
+    assert response.status_code == 400
+
+def test_only_warm_start_jobs_can_be_stopped(client, dataset_id):
+    job_id = train(client, dataset_id, "band").json()["job_id"]
+
+    assert client.post(f"/api/v1/jobs/{job_id}/stop").status_code == 400
+    assert client.post("/api/v1/jobs/999999/stop").status_code == 404
+    wait_for(client, job_id)
+
+def test_batch_warm_start_is_rejected_for_numeric_targets(client, dataset_id):
+    response = client.post("/api/v1/train/batch", params={
+        "dataset_id": dataset_id, "target_columns": ["band", "age"], "warm_start": "true"
+    })
+
+    assert response.status_code == 400
+    assert "age" in response.json()["detail"]
@@ -0,0 +1,83 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.cbook import boxplot_stats
+
+from app.config import STATIC_DIR, CHARTS_PER_ANALYSIS
+from app.visualization import plan_charts, build_chart_data, box_plot_stats
+
+def make_frame(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "amount": rng.lognormal(3, 1, rows),
+        "units": rng.integers(0, 10, rows),
+        "channel": rng.choice(["web", "store", "phone"], rows)
+    })
+
+def test_planned_charts_render_independently():
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    specs = plan_charts(make_frame(), dataset_id=7)
+
+    assert len(specs) == CHARTS_PER_ANALYSIS
+    for render, kwargs in specs:
+        # Each spec goes to a chart-pool process on its own
+        render, kwargs = pickle.loads(pickle.dumps((render, kwargs)))
+        url = render(**kwargs)
+        assert url == f"/static/{kwargs['filename']}"
+        assert os.path.getsize(os.path.join(STATIC_DIR, kwargs["filename"])) > 0
+
+def test_shape_overrides_the_charted_columns():
+    df = make_frame()[["amount"]]
+    specs = {render.__name__: kwargs for render, kwargs in plan_charts(df, 7, shape=(10_000, 12))}
+
+    assert (specs["render_overview_chart"]["n_rows"], specs["render_overview_chart"]["n_columns"]) == (10_000, 12)
+    assert "render_category_chart" not in specs
+
+def test_box_plot_stats_match_matplotlib():
+    rng = np.random.default_rng(3)
+    data = np.concatenate([rng.normal(0, 1, 1000), [9.0, -7.5, 12.0]])
+
+    stats = box_plot_stats(data)
+    reference = boxplot_stats(data)[0]
+
+    for key, ref_key in (("q1", "q1"), ("median", "med"), ("q3", "q3"),
+                         ("whisker_low", "whislo"), ("whisker_high", "whishi")):
+        assert stats[key] == pytest.approx(reference[ref_key]), key
+    assert stats["outliers_count"] == len(reference["fliers"])
+    assert (stats["min"], stats["max"]) == (data.min(), data.max())
+
+def test_chart_data_aggregates_the_charted_columns():
+    df = make_frame()
+    df.loc[::10, "amount"] = np.nan
+
+    charts = {chart["type"]: chart for chart in build_chart_data(df)}
+
+    histogram = charts["histogram"]
+    assert histogram["column"] == "amount"
+    assert sum(histogram["counts"]) == df["amount"].notna().sum()
+    assert len(histogram["bin_edges"]) == len(histogram["counts"]) + 1 == 31
+    assert histogram["median"] == pytest.approx(df["amount"].median())
+    assert charts["boxplot"]["median"] == pytest.approx(df["amount"].median())
+    categories = charts["categories"]
+    assert dict(zip(categories["categories"], categories["counts"])) == df["channel"].value_counts().to_dict()
+    assert sum(categories["percentages"]) == pytest.approx(100, abs=0.2)
+    assert charts["overview"] == {"type": "overview", "rows": 500, "columns": 3}
+    # Small enough to send instead of PNGs
+    assert len(json.dumps(list(charts.values()))) < 5000
+
+def test_chart_data_with_no_numeric_column():
+    charts = build_chart_data(pd.DataFrame({"name": ["a", "b", "b"]}))
+    assert [chart["type"] for chart in charts] == ["categories", "overview"]
+
+def test_analyze_returns_chart_data(client, upload_csv):
+    dataset_id = upload_csv(make_frame(seed=9))
+
+    response = client.get(f"/api/v1/analyze/{dataset_id}", params={"chart_mode": "data"})
+
+    assert response.status_code == 200
+    assert [chart["type"] for chart in response.json()["charts"]] == ["histogram", "boxplot", "categories", "overview"]
+    assert client.get(f"/api/v1/analyze/{dataset_id}", params={"chart_mode": "svg"}).status_code == 400
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.workers import BoundedExecutor, PoolSaturated, analysis_pool
+
+def test_saturated_pool_refuses_instead_of_queueing():
+    async def scenario():
+        pool = BoundedExecutor("test", max_workers=1, max_queued=1)
+        pool.start()
+        release = threading.Event()
+        try:
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert pool.in_flight == 2
+            with pytest.raises(PoolSaturated):
+                await pool.run(lambda: None)
+
+            release.set()
+            await asyncio.gather(*running)
+            # Capacity is back once the work drains
+            assert pool.in_flight == 0
+            assert await pool.run(lambda: 42) == 42
+        finally:
+            release.set()
+            pool.shutdown()
+
+    asyncio.run(scenario())
+
+def test_busy_analysis_pool_answers_429(client, upload_csv, monkeypatch):
+    rng = np.random.default_rng(0)
+    dataset_id = upload_csv(pd.DataFrame({"x": rng.normal(size=50), "y": rng.normal(size=50)}))
+    monkeypatch.setattr(analysis_pool, "in_flight", analysis_pool.max_workers + analysis_pool.max_queued)
+
+    response = client.get(f"/api/v1/analyze/{dataset_id}")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"